@@ -1,6 +1,9 @@
 from django.contrib import admin
 
-from analytics.models import TotalPost, TotalLikes
+from analytics.models import DailyRollup, DirtyRollupDay, RollupWatermark, TotalPost, TotalLikes
 
 admin.site.register(TotalPost)
-admin.site.register(TotalLikes)
\ No newline at end of file
+admin.site.register(TotalLikes)
+admin.site.register(DailyRollup)
+admin.site.register(RollupWatermark)
+admin.site.register(DirtyRollupDay)
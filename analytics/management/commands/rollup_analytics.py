@@ -0,0 +1,53 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from analytics.models import DailyRollup
+from analytics.rollup import rollup, rollup_increment
+
+
+class Command(BaseCommand):
+    help = (
+        "Обновляет дневные агрегаты аналитики (посты, лайки, просмотры, комментарии, подписчики) по всем авторам: "
+        "учитывает новые события и пересчитывает дни, отмеченные после удалений. "
+        "С --days, --start или --end дополнительно пересчитывает период целиком."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            help="Сколько последних дней пересчитать целиком (включая сегодня).",
+        )
+        parser.add_argument(
+            '--start',
+            type=datetime.date.fromisoformat,
+            help="Первый день периода (YYYY-MM-DD); вместе с --end заменяет --days.",
+        )
+        parser.add_argument(
+            '--end',
+            type=datetime.date.fromisoformat,
+            help="Последний день периода (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            '--metric',
+            action='append',
+            choices=DailyRollup.Metric.values,
+            help="Метрика для пересчёта (можно указать несколько раз); по умолчанию все.",
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] or options['start'] or options['end']:
+            end = options['end'] or timezone.localdate()
+            start = options['start'] or end - datetime.timedelta(days=(options['days'] or 1) - 1)
+            if start > end:
+                raise CommandError("Начало периода позже его конца.")
+
+            written = rollup(start, end, options['metric'])
+            self.stdout.write(f"Пересчитано агрегатов: {written} ({start} — {end})")
+
+        for metric, (written, days) in rollup_increment(options['metric']).items():
+            self.stdout.write(self.style.SUCCESS(
+                f"{metric}: изменено агрегатов {written}, пересчитано дней {days}"
+            ))
@@ -1,21 +1,152 @@
-from datetime import datetime
+import logging
+import threading
+from functools import partial
 
-from django.db import models
+from django.contrib.contenttypes.models import ContentType
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
 from blog.models import Post
-
+from comments.models import Comment, Like
+from comments.signals import likes_deleted
+from users.models import Follow, User
+from users.signals import follows_deleted
 
 # Сравнение показателей за одну-
 # -неделю со следующей и за счет этого вычислять насколько повысилось или понизилось процентный показатель
-import datetime
-from comments.models import Like
 
+logger = logging.getLogger(__name__)
+
+
+class DailyRollup(models.Model):
+    """
+    Дневной агрегат метрики автора (см. analytics.rollup).
+
+    Атрибуты:
+        author (User): Автор контента.
+        day (date): День.
+        metric (str): Метрика (посты, лайки, просмотры, комментарии, новые подписчики).
+        value (int): Значение метрики за день.
+    """
+
+    class Metric(models.TextChoices):
+        POSTS = "posts", _("Посты")
+        LIKES = "likes", _("Лайки")
+        VIEWS = "views", _("Просмотры")
+        COMMENTS = "comments", _("Комментарии")
+        FOLLOWERS = "followers", _("Новые подписчики")
+
+    author = models.ForeignKey(
+        to='users.User',
+        on_delete=models.CASCADE,
+        related_name='daily_rollups'
+    )
+    day = models.DateField()
+    metric = models.CharField(max_length=16, choices=Metric.choices)
+    value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = _("Дневной агрегат")
+        verbose_name_plural = _("Дневные агрегаты")
+        constraints = [
+            models.UniqueConstraint(fields=['author', 'day', 'metric'], name='daily_rollup_author_day_metric_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['metric', 'day'], name='daily_rollup_metric_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.author_id}|{self.day}|{self.metric}={self.value}"
+
+
+class RollupWatermark(models.Model):
+    """
+    Верхняя граница (ID последней учтённой строки) инкрементальной агрегации метрики.
+
+    Атрибуты:
+        metric (str): Метрика.
+        last_id (int): ID последнего учтённого события (Like, Comment, PostView, Follow).
+        updated_at (datetime): Время последнего продвижения границы.
+    """
+    metric = models.CharField(max_length=16, choices=DailyRollup.Metric.choices, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _("Граница агрегации")
+        verbose_name_plural = _("Границы агрегации")
+
+    def __str__(self):
+        return f"{self.metric}: {self.last_id}"
+
+
+_dirty_marks = threading.local()
+
+
+class DirtyRollupDay(models.Model):
+    """
+    День метрики, агрегат которого нужно пересчитать заново:
+    удаления и снятие с публикации не выражаются приростом по ID.
+
+    Атрибуты:
+        metric (str): Метрика.
+        day (date): День.
+    """
+    metric = models.CharField(max_length=16, choices=DailyRollup.Metric.choices)
+    day = models.DateField()
+
+    class Meta:
+        verbose_name = _("День для пересчёта")
+        verbose_name_plural = _("Дни для пересчёта")
+        constraints = [
+            models.UniqueConstraint(fields=['metric', 'day'], name='dirty_rollup_day_metric_day_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric}|{self.day}"
+
+    @classmethod
+    def mark(cls, metric: str, moment, using: str = None) -> None:
+        """
+        Отмечает день события moment для пересчёта.
+
+        Внутри транзакции отметки копятся в памяти и записываются одним
+        INSERT после коммита (при откате транзакции они отбрасываются).
+        """
+        if moment is None:
+            return
+        day = timezone.localdate(moment) if hasattr(moment, 'tzinfo') else moment
+        connection = transaction.get_connection(using)
+        if not connection.in_atomic_block:
+            cls._write_marks({(metric, day)})
+            return
+
+        # Список run_on_commit пересоздаётся после коммита или отката,
+        # поэтому по нему определяется, что транзакция уже другая
+        state = getattr(_dirty_marks, 'state', None)
+        if state is None or state[0] is not connection.run_on_commit:
+            pending = set()
+            transaction.on_commit(partial(cls._flush_pending, pending), using=using)
+            state = _dirty_marks.state = (connection.run_on_commit, pending)
+        state[1].add((metric, day))
+
+    @classmethod
+    def _flush_pending(cls, pending: set) -> None:
+        state = getattr(_dirty_marks, 'state', None)
+        if state is not None and state[1] is pending:
+            del _dirty_marks.state
+        cls._write_marks(pending)
+
+    @classmethod
+    def _write_marks(cls, marks) -> None:
+        cls.objects.bulk_create(
+            [cls(metric=metric, day=day) for metric, day in marks],
+            ignore_conflicts=True,
+        )
 
-def get_week(date):
-    """Возвращает список дат недели (начиная с понедельника)."""
-    day_idx = date.weekday()  # Понедельник = 0, воскресенье = 6
-    monday = date - datetime.timedelta(days=day_idx)
-    return [monday + datetime.timedelta(days=i) for i in range(7)]
 
 class TotalPost(models.Model):
     date = models.DateField(auto_now_add=True)
@@ -26,29 +157,17 @@ class TotalPost(models.Model):
     @classmethod
     def update_weekly_data(cls):
         """Считает количество постов за неделю, процентное изменение и сохраняет в базу."""
-        today = datetime.datetime.now().date()
-
-        # Получаем даты для текущей и прошлой недели
-        current_week = get_week(today)
-        previous_week = get_week(today - datetime.timedelta(weeks=1))
-
-        # Считаем количество постов
-        current_week_posts = Post.objects.filter(created_at__range=(current_week[0], current_week[-1])).count()
-        previous_week_posts = Post.objects.filter(created_at__range=(previous_week[0], previous_week[-1])).count()
+        from analytics.rollup import total_week_over_week
 
-        # Вычисляем процентное изменение
-        if previous_week_posts == 0:
-            percentage_change = None  # Нет данных для сравнения
-        else:
-            percentage_change = ((current_week_posts - previous_week_posts) / previous_week_posts) * 100
-
-        # Сохраняем данные в модель
+        # Значения берутся из дневных агрегатов (команда rollup_analytics)
+        totals = total_week_over_week(DailyRollup.Metric.POSTS)
         cls.objects.create(
-            post_count=current_week_posts,
-            percentage_change=percentage_change
+            post_count=totals['current'],
+            percentage_change=totals['percentage_change']
         )
 
-        print(f"Записано в базу: {current_week_posts} постов, изменение: {percentage_change}%")
+        logger.info(f"Записано в базу: {totals['current']} постов, изменение: {totals['percentage_change']}%")
+
 
 class TotalLikes(models.Model):
     data = models.DateTimeField(auto_now_add=True)
@@ -57,33 +176,83 @@ class TotalLikes(models.Model):
 
     @classmethod
     def update_weekly_data(cls, user):
-        """Считает количество постов за неделю, процентное изменение и сохраняет в базу."""
-        today = datetime.datetime.now().date()
-        user_posts = Post.objects.filter(author=user)
-        # Получаем даты для текущей и прошлой недели
-        current_week = get_week(today)
-        previous_week = get_week(today - datetime.timedelta(weeks=1))
-
-        # Считаем количество постов
-        current_week_likes = Like.objects.filter(content_type=user_posts, created_at__range=(current_week[0], current_week[-1])).count()
-        previous_week_likes = Like.objects.filter(content_type=user_posts, created_at__range=(previous_week[0], previous_week[-1])).count()
-
-        # Вычисляем процентное изменение
-        if previous_week_likes == 0:
-            percentage_change = None  # Нет данных для сравнения
-        else:
-            percentage_change = ((current_week_likes - previous_week_likes) / previous_week_likes) * 100
-
-        # Сохраняем данные в модель
+        """Считает количество лайков постов пользователя за неделю, процентное изменение и сохраняет в базу."""
+        from analytics.rollup import week_over_week
+
+        # Значения берутся из дневных агрегатов (команда rollup_analytics)
+        totals = week_over_week(DailyRollup.Metric.LIKES, author_id=user.pk)
         cls.objects.create(
-            like_count=current_week_likes,
-            percentage_change=percentage_change
+            like_count=totals['current'],
+            percentage_change=totals['percentage_change']
         )
 
-        print(f"Записано в базу: {current_week_likes} постов, изменение: {percentage_change}%")
+        logger.info(f"Записано в базу: {totals['current']} лайков, изменение: {totals['percentage_change']}%")
 #
 # class TotalViews(models.Model):
 #     pass
 #
 # class Comments(models.Model):
 #     pass
+
+
+@receiver(pre_save, sender=Post)
+def pre_save_post_rollup(sender, instance: Post, **kwargs) -> None:
+    # Обработчик ленты в post_save обновляет _loaded_status, поэтому статус запоминается заранее
+    instance._rollup_was_published = getattr(instance, '_loaded_status', None) == Post.Status.PUBLISHED
+
+
+@receiver(post_save, sender=Post)
+def post_save_post_rollup(sender, instance: Post, using=None, **kwargs) -> None:
+    """
+    Публикация и снятие с публикации меняют количество постов за день публикации.
+    """
+    if instance._rollup_was_published != (instance.status == Post.Status.PUBLISHED):
+        DirtyRollupDay.mark(DailyRollup.Metric.POSTS, instance.pub_date, using)
+
+
+@receiver(pre_delete, sender=Post)
+def pre_delete_post_rollup(sender, instance: Post, using=None, **kwargs) -> None:
+    """
+    Удаление поста меняет агрегаты за день публикации, а также за дни
+    его лайков и просмотров (комментарии отмечаются своими сигналами).
+    """
+    Metric = DailyRollup.Metric
+    if instance.status == Post.Status.PUBLISHED:
+        DirtyRollupDay.mark(Metric.POSTS, instance.pub_date, using)
+    for day in instance.likes.dates('created_at', 'day'):
+        DirtyRollupDay.mark(Metric.LIKES, day, using)
+    for day in instance.view_events.dates('viewed_at', 'day'):
+        DirtyRollupDay.mark(Metric.VIEWS, day, using)
+
+
+@receiver(likes_deleted, sender=Like)
+def likes_deleted_rollup(sender, likes, **kwargs) -> None:
+    """
+    Отмечает дни удалённых лайков постов одной вставкой (ContentType берётся из кеша).
+    """
+    post_type_id = ContentType.objects.get_for_model(Post).pk
+    with transaction.atomic():
+        for like in likes:
+            if like.content_type_id == post_type_id:
+                DirtyRollupDay.mark(DailyRollup.Metric.LIKES, like.created_at)
+
+
+@receiver(pre_delete, sender=User)
+def pre_delete_user_rollup(sender, instance: User, using=None, **kwargs) -> None:
+    """
+    Лайки пользователя удаляются каскадно, без сигнала likes_deleted.
+    """
+    likes = Like.objects.filter(author=instance, content_type=ContentType.objects.get_for_model(Post))
+    for day in likes.dates('created_at', 'day'):
+        DirtyRollupDay.mark(DailyRollup.Metric.LIKES, day, using)
+
+
+@receiver(post_delete, sender=Comment)
+def post_delete_comment_rollup(sender, instance: Comment, using=None, **kwargs) -> None:
+    DirtyRollupDay.mark(DailyRollup.Metric.COMMENTS, instance.created_at, using)
+
+
+@receiver(follows_deleted, sender=Follow)
+def follows_deleted_rollup(sender, edges, **kwargs) -> None:
+    for edge in edges:
+        DirtyRollupDay.mark(DailyRollup.Metric.FOLLOWERS, edge.created_at)
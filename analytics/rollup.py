@@ -0,0 +1,304 @@
+import datetime
+import operator
+from collections import defaultdict
+from functools import reduce
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from analytics.models import DailyRollup, DirtyRollupDay, RollupWatermark
+from blog.models import Post, PostView
+from comments.models import Comment
+from users.models import Follow
+
+Metric = DailyRollup.Metric
+
+# Поле монотонно растущего ID события для метрик с инкрементальной агрегацией.
+# Посты пересчитываются только по отмеченным дням: публикация не выражается новым ID
+ID_FIELDS = {
+    Metric.LIKES: 'likes__id',
+    Metric.VIEWS: 'pk',
+    Metric.COMMENTS: 'pk',
+    Metric.FOLLOWERS: 'pk',
+}
+
+
+def get_week(date: datetime.date) -> list:
+    """Возвращает список дат недели (начиная с понедельника)."""
+    monday = date - datetime.timedelta(days=date.weekday())
+    return [monday + datetime.timedelta(days=i) for i in range(7)]
+
+
+def day_bounds(start: datetime.date, end: datetime.date) -> tuple:
+    """
+    Возвращает полуинтервал [начало дня start, начало дня после end) в текущей временной зоне.
+    """
+    tz = timezone.get_current_timezone()
+    return (
+        datetime.datetime.combine(start, datetime.time.min, tzinfo=tz),
+        datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min, tzinfo=tz),
+    )
+
+
+def get_metric_source(metric: str) -> tuple:
+    """
+    Возвращает источник метрики: (queryset, поле автора, поле времени события).
+
+    Метрики считаются для автора контента: лайки, просмотры
+    и комментарии, полученные его постами, и новые подписчики.
+    """
+    if metric == Metric.POSTS:
+        return Post.objects.filter(status=Post.Status.PUBLISHED), 'author_id', 'pub_date'
+    if metric == Metric.LIKES:
+        # GenericRelation ограничивает лайки типом контента «пост»
+        return Post.objects.all(), 'author_id', 'likes__created_at'
+    if metric == Metric.VIEWS:
+        return PostView.objects.all(), 'post__author_id', 'viewed_at'
+    if metric == Metric.COMMENTS:
+        return Comment.objects.all(), 'post__author_id', 'created_at'
+    if metric == Metric.FOLLOWERS:
+        return Follow.objects.all(), 'followee_id', 'created_at'
+    raise ValueError(f"Неизвестная метрика: {metric}")
+
+
+def metric_rows(metric: str, since: datetime.datetime = None, until: datetime.datetime = None,
+                min_id: int = None, max_id: int = None, days=None) -> list:
+    """
+    Считает метрику по дням для всех авторов одним сгруппированным запросом.
+
+    Args:
+        metric (str): Метрика.
+        since, until (datetime): Полуинтервал времени событий [since, until).
+        min_id, max_id (int): Полуинтервал ID событий (min_id, max_id].
+        days (iterable): Только события этих дней.
+
+    Returns:
+        list: Строки (author_id, day, value).
+    """
+    queryset, author_field, time_field = get_metric_source(metric)
+    # Условия передаются одним filter(): для лайков они должны относиться к одному JOIN
+    conditions = {}
+    if since is not None:
+        conditions[f'{time_field}__gte'] = since
+    if until is not None:
+        conditions[f'{time_field}__lt'] = until
+    if min_id is not None:
+        conditions[f'{ID_FIELDS[metric]}__gt'] = min_id
+    if max_id is not None:
+        conditions[f'{ID_FIELDS[metric]}__lte'] = max_id
+    day_filter = Q()
+    if days is not None:
+        day_filter = reduce(operator.or_, (
+            Q(**{f'{time_field}__gte': start, f'{time_field}__lt': end})
+            for start, end in (day_bounds(day, day) for day in days)
+        ), Q(pk__in=[]))
+    queryset = queryset.filter(day_filter, **conditions)
+    return list(
+        queryset.values(author_field, day=TruncDate(time_field))
+        .annotate(value=Count('pk'))
+        .values_list(author_field, 'day', 'value')
+        .order_by()
+    )
+
+
+def lock_watermark(metric: str):
+    """
+    Возвращает границу метрики, заблокированную до конца транзакции (None для метрик без ID).
+    """
+    if metric not in ID_FIELDS:
+        return None
+    RollupWatermark.objects.get_or_create(metric=metric)
+    return RollupWatermark.objects.select_for_update().get(metric=metric)
+
+
+def replace_rows(metric: str, rows, days) -> int:
+    """
+    Заменяет агрегаты метрики за дни days строками rows (author_id, day, value).
+    """
+    objects = [
+        DailyRollup(author_id=author_id, day=day, metric=metric, value=value)
+        for author_id, day, value in rows
+        if author_id is not None
+    ]
+    DailyRollup.objects.filter(metric=metric, **days).delete()
+    DailyRollup.objects.bulk_create(objects, batch_size=1000)
+    return len(objects)
+
+
+def rollup(start: datetime.date, end: datetime.date, metrics=None) -> int:
+    """
+    Пересчитывает дневные агрегаты за дни [start, end] включительно.
+
+    Для каждой метрики выполняется один сгруппированный запрос по сырым
+    данным; агрегаты за эти дни заменяются целиком, поэтому повторный
+    запуск даёт тот же результат. События с ID выше границы
+    инкрементальной агрегации не учитываются: их добавит rollup_increment.
+
+    Returns:
+        int: Количество записанных строк агрегатов.
+    """
+    since, until = day_bounds(start, end)
+    written = 0
+    for metric in metrics or Metric.values:
+        with transaction.atomic():
+            watermark = lock_watermark(metric)
+            rows = metric_rows(metric, since, until, max_id=watermark and watermark.last_id)
+            written += replace_rows(metric, rows, {'day__range': (start, end)})
+    return written
+
+
+def add_rows(metric: str, rows) -> int:
+    """
+    Прибавляет к агрегатам метрики строки (author_id, day, value):
+    один запрос существующих агрегатов, один bulk_update и один bulk_create.
+    """
+    deltas = {(author_id, day): value for author_id, day, value in rows if author_id is not None}
+    if not deltas:
+        return 0
+    existing = DailyRollup.objects.filter(
+        metric=metric,
+        author_id__in={author_id for author_id, _ in deltas},
+        day__in={day for _, day in deltas},
+    )
+    to_update = []
+    for row in existing:
+        value = deltas.pop((row.author_id, row.day), None)
+        if value is not None:
+            row.value += value
+            to_update.append(row)
+    DailyRollup.objects.bulk_update(to_update, ['value'], batch_size=1000)
+    DailyRollup.objects.bulk_create(
+        [DailyRollup(author_id=author_id, day=day, metric=metric, value=value)
+         for (author_id, day), value in deltas.items()],
+        batch_size=1000,
+    )
+    return len(to_update) + len(deltas)
+
+
+def advance_watermark(metric: str) -> int:
+    """
+    Агрегирует события метрики с ID выше границы и сдвигает границу.
+
+    Берутся только события старше ANALYTICS_ROLLUP_LAG секунд, чтобы
+    не пропустить строки транзакций, закоммиченных позже строк с большим ID.
+    Прибавление агрегатов и сдвиг границы выполняются в одной транзакции,
+    поэтому повторный запуск не учитывает события дважды.
+
+    Returns:
+        int: Количество изменённых строк агрегатов.
+    """
+    queryset, _, time_field = get_metric_source(metric)
+    lag = datetime.timedelta(seconds=getattr(settings, 'ANALYTICS_ROLLUP_LAG', 60))
+    with transaction.atomic():
+        watermark = lock_watermark(metric)
+        upper = queryset.filter(**{
+            f'{ID_FIELDS[metric]}__gt': watermark.last_id,
+            f'{time_field}__lt': timezone.now() - lag,
+        }).aggregate(upper=Max(ID_FIELDS[metric]))['upper']
+        if upper is None:
+            return 0
+        written = add_rows(metric, metric_rows(metric, min_id=watermark.last_id, max_id=upper))
+        watermark.last_id = upper
+        watermark.save(update_fields=['last_id', 'updated_at'])
+    return written
+
+
+def recompute_dirty_days(metric: str) -> int:
+    """
+    Пересчитывает заново дни метрики, отмеченные после удалений
+    и снятия постов с публикации, и снимает отметки.
+
+    Returns:
+        int: Количество пересчитанных дней.
+    """
+    with transaction.atomic():
+        watermark = lock_watermark(metric)
+        marks = dict(DirtyRollupDay.objects.filter(metric=metric).values_list('pk', 'day'))
+        if not marks:
+            return 0
+        days = set(marks.values())
+        rows = metric_rows(metric, days=days, max_id=watermark and watermark.last_id)
+        replace_rows(metric, rows, {'day__in': days})
+        # Отметки, появившиеся во время пересчёта, останутся до следующего запуска
+        DirtyRollupDay.objects.filter(pk__in=marks).delete()
+    return len(days)
+
+
+def rollup_increment(metrics=None) -> dict:
+    """
+    Инкрементальная агрегация: новые события по границам ID и пересчёт отмеченных дней.
+
+    Returns:
+        dict: {метрика: (изменено строк агрегатов, пересчитано дней)}.
+    """
+    result = {}
+    for metric in metrics or Metric.values:
+        written = advance_watermark(metric) if metric in ID_FIELDS else 0
+        result[metric] = (written, recompute_dirty_days(metric))
+    return result
+
+
+def percentage_change(current: int, previous: int):
+    """
+    Процентное изменение current относительно previous (None, если сравнивать не с чем).
+    """
+    if not previous:
+        return None
+    return (current - previous) / previous * 100
+
+
+def week_over_week(metric: str, today: datetime.date = None, author_id: int = None) -> dict:
+    """
+    Сравнивает текущую неделю с предыдущей по агрегатам одним запросом.
+
+    Args:
+        metric (str): Метрика.
+        today (date): День текущей недели (по умолчанию сегодня).
+        author_id (int): Автор; если не указан — по всем авторам, с разбивкой по автору.
+
+    Returns:
+        dict: {author_id: {'current', 'previous', 'percentage_change'}};
+        при указанном author_id — только значения этого автора.
+    """
+    today = today or timezone.localdate()
+    current_week = get_week(today)
+    previous_week = get_week(today - datetime.timedelta(weeks=1))
+
+    rows = DailyRollup.objects.filter(metric=metric, day__range=(previous_week[0], current_week[-1]))
+    if author_id is not None:
+        rows = rows.filter(author_id=author_id)
+    rows = rows.values('author_id').annotate(
+        current=Sum('value', filter=Q(day__gte=current_week[0]), default=0),
+        previous=Sum('value', filter=Q(day__lt=current_week[0]), default=0),
+    )
+
+    result = defaultdict(lambda: {'current': 0, 'previous': 0, 'percentage_change': None})
+    for row in rows:
+        result[row['author_id']] = {
+            'current': row['current'],
+            'previous': row['previous'],
+            'percentage_change': percentage_change(row['current'], row['previous']),
+        }
+    if author_id is not None:
+        return result[author_id]
+    return dict(result)
+
+
+def total_week_over_week(metric: str, today: datetime.date = None) -> dict:
+    """
+    Сравнивает текущую неделю с предыдущей по всем авторам суммарно.
+    """
+    today = today or timezone.localdate()
+    current_week = get_week(today)
+    previous_week = get_week(today - datetime.timedelta(weeks=1))
+    totals = DailyRollup.objects.filter(
+        metric=metric, day__range=(previous_week[0], current_week[-1])
+    ).aggregate(
+        current=Sum('value', filter=Q(day__gte=current_week[0]), default=0),
+        previous=Sum('value', filter=Q(day__lt=current_week[0]), default=0),
+    )
+    totals['percentage_change'] = percentage_change(totals['current'], totals['previous'])
+    return totals
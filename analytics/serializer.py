@@ -0,0 +1,51 @@
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import serializers
+
+from analytics.series import BUCKETS, SERIES_METRICS
+
+# Период по умолчанию для каждого размера интервала (в днях, включая сегодня)
+DEFAULT_DAYS = {'hour': 2, 'day': 30, 'week': 84}
+
+
+class AnalyticsQuerySerializer(serializers.Serializer):
+    """
+    Параметры запроса временных рядов аналитики автора.
+    """
+    bucket = serializers.ChoiceField(choices=BUCKETS, default='day')
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    metric = serializers.MultipleChoiceField(choices=SERIES_METRICS, required=False)
+
+    def validate(self, data):
+        end = data.get('end') or timezone.localdate()
+        start = data.get('start') or end - datetime.timedelta(days=DEFAULT_DAYS[data['bucket']] - 1)
+        if start > end:
+            raise serializers.ValidationError({"start": "Начало периода позже его конца."})
+        max_days = settings.ANALYTICS_HOURLY_MAX_DAYS
+        if data['bucket'] == 'hour' and (end - start).days >= max_days:
+            raise serializers.ValidationError(
+                {"bucket": f"Почасовые данные доступны за период не длиннее {max_days} дн."}
+            )
+        data['start'], data['end'] = start, end
+        data['metric'] = [metric for metric in SERIES_METRICS if metric in (data.get('metric') or SERIES_METRICS)]
+        return data
+
+
+class AnalyticsPointSerializer(serializers.Serializer):
+    start = serializers.CharField(help_text="Начало интервала: дата или дата и время (ISO 8601).")
+    value = serializers.IntegerField()
+
+
+class AnalyticsSeriesSerializer(serializers.Serializer):
+    """
+    Временные ряды метрик автора.
+    """
+    bucket = serializers.ChoiceField(choices=BUCKETS)
+    step = serializers.IntegerField(help_text="Сколько интервалов bucket объединено в одну точку.")
+    start = serializers.DateField()
+    end = serializers.DateField()
+    series = serializers.DictField(child=AnalyticsPointSerializer(many=True))
+    totals = serializers.DictField(child=serializers.IntegerField())
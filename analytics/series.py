@@ -0,0 +1,138 @@
+import datetime
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+
+from analytics.models import DailyRollup
+from analytics.rollup import day_bounds, get_metric_source
+
+Metric = DailyRollup.Metric
+
+# Метрики временных рядов автора
+SERIES_METRICS = (Metric.VIEWS, Metric.LIKES, Metric.COMMENTS, Metric.FOLLOWERS)
+
+BUCKETS = ('hour', 'day', 'week')
+
+
+def get_max_points() -> int:
+    return getattr(settings, 'ANALYTICS_MAX_POINTS', 120)
+
+
+def bucket_starts(bucket: str, start: datetime.date, end: datetime.date) -> list:
+    """
+    Возвращает начала интервалов ряда за дни [start, end]:
+    часы (datetime), дни или понедельники недель (date).
+    """
+    if bucket == 'hour':
+        since, until = day_bounds(start, end)
+        hours = int((until - since).total_seconds() // 3600)
+        return [since + datetime.timedelta(hours=i) for i in range(hours)]
+    if bucket == 'week':
+        start -= datetime.timedelta(days=start.weekday())
+        step = 7
+    else:
+        step = 1
+    return [start + datetime.timedelta(days=i) for i in range(0, (end - start).days + 1, step)]
+
+
+def daily_values(author_id: int, metrics, start: datetime.date, end: datetime.date) -> dict:
+    """
+    Читает дневные агрегаты автора одним запросом.
+
+    Returns:
+        dict: {метрика: {день: значение}}.
+    """
+    values = defaultdict(dict)
+    rows = DailyRollup.objects.filter(
+        author_id=author_id, metric__in=metrics, day__range=(start, end)
+    ).values_list('metric', 'day', 'value')
+    for metric, day, value in rows:
+        values[metric][day] = value
+    return values
+
+
+def hourly_values(author_id: int, metrics, start: datetime.date, end: datetime.date) -> dict:
+    """
+    Считает метрики автора по часам по сырым данным: по одному запросу на метрику.
+    Дневные агрегаты не хранят часов, поэтому диапазон ограничивается
+    ANALYTICS_HOURLY_MAX_DAYS (см. AnalyticsQuerySerializer).
+
+    Returns:
+        dict: {метрика: {час: значение}}.
+    """
+    since, until = day_bounds(start, end)
+    values = {}
+    for metric in metrics:
+        queryset, author_field, time_field = get_metric_source(metric)
+        rows = (
+            queryset.filter(**{author_field: author_id, f'{time_field}__gte': since, f'{time_field}__lt': until})
+            .values(hour=TruncHour(time_field))
+            .annotate(value=Count('pk'))
+            .values_list('hour', 'value')
+            .order_by()
+        )
+        values[metric] = dict(rows)
+    return values
+
+
+def downsample(points: list, max_points: int) -> tuple:
+    """
+    Объединяет соседние интервалы ряда, чтобы их было не больше max_points.
+    Значения — количества событий, поэтому при объединении они суммируются.
+
+    Returns:
+        tuple: (ряд [(начало, значение)], сколько исходных интервалов в одной точке).
+    """
+    step = max(math.ceil(len(points) / max_points), 1)
+    if step == 1:
+        return points, step
+    merged = [
+        (points[i][0], sum(value for _, value in points[i:i + step]))
+        for i in range(0, len(points), step)
+    ]
+    return merged, step
+
+
+def author_series(author_id: int, bucket: str, start: datetime.date, end: datetime.date,
+                  metrics=SERIES_METRICS) -> dict:
+    """
+    Строит временные ряды метрик автора за дни [start, end].
+
+    Ряды по дням и неделям читаются из дневных агрегатов, по часам — из
+    сырых данных. Пропуски заполняются нулями, длинные
+    ряды прореживаются до ANALYTICS_MAX_POINTS точек.
+
+    Returns:
+        dict: {'bucket', 'step', 'start', 'end', 'series': {метрика: [{'start', 'value'}]},
+        'totals': {метрика: сумма}}.
+    """
+    starts = bucket_starts(bucket, start, end)
+    if bucket == 'hour':
+        values = hourly_values(author_id, metrics, start, end)
+    else:
+        # Первая неделя начинается с понедельника, но значения читаются только с start
+        values = daily_values(author_id, metrics, start, end)
+
+    series, totals, step = {}, {}, 1
+    for metric in metrics:
+        metric_values = values.get(metric, {})
+        if bucket == 'week':
+            weeks = defaultdict(int)
+            for day, value in metric_values.items():
+                weeks[day - datetime.timedelta(days=day.weekday())] += value
+            metric_values = weeks
+        points, step = downsample([(moment, metric_values.get(moment, 0)) for moment in starts], get_max_points())
+        series[metric] = [{'start': moment.isoformat(), 'value': value} for moment, value in points]
+        totals[metric] = sum(value for _, value in points)
+
+    return {
+        'bucket': bucket,
+        'step': step,
+        'start': start,
+        'end': end,
+        'series': series,
+        'totals': totals,
+    }
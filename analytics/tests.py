@@ -1,3 +1,197 @@
-from django.test import TestCase
+import datetime
 
-# Create your tests here.
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from analytics.models import DailyRollup, DirtyRollupDay, RollupWatermark
+from analytics.rollup import rollup, rollup_increment
+from analytics.series import author_series
+from blog.models import Post
+from comments.likes import apply_likes
+from comments.models import Comment, Like
+from users.models import User
+
+Metric = DailyRollup.Metric
+
+
+def create_user(name: str, phone_suffix: int) -> User:
+    return User.objects.create_user(
+        username=name, email=f'{name}@example.com', password='password',
+        first_name=name.title(), last_name='Test', phone_number=f'+99890123{phone_suffix:04d}',
+    )
+
+
+@override_settings(ANALYTICS_ROLLUP_LAG=0)
+class RollupTest(TestCase):
+    """
+    Дневные агрегаты: повторный пересчёт, инкрементальная агрегация по
+    границе ID и пересчёт дней, отмеченных после удалений.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('rollupauthor', 6001)
+        cls.reader = create_user('rollupreader', 6002)
+
+    def setUp(self):
+        self.today = timezone.localdate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = Post.objects.create(
+                author=self.author, title='Post', content='content', status=Post.Status.PUBLISHED,
+            )
+
+    def comment(self) -> Comment:
+        return Comment.objects.create(post=self.post, author=self.reader, content='text')
+
+    def value(self, metric: str) -> int:
+        rollup_row = DailyRollup.objects.filter(author=self.author, day=self.today, metric=metric).first()
+        return rollup_row.value if rollup_row else 0
+
+    def test_rollup_is_idempotent(self):
+        self.comment()
+        self.comment()
+        rollup_increment()
+        rollup(self.today, self.today)
+        rollup(self.today, self.today)
+        self.assertEqual(self.value(Metric.COMMENTS), 2)
+        self.assertEqual(self.value(Metric.POSTS), 1)
+        self.assertEqual(DailyRollup.objects.filter(metric=Metric.COMMENTS).count(), 1)
+
+    def test_increment_advances_watermark(self):
+        first, second = self.comment(), self.comment()
+        rollup_increment([Metric.COMMENTS])
+        self.assertEqual(self.value(Metric.COMMENTS), 2)
+        self.assertEqual(RollupWatermark.objects.get(metric=Metric.COMMENTS).last_id, second.pk)
+
+        # Повторный запуск без новых событий ничего не меняет
+        self.assertEqual(rollup_increment([Metric.COMMENTS]), {Metric.COMMENTS: (0, 0)})
+        self.assertEqual(self.value(Metric.COMMENTS), 2)
+
+        third = self.comment()
+        rollup_increment([Metric.COMMENTS])
+        self.assertEqual(self.value(Metric.COMMENTS), 3)
+        self.assertEqual(RollupWatermark.objects.get(metric=Metric.COMMENTS).last_id, third.pk)
+
+    def test_full_rollup_does_not_count_events_above_watermark_twice(self):
+        self.comment()
+        rollup_increment([Metric.COMMENTS])
+        self.comment()
+        # Событие выше границы не учитывается полным пересчётом
+        rollup(self.today, self.today, [Metric.COMMENTS])
+        self.assertEqual(self.value(Metric.COMMENTS), 1)
+        rollup_increment([Metric.COMMENTS])
+        self.assertEqual(self.value(Metric.COMMENTS), 2)
+
+    def test_deleted_comment_marks_day_dirty(self):
+        self.comment()
+        doomed = self.comment()
+        rollup_increment([Metric.COMMENTS])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            doomed.delete()
+        self.assertTrue(DirtyRollupDay.objects.filter(metric=Metric.COMMENTS, day=self.today).exists())
+
+        self.assertEqual(rollup_increment([Metric.COMMENTS]), {Metric.COMMENTS: (0, 1)})
+        self.assertEqual(self.value(Metric.COMMENTS), 1)
+        self.assertFalse(DirtyRollupDay.objects.filter(metric=Metric.COMMENTS).exists())
+
+    def test_unpublished_post_marks_day_dirty(self):
+        rollup(self.today, self.today, [Metric.POSTS])
+        self.assertEqual(self.value(Metric.POSTS), 1)
+
+        self.post.status = Post.Status.DRAFT
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+        rollup_increment([Metric.POSTS])
+        self.assertEqual(self.value(Metric.POSTS), 0)
+
+    def test_dirty_marks_are_dropped_on_rollback(self):
+        comment = self.comment()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                comment.delete()
+                raise RuntimeError
+        self.assertFalse(DirtyRollupDay.objects.filter(metric=Metric.COMMENTS).exists())
+
+    def like_post(self, user) -> Like:
+        return Like.objects.create(author=user, content_type=ContentType.objects.get_for_model(Post), object_id=self.post.pk)
+
+    def test_batch_unlike_marks_day(self):
+        readers = [self.reader] + [create_user(f'liker{i}', 6010 + i) for i in range(3)]
+        for user in readers:
+            self.like_post(user)
+        rollup_increment([Metric.LIKES])
+        self.assertEqual(self.value(Metric.LIKES), 4)
+
+        ContentType.objects.get_for_models(Post, Comment)
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as context:
+            apply_likes(self.reader, [{'content_type': 'post', 'object_id': self.post.pk, 'liked': False}])
+        # Удаление лайка не загружает ContentType
+        self.assertFalse([query for query in context.captured_queries if 'django_content_type' in query['sql']])
+        self.assertTrue(DirtyRollupDay.objects.filter(metric=Metric.LIKES, day=self.today).exists())
+
+        rollup_increment([Metric.LIKES])
+        self.assertEqual(self.value(Metric.LIKES), 3)
+
+    def test_like_toggle_marks_day(self):
+        self.like_post(self.reader)
+        rollup_increment([Metric.LIKES])
+
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/like/', {'content_type': 'post', 'object_id': self.post.pk})
+        self.assertEqual(response.status_code, 204)
+        rollup_increment([Metric.LIKES])
+        self.assertEqual(self.value(Metric.LIKES), 0)
+
+    def test_comment_likes_do_not_mark_days(self):
+        comment = self.comment()
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_likes(self.reader, [{'content_type': 'comment', 'object_id': comment.pk, 'liked': True}])
+            apply_likes(self.reader, [{'content_type': 'comment', 'object_id': comment.pk, 'liked': False}])
+        self.assertFalse(DirtyRollupDay.objects.filter(metric=Metric.LIKES).exists())
+
+    def test_deleted_user_marks_like_days(self):
+        liker = create_user('leaving', 6020)
+        self.like_post(liker)
+        rollup_increment([Metric.LIKES])
+        with self.captureOnCommitCallbacks(execute=True):
+            liker.delete()
+        rollup_increment([Metric.LIKES])
+        self.assertEqual(self.value(Metric.LIKES), 0)
+
+
+class AuthorSeriesTest(TestCase):
+    """
+    Временные ряды автора по дневным агрегатам.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('seriesauthor', 6101)
+        # Среда 2026-01-07: неделя начинается в понедельник 2026-01-05
+        cls.start = datetime.date(2026, 1, 7)
+        days = [cls.start + datetime.timedelta(days=offset) for offset in range(-2, 12)]
+        DailyRollup.objects.bulk_create([
+            DailyRollup(author=cls.author, day=day, metric=Metric.VIEWS, value=1) for day in days
+        ])
+
+    def test_week_series_ignores_days_before_start(self):
+        end = self.start + datetime.timedelta(days=7)
+        result = author_series(self.author.pk, 'week', self.start, end, metrics=[Metric.VIEWS])
+        self.assertEqual(result['series'][Metric.VIEWS], [
+            {'start': '2026-01-05', 'value': 5},
+            {'start': '2026-01-12', 'value': 3},
+        ])
+        self.assertEqual(result['totals'][Metric.VIEWS], 8)
+
+    def test_day_series_fills_gaps(self):
+        DailyRollup.objects.filter(day=self.start).delete()
+        end = self.start + datetime.timedelta(days=2)
+        result = author_series(self.author.pk, 'day', self.start, end, metrics=[Metric.VIEWS])
+        self.assertEqual([point['value'] for point in result['series'][Metric.VIEWS]], [0, 1, 1])
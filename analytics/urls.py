@@ -0,0 +1,7 @@
+from django.urls import path
+
+from analytics.views import AuthorAnalyticsView
+
+urlpatterns = [
+    path('analytics/me/', AuthorAnalyticsView.as_view(), name='analytics-me'),
+]
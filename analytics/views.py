@@ -1,3 +1,49 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.core.cache import cache
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-# Create your views here.
+from analytics.serializer import AnalyticsQuerySerializer, AnalyticsSeriesSerializer
+from analytics.series import author_series
+
+
+@extend_schema(
+    summary="Аналитика текущего автора",
+    description=(
+        "Возвращает временные ряды просмотров, лайков, комментариев и новых подписчиков "
+        "постов текущего пользователя по часам, дням или неделям. Длинные периоды "
+        "прореживаются: соседние интервалы суммируются (см. поле step)."
+    ),
+    parameters=[
+        OpenApiParameter(name='bucket', type=str, enum=['hour', 'day', 'week'], description="Размер интервала."),
+        OpenApiParameter(name='start', type=str, description="Первый день периода (YYYY-MM-DD)."),
+        OpenApiParameter(name='end', type=str, description="Последний день периода (YYYY-MM-DD)."),
+        OpenApiParameter(name='metric', type=str, many=True, description="Метрики (по умолчанию все)."),
+    ],
+    responses={200: AnalyticsSeriesSerializer},
+    tags=['Analytics'],
+)
+class AuthorAnalyticsView(generics.GenericAPIView):
+    """
+    Представление для получения аналитики текущего автора.
+    Ответ кешируется на ANALYTICS_CACHE_TIMEOUT секунд для каждого автора и набора параметров.
+    """
+    permission_classes = (IsAuthenticated,)
+    serializer_class = AnalyticsSeriesSerializer
+
+    def get(self, request, *args, **kwargs):
+        query = AnalyticsQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+
+        key = 'analytics:author:{}:{}:{}:{}:{}'.format(
+            request.user.pk, params['bucket'], params['start'], params['end'], ','.join(params['metric'])
+        )
+        data = cache.get(key)
+        if data is None:
+            series = author_series(request.user.pk, params['bucket'], params['start'], params['end'], params['metric'])
+            data = self.get_serializer(series).data
+            cache.set(key, data, settings.ANALYTICS_CACHE_TIMEOUT)
+        return Response(data)
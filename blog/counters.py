@@ -0,0 +1,163 @@
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundFlushBuffer:
+    """
+    Базовый буфер отложенной записи: накопленные изменения сбрасываются
+    в базу методом flush() из фонового потока раз в flush_interval секунд.
+    """
+    flush_interval = 5.0
+    worker_name = 'buffer-flush'
+
+    def flush(self) -> int:
+        raise NotImplementedError
+
+    def flush_at_exit(self) -> None:
+        """
+        Последний сброс при завершении процесса: ошибка записывается в лог,
+        а не прерывает остановку (например, если база уже недоступна).
+        """
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Не удалось сбросить буфер {self.worker_name} при завершении: {e}")
+
+    def _ensure_worker(self) -> None:
+        """
+        Запускает фоновый поток периодического сброса, если он ещё не запущен.
+        """
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._run, name=self.worker_name, daemon=True
+            )
+            self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Не удалось сбросить буфер {self.worker_name}: {e}")
+            finally:
+                close_old_connections()
+
+
+class PostCounterBuffer(BackgroundFlushBuffer):
+    """
+    Буфер счётчиков поста (просмотры, лайки, комментарии).
+
+    Инкременты накапливаются в памяти процесса и сбрасываются в базу пачкой:
+    UPDATE ... SET field = field + delta, один запрос на группу постов
+    с одинаковым набором изменений. Сброс происходит
+    при превышении размера буфера, по истечении интервала (фоновым потоком)
+    и при завершении процесса.
+    """
+    worker_name = 'post-counter-flush'
+
+    def __init__(self, flush_interval: float = None, max_pending: int = None):
+        self.flush_interval = flush_interval if flush_interval is not None else getattr(
+            settings, 'POST_COUNTERS_FLUSH_INTERVAL', 5.0
+        )
+        self.max_pending = max_pending if max_pending is not None else getattr(
+            settings, 'POST_COUNTERS_MAX_PENDING', 500
+        )
+        self._pending = defaultdict(lambda: defaultdict(int))
+        self._pending_count = 0
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def increment(self, post_id: int, field: str, delta: int = 1) -> None:
+        """
+        Добавляет инкремент счётчика в буфер.
+
+        Args:
+            post_id (int): ID поста.
+            field (str): Название поля-счётчика.
+            delta (int): Величина изменения (может быть отрицательной).
+        """
+        from blog.models import Post
+
+        if field not in Post.COUNTER_FIELDS:
+            raise ValueError(f"Неизвестный счётчик: {field}")
+
+        with self._lock:
+            self._pending[post_id][field] += delta
+            self._pending_count += 1
+            overflow = self._pending_count >= self.max_pending
+
+        if self.flush_interval <= 0 or overflow:
+            self.flush()
+        else:
+            self._ensure_worker()
+
+    def pending(self, post_id: int) -> dict:
+        """
+        Возвращает ещё не сброшенные изменения счётчиков поста.
+        """
+        with self._lock:
+            return dict(self._pending.get(post_id, {}))
+
+    def flush(self) -> int:
+        """
+        Сбрасывает накопленные инкременты в базу данных.
+
+        Если запрос завершился ошибкой, неприменённые изменения возвращаются
+        в буфер и будут записаны следующим сбросом; ошибка пробрасывается.
+
+        Returns:
+            int: Количество обновлённых постов.
+        """
+        from blog.models import Post
+
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(lambda: defaultdict(int))
+            self._pending_count = 0
+
+        # Посты с одинаковым набором изменений обновляем одним запросом
+        batches = defaultdict(list)
+        for post_id, deltas in pending.items():
+            key = tuple(sorted((field, delta) for field, delta in deltas.items() if delta))
+            if key:
+                batches[key].append(post_id)
+
+        updated = 0
+        batches = list(batches.items())
+        for index, (key, post_ids) in enumerate(batches):
+            changes = {field: Greatest(F(field) + delta, 0) for field, delta in key}
+            try:
+                updated += Post.objects.filter(pk__in=post_ids).update(**changes)
+            except Exception:
+                self._restore(batches[index:])
+                raise
+        return updated
+
+    def _restore(self, batches) -> None:
+        """
+        Возвращает в буфер изменения пачек, которые не удалось записать.
+        """
+        with self._lock:
+            for key, post_ids in batches:
+                for post_id in post_ids:
+                    for field, delta in key:
+                        self._pending[post_id][field] += delta
+                    self._pending_count += len(key)
+
+
+post_counters = PostCounterBuffer()
+atexit.register(post_counters.flush_at_exit)
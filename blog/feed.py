@@ -0,0 +1,329 @@
+import bisect
+import heapq
+import threading
+from collections import defaultdict
+from datetime import datetime
+from functools import lru_cache
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.module_loading import import_string
+
+from common.pagination import PostKeysetPagination
+
+
+def get_fanout_limit() -> int:
+    return getattr(settings, 'FEED_FANOUT_LIMIT', 10000)
+
+
+def get_backfill_limit() -> int:
+    return getattr(settings, 'FEED_BACKFILL_LIMIT', 200)
+
+
+def parse_position(position) -> tuple:
+    """
+    Преобразует позицию курсора [pub_date, id] в кортеж (datetime, int).
+    """
+    if position is None:
+        return None
+    pub_date, post_id = position
+    if isinstance(pub_date, str):
+        pub_date = parse_datetime(pub_date)
+    return pub_date, int(post_id)
+
+
+class BaseFeedStore:
+    """
+    Хранилище материализованных лент пользователей.
+
+    Элемент ленты — ключ (pub_date, post_id). Лента читается в порядке
+    убывания ключа, начиная строго после переданной позиции.
+    """
+
+    def push(self, post, owner_ids) -> None:
+        """
+        Добавляет опубликованный пост в ленты подписчиков.
+        """
+        raise NotImplementedError
+
+    def remove(self, post_id: int) -> None:
+        """
+        Удаляет пост из всех лент.
+        """
+        raise NotImplementedError
+
+    def backfill(self, owner_id: int, posts) -> None:
+        """
+        Добавляет в ленту пользователя последние посты авторов после подписки.
+        """
+        raise NotImplementedError
+
+    def prune(self, owner_id: int, author_id: int) -> None:
+        """
+        Удаляет из ленты пользователя посты автора после отписки.
+        """
+        raise NotImplementedError
+
+    def clear(self, owner_id: int) -> None:
+        """
+        Полностью очищает ленту пользователя.
+        """
+        raise NotImplementedError
+
+    def read(self, owner_id: int, position=None, limit: int = 20, reverse: bool = False) -> list:
+        """
+        Возвращает ключи ленты (pub_date, post_id) в порядке обхода.
+
+        Args:
+            owner_id (int): Владелец ленты.
+            position (tuple): Ключ, после которого начинается чтение.
+            limit (int): Максимальное количество ключей.
+            reverse (bool): Читать в обратную сторону (к более новым постам).
+        """
+        raise NotImplementedError
+
+
+class DatabaseFeedStore(BaseFeedStore):
+    """
+    Лента в таблице FeedEntry: чтение — один диапазонный скан по индексу
+    (owner, pub_date, post).
+    """
+    batch_size = 1000
+
+    @property
+    def model(self):
+        from blog.models import FeedEntry
+        return FeedEntry
+
+    def push(self, post, owner_ids) -> None:
+        entries = [
+            self.model(owner_id=owner_id, post_id=post.pk, author_id=post.author_id, pub_date=post.pub_date)
+            for owner_id in owner_ids
+        ]
+        self.model.objects.bulk_create(entries, batch_size=self.batch_size, ignore_conflicts=True)
+
+    def remove(self, post_id: int) -> None:
+        self.model.objects.filter(post_id=post_id).delete()
+
+    def backfill(self, owner_id: int, posts) -> None:
+        entries = [
+            self.model(owner_id=owner_id, post_id=post.pk, author_id=post.author_id, pub_date=post.pub_date)
+            for post in posts
+        ]
+        self.model.objects.bulk_create(entries, batch_size=self.batch_size, ignore_conflicts=True)
+
+    def prune(self, owner_id: int, author_id: int) -> None:
+        self.model.objects.filter(owner_id=owner_id, author_id=author_id).delete()
+
+    def clear(self, owner_id: int) -> None:
+        self.model.objects.filter(owner_id=owner_id).delete()
+
+    def read(self, owner_id: int, position=None, limit: int = 20, reverse: bool = False) -> list:
+        queryset = self.model.objects.filter(owner_id=owner_id)
+        if position is not None:
+            pub_date, post_id = position
+            lookup = 'gt' if reverse else 'lt'
+            queryset = queryset.filter(
+                Q(**{f'pub_date__{lookup}': pub_date})
+                | Q(pub_date=pub_date, **{f'post_id__{lookup}': post_id})
+            )
+        order_by = ('pub_date', 'post_id') if reverse else ('-pub_date', '-post_id')
+        return list(queryset.order_by(*order_by).values_list('pub_date', 'post_id')[:limit])
+
+
+class InMemoryFeedStore(BaseFeedStore):
+    """
+    Лента в памяти процесса. Подходит для локальной разработки и тестов.
+
+    Для каждого пользователя хранится отсортированный список ключей
+    (-timestamp, -post_id), что позволяет читать страницу через bisect.
+    """
+
+    def __init__(self):
+        self._feeds = defaultdict(list)
+        self._authors = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(pub_date: datetime, post_id: int) -> tuple:
+        return -pub_date.timestamp(), -post_id
+
+    def _insert(self, owner_id: int, post) -> None:
+        key = self._key(post.pub_date, post.pk)
+        feed = self._feeds[owner_id]
+        index = bisect.bisect_left(feed, key)
+        if index == len(feed) or feed[index] != key:
+            feed.insert(index, key)
+        self._authors[post.pk] = (post.author_id, post.pub_date)
+
+    def push(self, post, owner_ids) -> None:
+        with self._lock:
+            for owner_id in owner_ids:
+                self._insert(owner_id, post)
+
+    def remove(self, post_id: int) -> None:
+        with self._lock:
+            for owner_id, feed in self._feeds.items():
+                self._feeds[owner_id] = [key for key in feed if key[1] != -post_id]
+            self._authors.pop(post_id, None)
+
+    def backfill(self, owner_id: int, posts) -> None:
+        with self._lock:
+            for post in posts:
+                self._insert(owner_id, post)
+
+    def prune(self, owner_id: int, author_id: int) -> None:
+        with self._lock:
+            self._feeds[owner_id] = [
+                key for key in self._feeds[owner_id]
+                if self._authors.get(-key[1], (None,))[0] != author_id
+            ]
+
+    def clear(self, owner_id: int) -> None:
+        with self._lock:
+            self._feeds.pop(owner_id, None)
+
+    def read(self, owner_id: int, position=None, limit: int = 20, reverse: bool = False) -> list:
+        with self._lock:
+            feed = list(self._feeds.get(owner_id, ()))
+
+        if reverse:
+            end = bisect.bisect_left(feed, self._key(*position)) if position else len(feed)
+            keys = feed[max(0, end - limit):end][::-1]
+        else:
+            start = bisect.bisect_right(feed, self._key(*position)) if position else 0
+            keys = feed[start:start + limit]
+        return [(self._authors[-post_id][1], -post_id) for _, post_id in keys]
+
+
+@lru_cache(maxsize=None)
+def get_feed_store() -> BaseFeedStore:
+    """
+    Возвращает хранилище лент, заданное настройкой FEED_STORE.
+    """
+    path = getattr(settings, 'FEED_STORE', 'blog.feed.DatabaseFeedStore')
+    return import_string(path)()
+
+
+def get_follower_ids(author_id: int, limit: int = None) -> list:
+    """
+    Возвращает ID пользователей, подписанных на автора.
+    """
+    from users.models import Follow
+    queryset = Follow.objects.filter(followee_id=author_id).values_list('follower_id', flat=True)
+    return list(queryset[:limit] if limit is not None else queryset)
+
+
+def get_follower_count(author_id: int) -> int:
+    """
+    Возвращает количество подписчиков автора (денормализованный счётчик профиля).
+    """
+    from users.models import Profile
+    return Profile.objects.filter(user_id=author_id).values_list('followers_count', flat=True).first() or 0
+
+
+def get_pull_author_ids(owner_id: int) -> list:
+    """
+    Возвращает авторов из подписок пользователя, посты которых не рассылаются
+    по лентам (слишком много подписчиков) и читаются в момент запроса.
+    """
+    from users.models import Follow
+
+    return list(
+        Follow.objects.filter(follower_id=owner_id, followee__profile__followers_count__gt=get_fanout_limit())
+        .values_list('followee_id', flat=True)
+    )
+
+
+def fanout_post(post) -> None:
+    """
+    Рассылает опубликованный пост по лентам подписчиков автора (fan-out on write).
+    Посты авторов с очень большим числом подписчиков не рассылаются.
+    """
+    follower_ids = get_follower_ids(post.author_id, limit=get_fanout_limit() + 1)
+    if len(follower_ids) > get_fanout_limit():
+        return
+    get_feed_store().push(post, follower_ids)
+
+
+def backfill_feed(owner_id: int, author_ids) -> None:
+    """
+    Заполняет ленту пользователя последними постами авторов после подписки.
+
+    Посты всех авторов в push-режиме выбираются одним запросом,
+    не больше FEED_BACKFILL_LIMIT на ленту.
+    """
+    from blog.models import Post
+
+    posts = (
+        Post.objects.filter(
+            author_id__in=author_ids, author__profile__followers_count__lte=get_fanout_limit(),
+            status=Post.Status.PUBLISHED, pub_date__isnull=False,
+        )
+        .order_by('-pub_date', '-id')
+        .only('pk', 'author_id', 'pub_date')[:get_backfill_limit()]
+    )
+    get_feed_store().backfill(owner_id, list(posts))
+
+
+def merge_keys(*sources, limit: int, reverse: bool = False) -> list:
+    """
+    Сливает отсортированные списки ключей ленты без повторов.
+    """
+    merged = []
+    seen = set()
+    for key in heapq.merge(*sources, reverse=not reverse):
+        if key[1] in seen:
+            continue
+        seen.add(key[1])
+        merged.append(key)
+        if len(merged) == limit:
+            break
+    return merged
+
+
+class FeedPagination(PostKeysetPagination):
+    """
+    Пагинация ленты пользователя.
+
+    Ключи страницы читаются из хранилища лент; посты авторов, работающих
+    в pull-режиме, подмешиваются в момент запроса слиянием по (pub_date, id).
+    """
+
+    def paginate_feed(self, queryset, request, owner_id: int) -> list:
+        from blog.models import Post
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        sources = [get_feed_store().read(owner_id, parse_position(position), size + 1, reverse)]
+
+        pull_author_ids = get_pull_author_ids(owner_id)
+        if pull_author_ids:
+            pulled = queryset.filter(
+                author__in=pull_author_ids,
+                status=Post.Status.PUBLISHED,
+                pub_date__isnull=False,
+            )
+            if position is not None:
+                pulled = pulled.filter(self.get_seek_filter(position, reverse))
+            pulled = pulled.order_by(*self.get_order_by(reverse)).values_list('pub_date', 'id')
+            sources.append(list(pulled[:size + 1]))
+
+        keys = merge_keys(*sources, limit=size + 1, reverse=reverse)
+        has_more = len(keys) > size
+        keys = keys[:size]
+
+        posts = queryset.in_bulk([post_id for _, post_id in keys])
+        rows = [posts[post_id] for _, post_id in keys if post_id in posts]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not reverse else True
+        self.has_previous = position is not None if not reverse else has_more
+        return rows
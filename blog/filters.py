@@ -0,0 +1,24 @@
+from django_filters import rest_framework as filters
+
+from blog.models import Post
+
+
+class PostFilter(filters.FilterSet):
+    """
+    Фильтрация постов по тегу, автору и статусу.
+
+    Параметры запроса:
+        - tag (str): Название тега (с символом '#' или без него).
+        - author (int): ID автора.
+        - status (str): Статус публикации.
+    """
+    tag = filters.CharFilter(method='filter_tag')
+    author = filters.NumberFilter(field_name='author_id')
+
+    class Meta:
+        model = Post
+        fields = ('tag', 'author', 'status')
+
+    def filter_tag(self, queryset, name, value):
+        tag_name = value if value.startswith('#') else f"#{value}"
+        return queryset.filter(tag__tag_name=tag_name)
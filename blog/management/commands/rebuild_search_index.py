@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import router, transaction
+
+from blog.models import Post
+from blog.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Перестраивает полнотекстовый индекс постов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=None,
+            help="База данных, индекс которой нужно перестроить (по умолчанию — база записи постов).",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Количество постов, индексируемых за один проход.",
+        )
+
+    def handle(self, *args, **options):
+        using = options['database'] or router.db_for_write(Post)
+        backend = get_search_backend(using)
+        backend.create_tables()
+
+        posts = Post.objects.using(using).order_by('pk').only('pk', 'title', 'content')
+        indexed = 0
+        last_pk = 0
+        with transaction.atomic(using=using):
+            backend.clear()
+            while True:
+                batch = list(posts.filter(pk__gt=last_pk)[:options['batch_size']])
+                if not batch:
+                    break
+                backend.index_many(batch)
+                indexed += len(batch)
+                last_pk = batch[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f"Проиндексировано постов: {indexed}"))
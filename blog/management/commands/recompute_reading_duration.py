@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает количество слов и время чтения постов с устаревшим хешем контента."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help="Количество постов, обрабатываемых за один проход.",
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help="Проверить все посты, а не только те, для которых хеш ещё не посчитан.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        posts = Post.objects.order_by('pk').only('pk', 'content', 'content_hash', 'word_count', 'reading_duration')
+        if not options['all']:
+            posts = posts.filter(content_hash='')
+
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+
+            # Хеш сравнивается в памяти: анализируется только изменившийся контент
+            stale = [post for post in batch if post.update_text_stats()]
+            Post.objects.bulk_update(stale, ['content_hash', 'word_count', 'reading_duration'])
+
+            updated += len(stale)
+            last_pk = batch[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f"Обновлено постов: {updated}"))
@@ -0,0 +1,63 @@
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand
+from django.db.models import F, OuterRef, Q
+
+from blog.counters import post_counters
+from blog.models import Post
+from blog.tracking import post_views
+from comments.models import Comment, Like
+from common.db import count_subquery
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счётчики постов и исправляет расхождения."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Количество постов, обрабатываемых за один проход.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        post_views.flush()
+        post_counters.flush()
+
+        post_type = ContentType.objects.get_for_model(Post)
+        drifted = Post.objects.annotate(
+            actual_views=count_subquery(
+                Post.viewers.through.objects.filter(post_id=OuterRef('pk')), 'post_id'
+            ),
+            actual_likes=count_subquery(
+                Like.objects.filter(content_type=post_type, object_id=OuterRef('pk')), 'object_id'
+            ),
+            actual_comments=count_subquery(
+                Comment.objects.filter(post_id=OuterRef('pk')), 'post_id'
+            ),
+        ).filter(
+            ~Q(views_count=F('actual_views'))
+            | ~Q(likes_count=F('actual_likes'))
+            | ~Q(comments_count=F('actual_comments'))
+        ).order_by('pk')
+
+        fixed = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                drifted.filter(pk__gt=last_pk).only(*(('pk',) + Post.COUNTER_FIELDS))[:batch_size]
+            )
+            if not batch:
+                break
+
+            for post in batch:
+                post.views_count = post.actual_views
+                post.likes_count = post.actual_likes
+                post.comments_count = post.actual_comments
+            Post.objects.bulk_update(batch, Post.COUNTER_FIELDS)
+
+            fixed += len(batch)
+            last_pk = batch[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f"Исправлено постов: {fixed}"))
@@ -0,0 +1,31 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.trending import refresh_trending
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает рейтинг популярных постов и списки популярных постов тегов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window-hours',
+            type=int,
+            default=settings.TRENDING_WINDOW_HOURS,
+            help="За сколько последних часов опубликованные посты участвуют в рейтинге.",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Количество постов, обновляемых одним запросом.",
+        )
+
+    def handle(self, *args, **options):
+        scored = refresh_trending(
+            datetime.timedelta(hours=options['window_hours']),
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Постов в рейтинге: {scored}"))
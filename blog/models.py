@@ -1,10 +1,21 @@
-from random import randint
+import math
+from functools import partial
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericRelation
-from django.db import models
-from django.utils.text import slugify
+from django.db import IntegrityError, models, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from blog.feed import backfill_feed, fanout_post, get_feed_store
+from blog.search import get_search_backend
+from blog.slugs import slug_allocator
+from blog.text import content_hash, count_words
+from common.images import image_processor
+from users.models import Follow
+from users.signals import follows_created, follows_deleted
+
 User = get_user_model()
 
 
@@ -19,8 +30,13 @@ class Post(models.Model):
         tag (Tag): Множество тегов, связанных с постом.
         slug (str): Уникальный URL-идентификатор.
         status (str): Статус публикации поста (опубликовано, черновик, на модерации).
-        views (int): Количество просмотров поста.
+        views_count (int): Количество просмотров поста.
+        likes_count (int): Количество лайков поста.
+        comments_count (int): Количество комментариев к посту.
+        trending_score (float): Рейтинг популярности с затуханием по времени (см. blog.trending).
         reading_duration (int): Продолжительность чтения (в минутах).
+        word_count (int): Количество слов в контенте без HTML-разметки.
+        content_hash (str): Хеш контента, по которому были посчитаны word_count и reading_duration.
         pub_date (datetime): Дата публикации.
         updated_at (datetime): Дата последнего обновления.
     """
@@ -30,6 +46,15 @@ class Post(models.Model):
         DRAFT = "DRF", _("Черновик")
         MODERATION = "MOD", _("На модерации")
 
+    # Счётчики обновляются только через F()-выражения (см. blog.counters)
+    COUNTER_FIELDS = ('views_count', 'likes_count', 'comments_count')
+    # Рейтинг пересчитывается только командой refresh_trending
+    SCORE_FIELDS = ('trending_score',)
+    # Изображения с уменьшенными вариантами (common.images); renditions пишет только обработчик
+    RENDITION_FIELDS = ('preview',)
+    SLUG_ATTEMPTS = 3
+    WORDS_PER_MINUTE = 200
+
     author = models.ForeignKey(
         to="users.User",
         on_delete=models.CASCADE,
@@ -44,6 +69,7 @@ class Post(models.Model):
     likes = GenericRelation('comments.Like')
 
     preview = models.ImageField(blank=True, null=True, upload_to='post/preview/')
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
     slug = models.SlugField(unique=True, max_length=100)
     status = models.CharField(
         max_length=3,
@@ -51,14 +77,32 @@ class Post(models.Model):
         default=Status.DRAFT
     )
     reading_duration = models.IntegerField(default=1)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    content_hash = models.CharField(max_length=32, blank=True, editable=False)
     viewers = models.ManyToManyField(
         to='users.User',
+        through='PostView',
         related_name='viewed_posts',
         editable=False
     )
+    views_count = models.PositiveIntegerField(default=0, editable=False)
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+    trending_score = models.FloatField(default=0, editable=False)
     pub_date = models.DateTimeField(null=True, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает статус, с которым пост был загружен, чтобы отследить публикацию,
+        и заголовок с контентом, чтобы не переиндексировать неизменённый текст.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        instance._loaded_search_text = (instance.__dict__.get('title'), instance.__dict__.get('content'))
+        return instance
+
     def __str__(self):
         """
         Возвращает строковое представление поста в формате:
@@ -71,13 +115,28 @@ class Post(models.Model):
         """
         Вычисляет продолжительность чтения на основе количества слов.
         """
-        words_per_minute = 200
-        word_count = len(self.content)
-        duration = max(1, word_count // words_per_minute)
-        return duration
+        return max(1, math.ceil(self.word_count / self.WORDS_PER_MINUTE))
+
+    def update_text_stats(self) -> bool:
+        """
+        Пересчитывает количество слов и время чтения, если контент изменился.
+
+        Returns:
+            bool: True, если значения были пересчитаны.
+        """
+        digest = content_hash(self.content)
+        if digest == self.content_hash:
+            return False
+        self.content_hash = digest
+        self.word_count = count_words(self.content)
+        self.reading_duration = self.calculate_reading_duration()
+        return True
 
     def get_likes_count(self):
-        return self.likes.count()
+        """
+        Возвращает количество лайков из денормализованного счётчика.
+        """
+        return self.likes_count
 
 
     def save(self, *args, **kwargs):
@@ -88,23 +147,242 @@ class Post(models.Model):
         Исключения:
             ValidationError: Если черновик имеет дату публикации.
         """
-        # Генерация уникального слага
-        if not self.slug:
-            random_slug = f"{slugify(self.title)}-{randint(1000, 9999)}"
-            while Post.objects.filter(slug=random_slug).exists():
-                random_slug = f"{slugify(self.title)}-{randint(1000, 9999)}"
-            self.slug = random_slug
+        # Генерация уникального слага без проверочных запросов
+        generated_slug = not self.slug
+        if generated_slug:
+            self.slug = slug_allocator.make_slug(self.title, self._meta.get_field('slug').max_length)
 
         # Валидация статуса и даты публикации
         # if self.status == self.Status.DRAFT and self.pub_date:
         #     raise ValidationError(_("Черновик не может иметь дату публикации."))
         # if self.status == self.Status.PUBLISHED and not self.pub_date:
         #     self.pub_date = datetime.datetime.now()
+        if self.status == self.Status.PUBLISHED and not self.pub_date:
+            self.pub_date = timezone.now()
 
-        self.reading_duration = self.calculate_reading_duration()
+        # Текст анализируется только если контент сохраняется и изменился
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            if self.update_text_stats() and update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'content_hash', 'word_count', 'reading_duration'}
+
+        # Не перезаписываем счётчики, рейтинг и варианты изображений устаревшими значениями из памяти
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in (*self.COUNTER_FIELDS, *self.SCORE_FIELDS, 'renditions')
+            ]
+
+        if not generated_slug:
+            super().save(*args, **kwargs)
+            return
 
-        super().save(*args, **kwargs)
+        # Конфликт сгенерированного слага (гонка между процессами) — повторяем с новым суффиксом
+        for attempt in range(self.SLUG_ATTEMPTS):
+            try:
+                with transaction.atomic(using=kwargs.get('using')):
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                if attempt + 1 == self.SLUG_ATTEMPTS or not self._slug_taken():
+                    raise
+                slug_allocator.reseed()
+                self.slug = slug_allocator.make_slug(self.title, self._meta.get_field('slug').max_length)
+
+    def _slug_taken(self) -> bool:
+        return Post.objects.filter(slug=self.slug).exclude(pk=self.pk).exists()
 
     class Meta:
         verbose_name = _("Пост")
-        verbose_name_plural = _("Посты")
\ No newline at end of file
+        verbose_name_plural = _("Посты")
+        indexes = [
+            # Keyset-пагинация списка постов и ленты по (pub_date, id)
+            models.Index(fields=['-pub_date', '-id'], name='post_pub_date_id_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'], name='post_author_pub_date_id_idx'),
+            # Чтение популярных постов и сброс рейтинга вышедших из окна постов
+            models.Index(fields=['status', '-trending_score', '-id'], name='post_trending_score_idx'),
+        ]
+
+
+class PostView(models.Model):
+    """
+    Просмотр поста пользователем (промежуточная таблица Post.viewers).
+
+    Атрибуты:
+        post (Post): Просмотренный пост.
+        user (User): Пользователь.
+        viewed_at (datetime): Время первого просмотра.
+    """
+    post = models.ForeignKey(
+        to=Post,
+        on_delete=models.CASCADE,
+        related_name='view_events'
+    )
+    user = models.ForeignKey(
+        to='users.User',
+        on_delete=models.CASCADE,
+        related_name='post_views'
+    )
+    viewed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = _("Просмотр поста")
+        verbose_name_plural = _("Просмотры постов")
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'user'], name='post_view_post_user_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['viewed_at'], name='post_view_viewed_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id}|{self.post_id}"
+
+
+class TrendingTagPost(models.Model):
+    """
+    Популярный пост тега: верхние TRENDING_TAG_SIZE постов каждого тега
+    по рейтингу (заполняется командой refresh_trending).
+
+    Атрибуты:
+        tag (Tag): Тег.
+        post (Post): Пост с этим тегом.
+        score (float): Рейтинг поста на момент пересчёта.
+    """
+    tag = models.ForeignKey(
+        to='comments.Tag',
+        on_delete=models.CASCADE,
+        related_name='trending_posts'
+    )
+    post = models.ForeignKey(
+        to=Post,
+        on_delete=models.CASCADE,
+        related_name='trending_tags'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name = _("Популярный пост тега")
+        verbose_name_plural = _("Популярные посты тегов")
+        constraints = [
+            models.UniqueConstraint(fields=['tag', 'post'], name='trending_tag_post_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', '-score', '-post'], name='trending_tag_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tag_id}|{self.post_id}={self.score:.3f}"
+
+
+class FeedEntry(models.Model):
+    """
+    Элемент материализованной ленты пользователя (fan-out on write).
+
+    Атрибуты:
+        owner (User): Владелец ленты.
+        post (Post): Пост в ленте.
+        author (User): Автор поста (для удаления постов при отписке).
+        pub_date (datetime): Дата публикации поста (ключ сортировки ленты).
+    """
+    owner = models.ForeignKey(
+        to='users.User',
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        to=Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    author = models.ForeignKey(
+        to='users.User',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        verbose_name = _("Элемент ленты")
+        verbose_name_plural = _("Элементы ленты")
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'post'], name='feed_entry_owner_post_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-pub_date', '-post'], name='feed_entry_owner_pub_date_idx'),
+            models.Index(fields=['owner', 'author'], name='feed_entry_owner_author_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.owner}|{self.post_id}"
+
+
+@receiver(post_save, sender=Post)
+def post_save_post(sender, instance: Post, created, **kwargs) -> None:
+    """
+    Рассылает пост по лентам при переходе в статус PUBLISHED
+    и убирает его из лент при снятии с публикации.
+    """
+    was_published = getattr(instance, '_loaded_status', None) == Post.Status.PUBLISHED
+    is_published = instance.status == Post.Status.PUBLISHED
+    instance._loaded_status = instance.status
+
+    if is_published and not was_published:
+        transaction.on_commit(partial(fanout_post, instance))
+    elif was_published and not is_published:
+        transaction.on_commit(partial(get_feed_store().remove, instance.pk))
+
+
+@receiver(post_delete, sender=Post)
+def post_delete_post(sender, instance: Post, **kwargs) -> None:
+    transaction.on_commit(partial(get_feed_store().remove, instance.pk))
+    get_search_backend(kwargs.get('using')).remove(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def post_save_search_index(sender, instance: Post, created=False, update_fields=None, using=None,
+                           **kwargs) -> None:
+    """
+    Обновляет полнотекстовый индекс, если изменились заголовок или контент.
+    """
+    if update_fields is not None and not {'title', 'content'} & set(update_fields):
+        return
+    search_text = (instance.title, instance.content)
+    if not created and getattr(instance, '_loaded_search_text', None) == search_text:
+        return
+    get_search_backend(using).index(instance)
+    instance._loaded_search_text = search_text
+
+
+@receiver(post_migrate)
+def post_migrate_search_tables(sender, using=None, **kwargs) -> None:
+    """
+    Создаёт таблицы полнотекстового индекса вместе со схемой базы, а не при
+    первой записи внутри транзакции запроса (или теста).
+    """
+    if sender.name == Post._meta.app_label:
+        get_search_backend(using).create_tables()
+
+
+@receiver(post_save, sender=Post)
+def post_save_post_renditions(sender, instance: Post, update_fields=None, using=None, **kwargs) -> None:
+    image_processor.schedule(instance, update_fields, using)
+
+
+@receiver(follows_created, sender=Follow)
+def follows_created_feed(sender, follower_id, followee_ids, **kwargs) -> None:
+    """
+    Заполняет ленту постами авторов после подписки (после коммита, одним запросом).
+    """
+    transaction.on_commit(partial(backfill_feed, follower_id, list(followee_ids)))
+
+
+@receiver(follows_deleted, sender=Follow)
+def follows_deleted_feed(sender, follower_id, followee_ids, **kwargs) -> None:
+    """
+    Убирает из ленты посты авторов после отписки.
+    """
+    store = get_feed_store()
+    for author_id in followee_ids:
+        store.prune(follower_id, author_id)
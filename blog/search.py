@@ -0,0 +1,314 @@
+import difflib
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections, router, transaction
+
+from blog.text import html_to_text
+from common.cache import get_namespace_version, invalidate_namespace
+from common.pagination import PostKeysetPagination
+
+TERM_RE = re.compile(r'\w+')
+# Пространство имён кеша результатов поиска: инвалидируется при изменении индекса
+SEARCH_NAMESPACE = 'search'
+
+
+def get_max_results() -> int:
+    return getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+
+
+def get_results_timeout() -> int:
+    return getattr(settings, 'SEARCH_RESULTS_TIMEOUT', 60)
+
+
+def parse_terms(query: str, max_terms: int = 8) -> list:
+    """
+    Разбивает поисковый запрос на термы (в нижнем регистре, без спецсимволов).
+    """
+    return [term.lower() for term in TERM_RE.findall(query)][:max_terms]
+
+
+class BaseSearchBackend:
+    """
+    Полнотекстовый индекс постов во внешней по отношению к ORM таблице.
+
+    Таблицы индекса создаются при первом обращении (и командой
+    rebuild_search_index), поэтому отдельная миграция не нужна.
+    Все термы запроса обязательны и ищутся по префиксу; терм, которого нет
+    в словаре индекса, заменяется ближайшим по написанию (исправление опечаток).
+
+    Ранжированный список результатов запроса кешируется на
+    SEARCH_RESULTS_TIMEOUT секунд, чтобы следующие страницы не повторяли
+    поиск; любое изменение индекса этим процессом сбрасывает кеш.
+    """
+    vendor = None
+
+    def __init__(self, using: str):
+        self.using = using
+        self.connection = connections[using]
+
+    def create_tables(self) -> None:
+        raise NotImplementedError
+
+    index_sql = None
+
+    def index(self, post) -> None:
+        """
+        Добавляет или обновляет пост в индексе.
+        """
+        self.execute(self.index_sql, self.get_params(post))
+        invalidate_namespace(SEARCH_NAMESPACE)
+
+    def index_many(self, posts) -> None:
+        """
+        Индексирует пачку постов одним executemany (таблицы должны существовать).
+        """
+        with self.connection.cursor() as cursor:
+            cursor.executemany(self.index_sql, [self.get_params(post) for post in posts])
+        invalidate_namespace(SEARCH_NAMESPACE)
+
+    def remove(self, post_id: int) -> None:
+        """
+        Удаляет пост из индекса.
+        """
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """
+        Очищает индекс.
+        """
+        raise NotImplementedError
+
+    def search_terms(self, terms: list, limit: int) -> list:
+        """
+        Возвращает [(post_id, rank)] по убыванию релевантности.
+        """
+        raise NotImplementedError
+
+    def vocabulary(self, prefix: str) -> list:
+        """
+        Возвращает термы индекса, начинающиеся с prefix.
+        """
+        raise NotImplementedError
+
+    def search(self, query: str, limit: int = None) -> list:
+        terms = parse_terms(query)
+        if not terms:
+            return []
+        limit = limit or get_max_results()
+        digest = hashlib.md5(' '.join(terms).encode()).hexdigest()
+        key = f'search:hits:{self.using}:{get_namespace_version((SEARCH_NAMESPACE,))}:{limit}:{digest}'
+        hits = cache.get(key)
+        if hits is None:
+            hits = self.search_terms(self.correct(terms), limit)
+            cache.set(key, hits, get_results_timeout())
+        return hits
+
+    def correct(self, terms: list) -> list:
+        """
+        Заменяет термы, которых нет в индексе даже как префикс, ближайшими по написанию.
+        """
+        corrected = []
+        for term in terms:
+            if len(term) < 3 or self.vocabulary(term):
+                corrected.append(term)
+                continue
+            candidates = self.vocabulary(term[0])
+            matches = difflib.get_close_matches(term, candidates, n=1, cutoff=0.75)
+            corrected.append(matches[0] if matches else term)
+        return corrected
+
+    def execute(self, sql: str, params=None) -> list:
+        """
+        Выполняет запрос к индексу; при отсутствии таблиц создаёт их и повторяет запрос.
+        """
+        for attempt in range(2):
+            try:
+                with transaction.atomic(using=self.using), self.connection.cursor() as cursor:
+                    cursor.execute(sql, params)
+                    return cursor.fetchall() if cursor.description else []
+            except DatabaseError:
+                if attempt:
+                    raise
+                self.create_tables()
+
+    def get_params(self, post) -> list:
+        return [post.pk, post.title, html_to_text(post.content)]
+
+
+class SQLiteSearchBackend(BaseSearchBackend):
+    """
+    Индекс на SQLite FTS5: виртуальная таблица с rowid = ID поста,
+    ранжирование по bm25 (совпадение в заголовке весит больше),
+    словарь термов — таблица fts5vocab.
+    """
+    vendor = 'sqlite'
+    table = 'blog_post_fts'
+    vocabulary_table = 'blog_post_fts_vocab'
+    vocabulary_limit = 5000
+
+    def create_tables(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} "
+                f"USING fts5(title, content, tokenize='unicode61 remove_diacritics 2')"
+            )
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.vocabulary_table} "
+                f"USING fts5vocab({self.table}, row)"
+            )
+
+    @property
+    def index_sql(self) -> str:
+        return f"INSERT OR REPLACE INTO {self.table} (rowid, title, content) VALUES (%s, %s, %s)"
+
+    def remove(self, post_id: int) -> None:
+        self.execute(f"DELETE FROM {self.table} WHERE rowid = %s", [post_id])
+        invalidate_namespace(SEARCH_NAMESPACE)
+
+    def clear(self) -> None:
+        self.execute(f"DELETE FROM {self.table}")
+        invalidate_namespace(SEARCH_NAMESPACE)
+
+    def search_terms(self, terms: list, limit: int) -> list:
+        match = ' '.join(f'"{term}"*' for term in terms)
+        return self.execute(
+            f"SELECT rowid, -bm25({self.table}, 10.0, 1.0) AS rank FROM {self.table} "
+            f"WHERE {self.table} MATCH %s ORDER BY rank DESC, rowid DESC LIMIT %s",
+            [match, limit],
+        )
+
+    def vocabulary(self, prefix: str) -> list:
+        rows = self.execute(
+            f"SELECT term FROM {self.vocabulary_table} WHERE term >= %s AND term < %s LIMIT %s",
+            [prefix, prefix + '\uffff', self.vocabulary_limit],
+        )
+        return [term for term, in rows]
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Индекс на PostgreSQL: таблица с tsvector (заголовок с весом A,
+    текст с весом B) и GIN-индексом, ранжирование по ts_rank.
+
+    Словарь для исправления опечаток строится через ts_stat и кешируется
+    на SEARCH_VOCABULARY_TIMEOUT секунд.
+    """
+    vendor = 'postgresql'
+    table = 'blog_post_search'
+
+    @property
+    def config(self) -> str:
+        return getattr(settings, 'SEARCH_CONFIG', 'simple')
+
+    def create_tables(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                f"post_id integer PRIMARY KEY REFERENCES blog_post (id) ON DELETE CASCADE, "
+                f"document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_document_gin ON {self.table} USING GIN (document)"
+            )
+
+    @property
+    def index_sql(self) -> str:
+        return (
+            f"INSERT INTO {self.table} (post_id, document) VALUES (%s, "
+            f"setweight(to_tsvector(%s::regconfig, %s), 'A') || setweight(to_tsvector(%s::regconfig, %s), 'B')) "
+            f"ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document"
+        )
+
+    def get_params(self, post) -> list:
+        post_id, title, content = super().get_params(post)
+        return [post_id, self.config, title, self.config, content]
+
+    def remove(self, post_id: int) -> None:
+        self.execute(f"DELETE FROM {self.table} WHERE post_id = %s", [post_id])
+        invalidate_namespace(SEARCH_NAMESPACE)
+
+    def clear(self) -> None:
+        self.execute(f"TRUNCATE {self.table}")
+        invalidate_namespace(SEARCH_NAMESPACE)
+
+    def search_terms(self, terms: list, limit: int) -> list:
+        query = ' & '.join(f'{term}:*' for term in terms)
+        return self.execute(
+            f"SELECT post_id, ts_rank(document, query) AS rank "
+            f"FROM {self.table}, to_tsquery(%s::regconfig, %s) query "
+            f"WHERE document @@ query ORDER BY rank DESC, post_id DESC LIMIT %s",
+            [self.config, query, limit],
+        )
+
+    def vocabulary(self, prefix: str) -> list:
+        key = f'search:vocabulary:{self.using}'
+        words = cache.get(key)
+        if words is None:
+            rows = self.execute(f"SELECT word FROM ts_stat('SELECT document FROM {self.table}')")
+            words = sorted(word for word, in rows)
+            cache.set(key, words, getattr(settings, 'SEARCH_VOCABULARY_TIMEOUT', 300))
+        return [word for word in words if word.startswith(prefix)]
+
+
+BACKENDS = {backend.vendor: backend for backend in (SQLiteSearchBackend, PostgresSearchBackend)}
+
+
+def get_search_backend(using: str = None) -> BaseSearchBackend:
+    """
+    Возвращает поисковый бэкенд для базы using (по умолчанию — базы чтения постов).
+    """
+    from blog.models import Post
+
+    using = using or router.db_for_read(Post)
+    vendor = connections[using].vendor
+    if vendor not in BACKENDS:
+        raise NotImplementedError(f"Полнотекстовый поиск не поддерживается для {vendor}")
+    return BACKENDS[vendor](using)
+
+
+class SearchPagination(PostKeysetPagination):
+    """
+    Пагинация результатов поиска по (rank, id): страница выбирается
+    из ранжированного списка результатов, который бэкенд кеширует
+    между запросами страниц (см. BaseSearchBackend.search).
+    """
+    ordering = ('-rank', '-id')
+
+    def paginate_hits(self, queryset, request, hits: list) -> list:
+        """
+        Возвращает страницу постов из результатов поиска [(post_id, rank)],
+        отфильтрованных queryset.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        allowed = set(queryset.filter(pk__in=[post_id for post_id, _ in hits]).values_list('pk', flat=True))
+        keys = [(rank, post_id) for post_id, rank in hits if post_id in allowed]
+        if reverse:
+            keys.reverse()
+        if position is not None:
+            rank, post_id = position
+            after = (lambda key: key > (rank, post_id)) if reverse else (lambda key: key < (rank, post_id))
+            keys = [key for key in keys if after(key)]
+        has_more = len(keys) > size
+        keys = keys[:size]
+
+        posts = queryset.in_bulk([post_id for _, post_id in keys])
+        rows = []
+        for rank, post_id in keys:
+            if post_id in posts:
+                posts[post_id].rank = rank
+                rows.append(posts[post_id])
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not reverse else True
+        self.has_previous = position is not None if not reverse else has_more
+        return rows
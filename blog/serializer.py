@@ -1,25 +1,75 @@
 from blog.models import Post
 from rest_framework import serializers
-from comments.serializer import TagSerializer
+from comments.serializer import LikeStateListSerializer, LikeStateSerializer, TagSerializer
+from common.images import RenditionsField
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(LikeStateSerializer, serializers.ModelSerializer):
     author = serializers.StringRelatedField()
     reading_duration = serializers.IntegerField(read_only=True)
     tag = TagSerializer
+    preview_renditions = RenditionsField('preview')
     # get_likes_count = serializers.SerializerMethodField()
+    count_likes = False
 
     class Meta:
         model = Post
         fields = (
             'title',
             'content',
+            'preview',
+            'preview_renditions',
             'tag',
             'author',
             'viewers',
             'reading_duration',
             'get_likes_count',
+            'likes_count',
+            'liked_by_me',
+            'views_count',
+            'comments_count',
             'pub_date',
             'updated_at',
             'status',
         )
+        list_serializer_class = LikeStateListSerializer
+
+
+class PostListSerializer(LikeStateSerializer, serializers.ModelSerializer):
+    """
+    Облегчённый сериализатор поста для списков.
+
+    Не обращается к базе данных на каждую строку: теги берутся из
+    prefetch_related, счётчики — из денормализованных колонок поста,
+    вместо списка ID просмотревших возвращается их количество.
+    Признак liked_by_me загружается одним запросом на страницу.
+    Вместо оригинала превью возвращаются ссылки на его уменьшенные варианты.
+    """
+    count_likes = False
+    author = serializers.StringRelatedField()
+    tag = TagSerializer(many=True, read_only=True)
+    viewers_count = serializers.IntegerField(source='views_count', read_only=True)
+    preview_renditions = RenditionsField('preview')
+
+    class Meta:
+        model = Post
+        fields = (
+            'id',
+            'title',
+            'slug',
+            'content',
+            'preview_renditions',
+            'tag',
+            'author',
+            'viewers_count',
+            'reading_duration',
+            'get_likes_count',
+            'likes_count',
+            'liked_by_me',
+            'comments_count',
+            'pub_date',
+            'updated_at',
+            'status',
+        )
+        read_only_fields = fields
+        list_serializer_class = LikeStateListSerializer
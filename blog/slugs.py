@@ -0,0 +1,89 @@
+import os
+import random
+import threading
+import time
+
+from django.utils.text import slugify
+
+ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+# Эпоха генератора: 2024-01-01 UTC в миллисекундах
+EPOCH_MS = 1704067200000
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+
+
+def base36(number: int) -> str:
+    if number == 0:
+        return ALPHABET[0]
+    digits = []
+    while number:
+        number, remainder = divmod(number, 36)
+        digits.append(ALPHABET[remainder])
+    return ''.join(reversed(digits))
+
+
+class SlugAllocator:
+    """
+    Генератор уникальных суффиксов слага без обращения к базе данных.
+
+    Суффикс — base36 от 63-битного идентификатора (как Snowflake):
+    миллисекунды от эпохи, номер процесса и порядковый номер в пределах
+    миллисекунды. Суффиксы одного процесса не повторяются; совпадение
+    между процессами возможно только при совпадении номера процесса
+    в одну миллисекунду и обрабатывается повтором сохранения (см. Post.save).
+    """
+
+    def __init__(self, node: int = None):
+        self.node = (node if node is not None else (os.getpid() ^ random.getrandbits(NODE_BITS))) % (1 << NODE_BITS)
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        with self._lock:
+            now = max(int(time.time() * 1000) - EPOCH_MS, self._last_ms)
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) % (1 << SEQUENCE_BITS)
+                if self._sequence == 0:
+                    # Последовательность исчерпана — занимаем следующую миллисекунду
+                    now += 1
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (now << (NODE_BITS + SEQUENCE_BITS)) | (self.node << SEQUENCE_BITS) | self._sequence
+
+    def suffix(self) -> str:
+        return base36(self.next_id())
+
+    def reseed(self) -> None:
+        """
+        Выбирает новый номер процесса (после конфликта уникальности).
+        """
+        with self._lock:
+            self.node = random.getrandbits(NODE_BITS)
+
+    def make_slug(self, title: str, max_length: int = 100) -> str:
+        """
+        Возвращает слаг вида <slugify(title)>-<суффикс> длиной не больше max_length.
+        """
+        suffix = self.suffix()
+        base = slugify(title)[:max_length - len(suffix) - 1].strip('-')
+        return f"{base}-{suffix}" if base else suffix
+
+
+slug_allocator = SlugAllocator()
+
+
+def assign_slugs(posts) -> list:
+    """
+    Назначает слаги постам без слага за один проход в памяти,
+    например перед Post.objects.bulk_create(posts) при импорте.
+    """
+    from blog.models import Post
+
+    max_length = Post._meta.get_field('slug').max_length
+    for post in posts:
+        if not post.slug:
+            post.slug = slug_allocator.make_slug(post.title, max_length)
+    return posts
@@ -1,3 +1,504 @@
-from django.test import TestCase
+import datetime
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db import IntegrityError, OperationalError, connection
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from blog.counters import PostCounterBuffer
+from blog.feed import InMemoryFeedStore
+from blog.models import FeedEntry, Post, PostView
+from blog.search import BaseSearchBackend, get_search_backend
+from blog.slugs import SlugAllocator, assign_slugs, slug_allocator
+from blog.tracking import PostViewBuffer
+from blog.trending import refresh_trending, trending_score
+from comments.models import Tag
+from users.follows import follow, unfollow
+from users.models import User
+
+
+class PostListQueryCountTest(TestCase):
+    """
+    Регрессионный тест: число запросов на страницу списка постов
+    не должно зависеть от количества постов на странице.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='password',
+            first_name='Author', last_name='Test', phone_number='+998901234567',
+        )
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='password',
+            first_name='Reader', last_name='Test', phone_number='+998901234568',
+        )
+        follow(cls.reader, [cls.author.pk])
+        cls.tags = [Tag.objects.create(tag_name=f'tag{i}') for i in range(3)]
+
+    def setUp(self):
+        cache.clear()
+        # ContentType кешируется менеджером; прогреваем кеш, чтобы не учитывать его в первом запросе
+        ContentType.objects.get_for_model(Post)
+        self.client = APIClient()
+
+    def create_posts(self, count: int) -> None:
+        for _ in range(count):
+            with self.captureOnCommitCallbacks(execute=True):
+                post = Post.objects.create(
+                    author=self.author,
+                    title='Post',
+                    content='content',
+                    status=Post.Status.PUBLISHED,
+                )
+            post.tag.set(self.tags)
+
+    def count_queries(self, url: str) -> int:
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['results'])
+        return len(context.captured_queries)
+
+    def test_post_list_query_count_is_constant(self):
+        self.create_posts(2)
+        small_page = self.count_queries('/api/posts/')
+
+        self.create_posts(8)
+        large_page = self.count_queries('/api/posts/')
+
+        self.assertEqual(small_page, large_page)
+
+    def test_feed_query_count_is_constant(self):
+        self.client.force_authenticate(self.reader)
+        # Первый запрос пользователя записывает last_activity (users.activity)
+        self.client.get('/api/posts/user/feed/')
+
+        self.create_posts(2)
+        small_page = self.count_queries('/api/posts/user/feed/')
+
+        self.create_posts(8)
+        large_page = self.count_queries('/api/posts/user/feed/')
+
+        self.assertEqual(small_page, large_page)
+
+    def test_post_list_returns_viewer_count(self):
+        self.create_posts(1)
+        response = self.client.get('/api/posts/')
+
+        post = response.json()['results'][0]
+        self.assertNotIn('viewers', post)
+        self.assertEqual(post['viewers_count'], 0)
+        self.assertEqual(len(post['tag']), 3)
+
+
+def create_user(name: str, phone_suffix: int) -> User:
+    return User.objects.create_user(
+        username=name, email=f'{name}@example.com', password='password',
+        first_name=name.title(), last_name='Test', phone_number=f'+99890123{phone_suffix:04d}',
+    )
+
+
+class FeedTest(TestCase):
+    """
+    Материализованная лента: рассылка при публикации, заполнение после
+    подписки, очистка после отписки и подмешивание постов pull-авторов.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('feedauthor', 1001)
+        cls.other = create_user('feedother', 1002)
+        cls.reader = create_user('feedreader', 1003)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def publish(self, author, title: str = 'Post') -> Post:
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(author=author, title=title, content='content', status=Post.Status.PUBLISHED)
+
+    def feed_ids(self) -> list:
+        response = self.client.get('/api/posts/user/feed/')
+        self.assertEqual(response.status_code, 200)
+        return [post['id'] for post in response.json()['results']]
+
+    def test_publish_fans_out_to_followers(self):
+        follow(self.reader, [self.author.pk])
+        first = self.publish(self.author)
+        second = self.publish(self.author)
+        self.publish(self.other)
+
+        self.assertEqual(self.feed_ids(), [second.pk, first.pk])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        old = self.publish(self.author)
+        other = self.publish(self.other)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            follow(self.reader, [self.author.pk, self.other.pk])
+        # Посты всех авторов выбираются одним запросом и записываются одним INSERT
+        with self.assertNumQueries(2):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(self.feed_ids(), [other.pk, old.pk])
+
+        unfollow(self.reader, [self.other.pk])
+        self.assertEqual(self.feed_ids(), [old.pk])
+
+    def test_unpublish_removes_post_from_feeds(self):
+        follow(self.reader, [self.author.pk])
+        post = self.publish(self.author)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            post.status = Post.Status.DRAFT
+            post.save()
+        self.assertEqual(self.feed_ids(), [])
+
+    def test_pull_authors_are_merged_at_read_time(self):
+        follow(self.reader, [self.other.pk])
+        pushed = self.publish(self.other)
+        with override_settings(FEED_FANOUT_LIMIT=0):
+            follow(self.reader, [self.author.pk])
+            pulled = self.publish(self.author)
+            self.assertFalse(FeedEntry.objects.filter(post=pulled).exists())
+            self.assertEqual(self.feed_ids(), [pulled.pk, pushed.pk])
+
+    def test_in_memory_store_pages_and_prunes(self):
+        store = InMemoryFeedStore()
+        posts = [self.publish(self.author if i % 2 else self.other, f'Post {i}') for i in range(4)]
+        store.backfill(self.reader.pk, posts)
+
+        keys = store.read(self.reader.pk, limit=2)
+        self.assertEqual([post_id for _, post_id in keys], [posts[3].pk, posts[2].pk])
+        rest = store.read(self.reader.pk, position=keys[-1], limit=10)
+        self.assertEqual([post_id for _, post_id in rest], [posts[1].pk, posts[0].pk])
+
+        store.prune(self.reader.pk, self.author.pk)
+        self.assertEqual([post_id for _, post_id in store.read(self.reader.pk)], [posts[2].pk, posts[0].pk])
+
+
+def fail_on_call(method, number: int):
+    """
+    Обёртка метода, которая падает с OperationalError на вызове number.
+    """
+    calls = []
+
+    def wrapper(*args, **kwargs):
+        calls.append(None)
+        if len(calls) == number:
+            raise OperationalError('database table is locked')
+        return method(*args, **kwargs)
+    return wrapper
+
+
+class PostCounterBufferTest(TestCase):
+    """
+    Буфер счётчиков: изменения, которые не удалось записать, остаются
+    в буфере до следующего сброса.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('counterauthor', 2101)
+        cls.posts = [
+            Post.objects.create(author=cls.author, title=f'Post {i}', content='content', status=Post.Status.PUBLISHED)
+            for i in range(2)
+        ]
+
+    def counters(self) -> list:
+        return list(
+            Post.objects.filter(pk__in=[post.pk for post in self.posts]).order_by('pk')
+            .values_list('likes_count', 'views_count')
+        )
+
+    def test_failed_flush_keeps_increments(self):
+        buffer = PostCounterBuffer(flush_interval=3600, max_pending=100)
+        first, second = (post.pk for post in self.posts)
+        with mock.patch.object(buffer, '_ensure_worker'):
+            buffer.increment(first, 'likes_count')
+            buffer.increment(first, 'likes_count')
+            buffer.increment(second, 'views_count', 3)
+
+        # Первая пачка записана, вторая упала
+        with mock.patch.object(QuerySet, 'update', fail_on_call(QuerySet.update, 2)):
+            with self.assertRaises(OperationalError):
+                buffer.flush()
+        self.assertEqual(self.counters(), [(2, 0), (0, 0)])
+        self.assertEqual(buffer.pending(first), {})
+        self.assertEqual(buffer.pending(second), {'views_count': 3})
+
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(self.counters(), [(2, 0), (0, 3)])
+        self.assertEqual(buffer.pending(second), {})
+
+
+class PostViewBufferTest(TestCase):
+    """
+    Буфер просмотров: оценщики HyperLogLog горячих постов ограничены
+    по количеству (LRU) и по числу зрителей, загружаемых при создании.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('viewauthor', 2001)
+        cls.viewers = [create_user(f'viewer{i}', 2010 + i) for i in range(4)]
+        cls.posts = [
+            Post.objects.create(author=cls.author, title=f'Post {i}', content='content', status=Post.Status.PUBLISHED)
+            for i in range(3)
+        ]
+
+    def buffer(self, **options) -> PostViewBuffer:
+        return PostViewBuffer(flush_interval=0, estimator_threshold=10, **options)
+
+    def test_cold_posts_are_counted_exactly(self):
+        buffer = self.buffer()
+        buffer.record(self.posts[0].pk, self.viewers[0].pk, views_count=1)
+        self.assertIsNone(buffer.estimate(self.posts[0].pk))
+        self.assertTrue(PostView.objects.filter(post=self.posts[0], user=self.viewers[0]).exists())
+
+    def test_estimators_are_evicted_least_recently_used(self):
+        buffer = self.buffer(estimator_limit=2)
+        first, second, third = (post.pk for post in self.posts)
+        for post_id in (first, second, third):
+            buffer.record(post_id, self.viewers[0].pk, views_count=10)
+        self.assertEqual(list(buffer._estimators), [second, third])
+
+        buffer.record(second, self.viewers[1].pk, views_count=10)
+        buffer.record(first, self.viewers[1].pk, views_count=10)
+        self.assertEqual(list(buffer._estimators), [second, first])
+        self.assertEqual(buffer.estimate(second), 2)
+        # Горячие посты не накапливаются между сбросами
+        self.assertEqual(buffer._hot, set())
+
+    def test_failed_flush_keeps_views(self):
+        buffer = PostViewBuffer(flush_interval=3600, estimator_threshold=10)
+        cold, hot = self.posts[0], self.posts[1]
+        with mock.patch.object(buffer, '_ensure_worker'):
+            buffer.record(cold.pk, self.viewers[0].pk, views_count=0)
+            buffer.record(hot.pk, self.viewers[1].pk, views_count=10)
+
+        with mock.patch.object(QuerySet, 'bulk_create', side_effect=OperationalError('database table is locked')):
+            with self.assertRaises(OperationalError):
+                buffer.flush()
+        self.assertFalse(PostView.objects.exists())
+        # Зритель горячего поста не попал в оценщик до записи
+        self.assertEqual(buffer.estimate(hot.pk), 0)
+
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(PostView.objects.count(), 2)
+        self.assertEqual(buffer.estimate(hot.pk), 1)
+        self.assertEqual(
+            list(Post.objects.filter(pk__in=[cold.pk, hot.pk]).order_by('pk').values_list('views_count', flat=True)),
+            [1, 1],
+        )
+
+    def test_estimator_seed_is_limited(self):
+        post = self.posts[0]
+        PostView.objects.bulk_create([PostView(post=post, user=user) for user in self.viewers[:3]])
+        buffer = self.buffer(estimator_seed_size=2)
+        buffer.record(post.pk, self.viewers[3].pk, views_count=10)
+        self.assertEqual(buffer.estimate(post.pk), 3)
+
+
+class PostSlugTest(TestCase):
+    """
+    Слаги постов: генерация без проверочных запросов и повтор при конфликте.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('slugauthor', 4001)
+
+    def create_post(self, title: str = 'Hello world') -> Post:
+        return Post.objects.create(author=self.author, title=title, content='content')
+
+    def test_generated_slug_is_unique_and_fits_field(self):
+        first, second = self.create_post(), self.create_post()
+        self.assertTrue(first.slug.startswith('hello-world-'))
+        self.assertNotEqual(first.slug, second.slug)
+
+        post = self.create_post('word ' * 100)
+        self.assertLessEqual(len(post.slug), Post._meta.get_field('slug').max_length)
+
+    def test_slug_allocator_ids_are_increasing(self):
+        allocator = SlugAllocator(node=1)
+        ids = [allocator.next_id() for _ in range(5000)]
+        self.assertEqual(ids, sorted(set(ids)))
+
+    def test_conflicting_slug_is_retried(self):
+        taken = self.create_post().slug
+        slugs = iter([taken, 'hello-world-fresh'])
+        with mock.patch.object(slug_allocator, 'make_slug', side_effect=lambda *args: next(slugs)), \
+                mock.patch.object(slug_allocator, 'reseed') as reseed:
+            post = self.create_post()
+        self.assertEqual(post.slug, 'hello-world-fresh')
+        reseed.assert_called_once()
+        self.assertEqual(Post.objects.filter(slug='hello-world-fresh').count(), 1)
+
+    def test_retries_are_limited(self):
+        taken = self.create_post().slug
+        with mock.patch.object(slug_allocator, 'make_slug', return_value=taken) as make_slug:
+            with self.assertRaises(IntegrityError):
+                self.create_post()
+        self.assertEqual(make_slug.call_count, Post.SLUG_ATTEMPTS)
+
+    def test_explicit_slug_conflict_is_not_retried(self):
+        taken = self.create_post().slug
+        with self.assertRaises(IntegrityError):
+            Post.objects.create(author=self.author, title='Other', content='content', slug=taken)
+
+    def test_assign_slugs_for_bulk_create(self):
+        posts = assign_slugs([Post(author=self.author, title='Bulk', content='content') for _ in range(3)])
+        Post.objects.bulk_create(posts)
+        self.assertEqual(len({post.slug for post in posts}), 3)
+
+
+class PostSearchTest(TestCase):
+    """
+    Полнотекстовый поиск: ранжирование, префиксы, исправление опечаток,
+    кеширование результатов между страницами и переиндексация только
+    при изменении текста.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('searchauthor', 5001)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def create_post(self, title: str, content: str) -> Post:
+        return Post.objects.create(author=self.author, title=title, content=content, status=Post.Status.PUBLISHED)
+
+    def search(self, query: str, **params) -> dict:
+        response = self.client.get('/api/posts/search/', {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def search_ids(self, query: str) -> list:
+        return [post['id'] for post in self.search(query)['results']]
+
+    def test_title_matches_rank_first(self):
+        in_content = self.create_post('Notes', 'An introduction to python and django.')
+        in_title = self.create_post('Python tips', 'Short notes about the standard library.')
+        self.create_post('Cooking', 'Nothing relevant here.')
+        self.assertEqual(self.search_ids('python'), [in_title.pk, in_content.pk])
+
+    def test_all_terms_are_required_and_matched_by_prefix(self):
+        both = self.create_post('Django search', 'Full text search with python.')
+        self.create_post('Django admin', 'Customizing the admin site.')
+        self.assertEqual(self.search_ids('djan pyth'), [both.pk])
+        self.assertEqual(self.search_ids('<b>'), [])
+
+    def test_typos_are_corrected(self):
+        post = self.create_post('Kubernetes deployment', '<p>Rolling <b>updates</b> explained.</p>')
+        self.assertEqual(self.search_ids('kubernets'), [post.pk])
+        self.assertEqual(self.search_ids('updtes'), [post.pk])
+
+    def test_pages_reuse_ranked_hits(self):
+        posts = [self.create_post(f'Python {i}', 'python') for i in range(3)]
+        with mock.patch.object(BaseSearchBackend, 'correct', autospec=True, side_effect=lambda self, terms: terms) as correct:
+            first = self.search('python', page_size=2)
+            second = self.client.get(first['next']).json()
+        self.assertEqual(correct.call_count, 1)
+        ids = [post['id'] for post in first['results'] + second['results']]
+        self.assertCountEqual(ids, [post.pk for post in posts])
+
+        # Изменение индекса сбрасывает кешированные результаты
+        added = self.create_post('Python 3', 'python')
+        self.assertIn(added.pk, self.search_ids('python'))
+
+    def test_unchanged_text_is_not_reindexed(self):
+        post = self.create_post('Python', 'content')
+        post = Post.objects.get(pk=post.pk)
+        backend = type(get_search_backend())
+        with mock.patch.object(backend, 'index') as index:
+            post.status = Post.Status.DRAFT
+            post.save()
+            index.assert_not_called()
+
+            post.title = 'Python 3'
+            post.save()
+            index.assert_called_once()
+
+
+@override_settings(TRENDING_WINDOW_HOURS=72, TRENDING_TAG_SIZE=2, TRENDING_LIMIT=50)
+class TrendingTest(TestCase):
+    """
+    Рейтинг популярных постов: пересчёт по окну публикации, сброс
+    устаревших рейтингов и списки популярных постов тегов.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('trendauthor', 7001)
+        cls.tag = Tag.objects.create(tag_name='python')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def create_post(self, views: int = 0, likes: int = 0, comments: int = 0, hours: float = 1,
+                    status: str = Post.Status.PUBLISHED) -> Post:
+        post = Post.objects.create(author=self.author, title='Post', content='content', status=status)
+        Post.objects.filter(pk=post.pk).update(
+            views_count=views, likes_count=likes, comments_count=comments,
+            pub_date=timezone.now() - datetime.timedelta(hours=hours),
+        )
+        post.tag.add(self.tag)
+        return post
+
+    def trending_ids(self, **params) -> list:
+        response = self.client.get('/api/posts/trending/', params)
+        self.assertEqual(response.status_code, 200)
+        return [post['id'] for post in response.json()]
+
+    def test_score_decays_with_age(self):
+        age = datetime.timedelta(hours=1)
+        self.assertGreater(trending_score(10, 0, 0, age), trending_score(10, 0, 0, age * 10))
+        self.assertGreater(trending_score(0, 0, 1, age), trending_score(0, 1, 0, age))
+
+    def test_refresh_ranks_window_posts(self):
+        liked = self.create_post(likes=10)
+        viewed = self.create_post(views=10)
+        self.create_post(views=100, hours=100)
+        self.create_post(views=100, status=Post.Status.DRAFT)
+
+        self.assertEqual(refresh_trending(), 2)
+        self.assertEqual(self.trending_ids(), [liked.pk, viewed.pk])
+
+    def test_refresh_resets_posts_leaving_window(self):
+        post = self.create_post(views=10)
+        refresh_trending()
+        Post.objects.filter(pk=post.pk).update(pub_date=timezone.now() - datetime.timedelta(hours=100))
+
+        refresh_trending()
+        post.refresh_from_db()
+        self.assertEqual(post.trending_score, 0)
+        self.assertEqual(self.trending_ids(), [])
+
+    def test_tag_lists_are_limited(self):
+        posts = [self.create_post(views=views) for views in (1, 3, 2)]
+        refresh_trending()
+        self.assertEqual(self.trending_ids(tag='python'), [posts[1].pk, posts[2].pk])
+        self.assertEqual(self.trending_ids(tag='#python', limit=1), [posts[1].pk])
+
+    def test_save_keeps_score(self):
+        post = self.create_post(views=10)
+        refresh_trending()
+        post = Post.objects.get(pk=post.pk)
+        score = post.trending_score
+        Post.objects.filter(pk=post.pk).update(trending_score=score * 2)
+        post.title = 'Renamed'
+        post.save()
+        post.refresh_from_db()
+        self.assertEqual(post.trending_score, score * 2)
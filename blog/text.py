@@ -0,0 +1,104 @@
+import hashlib
+import re
+from html.parser import HTMLParser
+
+WORD_RE = re.compile(r'\w+')
+
+# Теги, разделяющие слова (в отличие от строчных <b>, <a>, <span> ...)
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'figcaption',
+    'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'img', 'li', 'ol',
+    'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul',
+})
+# Содержимое этих тегов не является текстом
+SKIP_TAGS = frozenset({'script', 'style', 'noscript', 'template'})
+
+
+class WordCounter(HTMLParser):
+    """
+    Потоковый подсчёт слов в HTML (контент CKEditor).
+
+    Разметка отбрасывается парсером, слова считаются по мере поступления
+    текста, поэтому очищенная от тегов строка целиком не строится.
+    Слово, разорванное строчным тегом (he<b>llo</b>), считается одним.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.count = 0
+        self._in_word = False
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        if tag in BLOCK_TAGS or tag in SKIP_TAGS:
+            self._in_word = False
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        if tag in BLOCK_TAGS or tag in SKIP_TAGS:
+            self._in_word = False
+
+    def handle_data(self, data):
+        if self._skip_depth or not data:
+            return
+        for match in WORD_RE.finditer(data):
+            # Начало текста продолжает слово из предыдущего фрагмента
+            if not (match.start() == 0 and self._in_word):
+                self.count += 1
+        self._in_word = bool(WORD_RE.fullmatch(data[-1]))
+
+
+class TextExtractor(WordCounter):
+    """
+    Извлекает текст из HTML для поискового индекса: фрагменты текста
+    собираются в список, блочные теги разделяют слова пробелом.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        super().handle_starttag(tag, attrs)
+        if tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_endtag(self, tag):
+        super().handle_endtag(tag)
+        if tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    """
+    Возвращает текст HTML без разметки.
+    """
+    extractor = TextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return ''.join(extractor.parts)
+
+
+def count_words(html: str, chunk_size: int = 65536) -> int:
+    """
+    Возвращает количество слов в HTML, передавая его парсеру частями.
+    """
+    counter = WordCounter()
+    for start in range(0, len(html), chunk_size):
+        counter.feed(html[start:start + chunk_size])
+    counter.close()
+    return counter.count
+
+
+def content_hash(content: str) -> str:
+    """
+    Хеш контента для определения, изменился ли текст поста.
+    """
+    return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
@@ -0,0 +1,225 @@
+import atexit
+import hashlib
+import math
+import threading
+from collections import Counter, OrderedDict, defaultdict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from blog.counters import BackgroundFlushBuffer, post_counters
+
+
+class HyperLogLog:
+    """
+    Вероятностная оценка количества уникальных элементов (HyperLogLog).
+
+    Занимает 2 ** precision байт независимо от числа элементов;
+    относительная погрешность около 1.04 / sqrt(2 ** precision)
+    (~1.6% при precision=12).
+    """
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+        self.alpha = 0.7213 / (1 + 1.079 / self.size)
+
+    def add(self, value) -> None:
+        digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+        index = hashed >> (64 - self.precision)
+        rest = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        estimate = self.alpha * self.size ** 2 / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        # Для небольших множеств точнее линейный подсчёт
+        if estimate <= 2.5 * self.size and zeros:
+            estimate = self.size * math.log(self.size / zeros)
+        return round(estimate)
+
+
+class PostViewBuffer(BackgroundFlushBuffer):
+    """
+    Буфер просмотров постов (write-behind).
+
+    Просмотр (post_id, user_id) и время первого просмотра запоминаются
+    в памяти процесса; при сбросе пары одной пачкой записываются в PostView через
+    bulk_create(ignore_conflicts=True), а views_count увеличивается на число
+    действительно новых зрителей через буфер счётчиков.
+
+    Для «горячих» постов (views_count не меньше estimator_threshold) точная
+    проверка существующих пар не выполняется: прирост views_count
+    оценивается по HyperLogLog, который один раз заполняется последними
+    estimator_seed_size зрителями поста. В памяти хранится не больше
+    estimator_limit оценщиков: давно не использованные вытесняются (LRU).
+    Точное значение восстанавливает команда reconcile_post_counters.
+    """
+    worker_name = 'post-view-flush'
+
+    def __init__(self, flush_interval: float = None, flush_size: int = None,
+                 estimator_threshold: int = None, estimator_limit: int = None,
+                 estimator_seed_size: int = None):
+        self.flush_interval = flush_interval if flush_interval is not None else getattr(
+            settings, 'POST_VIEWS_FLUSH_INTERVAL', 5.0
+        )
+        self.flush_size = flush_size if flush_size is not None else getattr(
+            settings, 'POST_VIEWS_FLUSH_SIZE', 1000
+        )
+        self.estimator_threshold = estimator_threshold if estimator_threshold is not None else getattr(
+            settings, 'POST_VIEWS_ESTIMATOR_THRESHOLD', 0
+        )
+        self.estimator_limit = estimator_limit if estimator_limit is not None else getattr(
+            settings, 'POST_VIEWS_ESTIMATOR_LIMIT', 256
+        )
+        self.estimator_seed_size = estimator_seed_size if estimator_seed_size is not None else getattr(
+            settings, 'POST_VIEWS_ESTIMATOR_SEED_SIZE', 50000
+        )
+        self._pending = {}
+        self._hot = set()
+        self._estimators = OrderedDict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._worker = None
+
+    def record(self, post_id: int, user_id: int, views_count: int = 0) -> None:
+        """
+        Добавляет просмотр поста пользователем в буфер.
+
+        Args:
+            post_id (int): ID поста.
+            user_id (int): ID пользователя.
+            views_count (int): Текущее значение счётчика просмотров поста.
+        """
+        with self._lock:
+            self._pending.setdefault((post_id, user_id), timezone.now())
+            if self.estimator_threshold and views_count >= self.estimator_threshold:
+                self._hot.add(post_id)
+            overflow = len(self._pending) >= self.flush_size
+
+        if self.flush_interval <= 0 or overflow:
+            self.flush()
+        else:
+            self._ensure_worker()
+
+    def estimate(self, post_id: int):
+        """
+        Возвращает оценку числа уникальных зрителей горячего поста или None.
+        """
+        estimator = self._estimators.get(post_id)
+        return estimator.count() if estimator is not None else None
+
+    def flush(self) -> int:
+        """
+        Сбрасывает накопленные просмотры в базу данных.
+
+        Оценщики горячих постов и счётчики просмотров обновляются только после
+        записи просмотров; если запись не удалась, просмотры возвращаются
+        в буфер, а ошибка пробрасывается.
+
+        Returns:
+            int: Количество новых (или оценённых как новые) просмотров.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            # Пост остаётся горячим, пока его просматривают: множество заполняется заново
+            hot, self._hot = self._hot, set()
+        if not pending:
+            return 0
+
+        with self._flush_lock:
+            try:
+                exact = {pair for pair in pending if pair[0] not in hot}
+                new_views = Counter()
+                if exact:
+                    new_views.update(post_id for post_id, _ in exact - self._existing(exact))
+                # Оценщики заполняются зрителями из базы до записи новых просмотров
+                hot_viewers = {
+                    post_id: (self._estimator(post_id), user_ids)
+                    for post_id, user_ids in self._group(pending.keys() - exact).items()
+                }
+
+                through = self.model
+                through.objects.bulk_create(
+                    [
+                        through(post_id=post_id, user_id=user_id, viewed_at=viewed_at)
+                        for (post_id, user_id), viewed_at in pending.items()
+                    ],
+                    batch_size=self.flush_size,
+                    ignore_conflicts=True,
+                )
+            except Exception:
+                self._restore(pending, hot)
+                raise
+
+            for post_id, (estimator, user_ids) in hot_viewers.items():
+                before = estimator.count()
+                for user_id in user_ids:
+                    estimator.add(user_id)
+                new_views[post_id] += max(estimator.count() - before, 0)
+
+        for post_id, delta in new_views.items():
+            if delta:
+                post_counters.increment(post_id, 'views_count', delta)
+        return sum(new_views.values())
+
+    def _restore(self, pending: dict, hot: set) -> None:
+        """
+        Возвращает в буфер просмотры, которые не удалось записать.
+        """
+        with self._lock:
+            for pair, viewed_at in pending.items():
+                self._pending[pair] = min(viewed_at, self._pending.get(pair, viewed_at))
+            self._hot |= hot
+
+    @property
+    def model(self):
+        from blog.models import Post
+        return Post.viewers.through
+
+    @staticmethod
+    def _group(pairs) -> dict:
+        grouped = defaultdict(set)
+        for post_id, user_id in pairs:
+            grouped[post_id].add(user_id)
+        return grouped
+
+    def _existing(self, pairs: set) -> set:
+        """
+        Возвращает уже записанные пары (post_id, user_id) одним запросом.
+        """
+        condition = Q(pk__in=[])
+        for post_id, user_ids in self._group(pairs).items():
+            condition |= Q(post_id=post_id, user_id__in=user_ids)
+        return set(self.model.objects.filter(condition).values_list('post_id', 'user_id'))
+
+    def _estimator(self, post_id: int) -> HyperLogLog:
+        """
+        Возвращает HyperLogLog поста, при первом обращении заполняя его зрителями из базы.
+        """
+        estimator = self._estimators.get(post_id)
+        if estimator is None:
+            estimator = self._estimators[post_id] = HyperLogLog()
+            # Давние зрители в оценщик не попадают: их повторный просмотр может
+            # завысить прирост, что исправляет reconcile_post_counters
+            viewers = (
+                self.model.objects.filter(post_id=post_id).order_by('-viewed_at')
+                .values_list('user_id', flat=True)[:self.estimator_seed_size]
+            )
+            for user_id in viewers.iterator(chunk_size=5000):
+                estimator.add(user_id)
+            while len(self._estimators) > self.estimator_limit:
+                self._estimators.popitem(last=False)
+        else:
+            self._estimators.move_to_end(post_id)
+        return estimator
+
+
+post_views = PostViewBuffer()
+# Просмотры сбрасываются раньше счётчиков: atexit вызывает обработчики в обратном порядке
+atexit.register(post_views.flush_at_exit)
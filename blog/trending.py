@@ -0,0 +1,97 @@
+import datetime
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from blog.models import Post, TrendingTagPost
+from common.cache import invalidate_namespace
+
+
+def trending_score(views: int, likes: int, comments: int, age: datetime.timedelta) -> float:
+    """
+    Рейтинг поста по формуле Hacker News: взвешенная сумма просмотров,
+    лайков и комментариев, делённая на (возраст в часах + 2) ** TRENDING_GRAVITY.
+    """
+    points = (
+        views * settings.TRENDING_VIEW_WEIGHT
+        + likes * settings.TRENDING_LIKE_WEIGHT
+        + comments * settings.TRENDING_COMMENT_WEIGHT
+    )
+    hours = max(age.total_seconds(), 0) / 3600
+    return points / (hours + 2) ** settings.TRENDING_GRAVITY
+
+
+def refresh_trending(window: datetime.timedelta = None, batch_size: int = 1000) -> int:
+    """
+    Пересчитывает рейтинг постов, опубликованных за окно window
+    (по умолчанию TRENDING_WINDOW_HOURS), и списки популярных постов тегов.
+
+    Обрабатываются только посты окна: рейтинг более старых постов
+    сбрасывается в 0 одним UPDATE по индексу рейтинга. Счётчики берутся
+    из денормализованных полей поста, поэтому сырые данные не читаются.
+
+    Returns:
+        int: Количество постов с ненулевым рейтингом.
+    """
+    now = timezone.now()
+    since = now - (window or datetime.timedelta(hours=settings.TRENDING_WINDOW_HOURS))
+    published = Post.objects.filter(status=Post.Status.PUBLISHED)
+
+    scores = {}
+    rows = (
+        published.filter(pub_date__gte=since)
+        .values_list('pk', 'views_count', 'likes_count', 'comments_count', 'pub_date')
+        .order_by()
+    )
+    for pk, views, likes, comments, pub_date in rows.iterator(chunk_size=batch_size):
+        scores[pk] = trending_score(views, likes, comments, now - pub_date)
+
+    tagged = defaultdict(list)
+    pairs = Post.tag.through.objects.filter(post_id__in=published.filter(pub_date__gte=since).values('pk'))
+    for post_id, tag_id in pairs.values_list('post_id', 'tag_id').iterator(chunk_size=batch_size):
+        if scores.get(post_id):
+            tagged[tag_id].append((scores[post_id], post_id))
+
+    with transaction.atomic():
+        Post.objects.filter(trending_score__gt=0).exclude(
+            Q(status=Post.Status.PUBLISHED) & Q(pub_date__gte=since)
+        ).update(trending_score=0)
+        Post.objects.bulk_update(
+            [Post(pk=pk, trending_score=score) for pk, score in scores.items()],
+            ['trending_score'],
+            batch_size=batch_size,
+        )
+        TrendingTagPost.objects.all().delete()
+        TrendingTagPost.objects.bulk_create(
+            [
+                TrendingTagPost(tag_id=tag_id, post_id=post_id, score=score)
+                for tag_id, entries in tagged.items()
+                for score, post_id in heapq.nlargest(settings.TRENDING_TAG_SIZE, entries)
+            ],
+            batch_size=batch_size,
+        )
+
+    invalidate_namespace('posts')
+    return sum(1 for score in scores.values() if score)
+
+
+def get_trending(queryset, tag_name: str = None, limit: int = None):
+    """
+    Возвращает популярные посты: чтение первых limit строк по индексу рейтинга
+    (или по списку популярных постов тега), без сортировки всех постов.
+    """
+    limit = limit or settings.TRENDING_LIMIT
+    if tag_name is None:
+        return queryset.filter(
+            status=Post.Status.PUBLISHED, trending_score__gt=0
+        ).order_by('-trending_score', '-id')[:limit]
+
+    tag_name = tag_name if tag_name.startswith('#') else f"#{tag_name}"
+    return queryset.filter(
+        status=Post.Status.PUBLISHED,
+        trending_tags__tag__tag_name=tag_name,
+    ).order_by('-trending_tags__score', '-id')[:limit]
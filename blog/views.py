@@ -1,16 +1,27 @@
-from django.db.models import Count
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from django.conf import settings
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from rest_framework import generics
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, AllowAny, IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
+from blog.feed import FeedPagination
+from blog.filters import PostFilter
 from blog.models import Post
-from blog.serializer import PostSerializer
+from blog.search import SearchPagination, get_search_backend
+from blog.serializer import PostSerializer, PostListSerializer
+from blog.tracking import post_views
+from blog.trending import get_trending
+from common.cache import CachedResponseMixin
+from common.pagination import PostKeysetPagination
 
 
 @extend_schema_view(
     list=extend_schema(
         summary="Получить список постов",
         description="Возвращает все посты в системе. Доступно для всех пользователей.",
+        responses={200: PostListSerializer(many=True)},
         tags=["Posts"],
     ),
     retrieve=extend_schema(
@@ -46,7 +57,7 @@ from blog.serializer import PostSerializer
         tags=["Posts"],
     ),
 )
-class PostViewSet(ModelViewSet):
+class PostViewSet(CachedResponseMixin, ModelViewSet):
     """
     Представление для управления постами в блоге.
 
@@ -57,17 +68,34 @@ class PostViewSet(ModelViewSet):
         - update: Полное обновление существующего поста.
         - partial_update: Частичное обновление поста.
         - destroy: Удалить пост.
+        - search: Полнотекстовый поиск по заголовку и контенту.
+        - trending: Популярные посты (общий список или по тегу).
+
+    Ответы list и retrieve для анонимных пользователей кешируются (common.cache).
     """
     serializer_class = PostSerializer
     queryset = Post.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    pagination_class = PostKeysetPagination
+    filter_backends = (DjangoFilterBackend,)
+    filterset_class = PostFilter
+    cache_namespaces = ('posts',)
+    cache_actions = ('list', 'retrieve', 'search', 'trending')
+    last_modified_field = 'updated_at'
 
     def get_queryset(self):
-        return (
-            Post.objects.
-            select_related('author').all()
-            .annotate(num_views=Count('viewers'))
-        )
+        queryset = Post.objects.select_related('author').all()
+        if self.action in ('list', 'search', 'trending'):
+            queryset = queryset.prefetch_related('tag')
+        return queryset
+
+    def get_serializer_class(self):
+        """
+        Для списка используется сериализатор с фиксированным числом запросов на страницу.
+        """
+        if self.action in ('list', 'search', 'trending'):
+            return PostListSerializer
+        return super().get_serializer_class()
 
     # def get_permissions(self):
     #     if self.action in ['list', 'retrieve']:  # ← Разрешаем всем только просмотр
@@ -75,12 +103,65 @@ class PostViewSet(ModelViewSet):
     #     return [IsAuthenticated()]  # ← А остальное только авторизованным
 
     def retrieve(self, request, *args, **kwargs):
+        """
+        Возвращает пост. Просмотр записывается в буфер и сохраняется в базу
+        пачкой в фоне, поэтому чтение поста не выполняет запросов на запись.
+        """
         post = self.get_object()
-        if self.request.user.is_authenticated and not post.viewers.filter(pk=request.user.pk).exists():
-            post.viewers.add(request.user)
-            post.save()
+        if request.user.is_authenticated:
+            post_views.record(post.pk, request.user.pk, post.views_count)
+
+        serializer = self.get_serializer(post)
+        return Response(serializer.data)
+
+    @extend_schema(
+        summary="Поиск постов",
+        description=(
+            "Полнотекстовый поиск по заголовку и контенту постов с ранжированием по релевантности. "
+            "Слова запроса ищутся по префиксу, опечатки исправляются по словарю индекса. "
+            "Результаты можно отфильтровать по тегу, автору и статусу."
+        ),
+        parameters=[OpenApiParameter('q', str, required=True, description="Поисковый запрос.")],
+        responses={200: PostListSerializer(many=True)},
+        tags=["Posts"],
+    )
+    @action(detail=False, methods=['get'], url_path='search', pagination_class=SearchPagination)
+    def search(self, request, *args, **kwargs):
+        """
+        Возвращает страницу постов, найденных по запросу q.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        hits = get_search_backend(queryset.db).search(request.query_params.get('q', ''))
+        page = self.paginator.paginate_hits(queryset, request, hits)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
-        return super().retrieve(request, *args, **kwargs)
+    @extend_schema(
+        summary="Популярные посты",
+        description=(
+            "Возвращает опубликованные посты с наибольшим рейтингом популярности: взвешенная сумма "
+            "просмотров, лайков и комментариев с затуханием по времени. Рейтинг пересчитывается "
+            "периодически командой refresh_trending."
+        ),
+        parameters=[
+            OpenApiParameter('tag', str, description="Название тега (с символом '#' или без него)."),
+            OpenApiParameter('limit', int, description="Количество постов (не больше TRENDING_LIMIT)."),
+        ],
+        responses={200: PostListSerializer(many=True)},
+        tags=["Posts"],
+    )
+    @action(detail=False, methods=['get'], url_path='trending', pagination_class=None, filter_backends=())
+    def trending(self, request, *args, **kwargs):
+        """
+        Возвращает популярные посты, при указании tag — популярные посты тега.
+        """
+        try:
+            limit = min(int(request.query_params.get('limit', settings.TRENDING_LIMIT)), settings.TRENDING_LIMIT)
+        except ValueError:
+            limit = settings.TRENDING_LIMIT
+        posts = get_trending(self.get_queryset(), request.query_params.get('tag') or None, max(limit, 1))
+        serializer = self.get_serializer(posts, many=True)
+        return Response(serializer.data)
 
     def perform_create(self, serializer):
         """
@@ -95,7 +176,7 @@ class PostViewSet(ModelViewSet):
             "Пользователь должен быть аутентифицирован для использования данного эндпоинта."
         ),
         responses={
-            200: PostSerializer(many=True),
+            200: PostListSerializer(many=True),
             401: {"detail": "Учетные данные не были предоставлены."}
         },
         tags=['Posts'],
@@ -104,14 +185,21 @@ class UserFeedView(generics.ListAPIView):
     """
        Представление для получения пользовательской ленты постов.
     """
-    serializer_class = PostSerializer
+    serializer_class = PostListSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = FeedPagination
 
     def get_queryset(self):
         """
-         Возвращает список постов от пользователей, на которых подписан текущий пользователь.
+         Возвращает базовый queryset постов; состав ленты определяет хранилище лент.
          """
-        profile = self.request.user.profile
-        following_users = profile.following.all()
-        queryset = Post.objects.all().filter(author__in=following_users)
-        return queryset
+        return Post.objects.select_related('author').prefetch_related('tag')
+
+    def list(self, request, *args, **kwargs):
+        """
+        Читает страницу материализованной ленты текущего пользователя.
+        """
+        page = self.paginator.paginate_feed(self.get_queryset(), request, request.user.pk)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
@@ -0,0 +1,187 @@
+from collections import defaultdict
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, Q
+
+from blog.counters import post_counters
+from blog.models import Post
+from comments.models import Comment, Like
+from comments.signals import likes_deleted
+from common.cache import invalidate_namespace
+
+
+def get_likeable_types() -> dict:
+    """
+    Возвращает модели, которые можно лайкнуть: {имя модели: ContentType}.
+    ContentType берутся из кеша менеджера, запросов к базе нет.
+    """
+    return {
+        content_type.model: content_type
+        for content_type in ContentType.objects.get_for_models(Post, Comment).values()
+    }
+
+
+def _pairs_filter(keys) -> Q:
+    """
+    Условие на набор пар (content_type_id, object_id): по одному IN на тип контента.
+    """
+    grouped = defaultdict(set)
+    for content_type_id, object_id in keys:
+        grouped[content_type_id].add(object_id)
+    condition = Q(pk__in=[])
+    for content_type_id, object_ids in grouped.items():
+        condition |= Q(content_type_id=content_type_id, object_id__in=object_ids)
+    return condition
+
+
+def count_likes(keys) -> dict:
+    """
+    Возвращает количество лайков для пар (content_type_id, object_id) одним запросом.
+    """
+    if not keys:
+        return {}
+    rows = (
+        Like.objects.filter(_pairs_filter(keys))
+        .values('content_type_id', 'object_id')
+        .annotate(total=Count('pk'))
+        .values_list('content_type_id', 'object_id', 'total')
+    )
+    counts = dict.fromkeys(keys, 0)
+    counts.update({(content_type_id, object_id): total for content_type_id, object_id, total in rows})
+    return counts
+
+
+def annotate_like_state(objects, user, with_counts: bool = True) -> None:
+    """
+    Проставляет объектам страницы количество лайков (_likes_count)
+    и признак лайка текущего пользователя (_liked_by_me).
+
+    Выполняет не больше двух запросов на всю страницу: сгруппированный
+    подсчёт лайков (если with_counts) и проверку лайков пользователя.
+    """
+    objects = [obj for obj in objects if obj.pk is not None]
+    if not objects:
+        return
+    content_type = ContentType.objects.get_for_model(objects[0])
+    likes = Like.objects.filter(content_type=content_type, object_id__in=[obj.pk for obj in objects])
+
+    counts = {}
+    if with_counts:
+        counts = dict(
+            likes.values('object_id').annotate(total=Count('pk')).values_list('object_id', 'total')
+        )
+    liked = set()
+    if user is not None and user.is_authenticated:
+        liked = set(likes.filter(author=user).values_list('object_id', flat=True))
+
+    for obj in objects:
+        if with_counts:
+            obj._likes_count = counts.get(obj.pk, 0)
+        obj._liked_by_me = obj.pk in liked
+
+
+def apply_likes(user, items: list) -> list:
+    """
+    Приводит лайки пользователя к желаемому состоянию за фиксированное число запросов.
+
+    Операция идемпотентна: повторная отправка тех же элементов ничего
+    не меняет. Для одного объекта учитывается последний элемент запроса.
+
+    Запросы: по одному IN на тип контента для проверки существования объектов,
+    один запрос текущих лайков пользователя, один bulk_create, один запрос
+    действительно вставленных лайков, один DELETE и один сгруппированный
+    подсчёт лайков. Лайк, который параллельный запрос успел поставить раньше,
+    не считается созданным и не увеличивает счётчик. Об удалённых лайках сообщается
+    одним сигналом likes_deleted.
+
+    Args:
+        user (User): Автор лайков.
+        items (list): Элементы {'content_type': str, 'object_id': int, 'liked': bool}.
+
+    Returns:
+        list: Результат по каждому уникальному объекту: итоговое состояние,
+        статус (created, deleted, unchanged, not_found) и количество лайков.
+    """
+    types = get_likeable_types()
+    desired = {}
+    for item in items:
+        content_type = types[item['content_type']]
+        desired[(content_type.pk, item['object_id'])] = item['liked']
+
+    # Существование объектов: один IN-запрос на тип контента
+    found = set()
+    by_type = defaultdict(list)
+    for content_type_id, object_id in desired:
+        by_type[content_type_id].append(object_id)
+    for content_type_id, object_ids in by_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        found.update(
+            (content_type_id, pk) for pk in model.objects.filter(pk__in=object_ids).values_list('pk', flat=True)
+        )
+
+    existing = {}
+    if found:
+        rows = Like.objects.filter(_pairs_filter(found), author=user).values_list(
+            'content_type_id', 'object_id', 'created_at'
+        )
+        existing = {(content_type_id, object_id): created_at for content_type_id, object_id, created_at in rows}
+
+    to_create = [key for key in found if desired[key] and key not in existing]
+    to_delete = [key for key in found if not desired[key] and key in existing]
+
+    with transaction.atomic():
+        if to_create:
+            likes = [
+                Like(author=user, content_type_id=content_type_id, object_id=object_id)
+                for content_type_id, object_id in to_create
+            ]
+            Like.objects.bulk_create(likes, ignore_conflicts=True)
+            # bulk_create проставляет created_at объектам: вставленными считаются строки с тем же временем
+            attempted = {(like.content_type_id, like.object_id): like.created_at for like in likes}
+            rows = Like.objects.filter(_pairs_filter(to_create), author=user).values_list(
+                'content_type_id', 'object_id', 'created_at'
+            )
+            to_create = [
+                (content_type_id, object_id) for content_type_id, object_id, created_at in rows
+                if attempted.get((content_type_id, object_id)) == created_at
+            ]
+        if to_delete:
+            Like.objects.filter(_pairs_filter(to_delete), author=user).delete()
+
+    post_type_id = types['post'].pk
+    for keys, delta in ((to_create, 1), (to_delete, -1)):
+        for content_type_id, object_id in keys:
+            if content_type_id == post_type_id:
+                post_counters.increment(object_id, 'likes_count', delta)
+    if to_create or to_delete:
+        invalidate_namespace('posts')
+    if to_delete:
+        likes_deleted.send(sender=Like, likes=[
+            Like(author=user, content_type_id=content_type_id, object_id=object_id,
+                 created_at=existing[(content_type_id, object_id)])
+            for content_type_id, object_id in to_delete
+        ])
+
+    counts = count_likes(list(found))
+    created, deleted = set(to_create), set(to_delete)
+    names = {content_type.pk: name for name, content_type in types.items()}
+    results = []
+    for key, liked in desired.items():
+        content_type_id, object_id = key
+        if key not in found:
+            status = 'not_found'
+        elif key in created:
+            status = 'created'
+        elif key in deleted:
+            status = 'deleted'
+        else:
+            status = 'unchanged'
+        results.append({
+            'content_type': names[content_type_id],
+            'object_id': object_id,
+            'liked': liked if key in found else False,
+            'status': status,
+            'likes_count': counts.get(key, 0),
+        })
+    return results
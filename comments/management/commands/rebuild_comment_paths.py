@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from comments.models import Comment, PATH_SEGMENT_LENGTH, encode_path_segment
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает материализованные пути и глубину всех комментариев."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Количество комментариев в одном UPDATE.",
+        )
+
+    def handle(self, *args, **options):
+        # В памяти держим только пары (id, parent_id) — O(n) по количеству комментариев
+        parents = dict(Comment.objects.order_by().values_list('pk', 'parent_id').iterator())
+        paths = {}
+
+        for pk in parents:
+            # Поднимаемся до первого предка с уже известным путём
+            chain = []
+            current = pk
+            while current is not None and current not in paths:
+                chain.append(current)
+                current = parents.get(current)
+            prefix = paths.get(current, '')
+            for node in reversed(chain):
+                prefix += encode_path_segment(node)
+                paths[node] = prefix
+
+        comments = [
+            Comment(pk=pk, path=path, depth=len(path) // PATH_SEGMENT_LENGTH - 1)
+            for pk, path in paths.items()
+        ]
+        Comment.objects.bulk_update(comments, ['path', 'depth'], batch_size=options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f"Обновлено комментариев: {len(comments)}"))
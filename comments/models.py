@@ -1,6 +1,8 @@
 from django.contrib.contenttypes.fields import GenericForeignKey, GenericRelation
 from django.contrib.contenttypes.models import ContentType
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Substr
 
 
 
@@ -25,6 +27,64 @@ class Tag(models.Model):
         return self.tag_name
 
 
+PATH_SEGMENT_LENGTH = 7
+PATH_ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def encode_path_segment(pk: int) -> str:
+    """
+    Кодирует ID комментария в сегмент материализованного пути фиксированной
+    длины (base36), чтобы лексикографический порядок путей совпадал с порядком ID.
+    """
+    segment = ''
+    while pk:
+        pk, remainder = divmod(pk, 36)
+        segment = PATH_ALPHABET[remainder] + segment
+    return segment.rjust(PATH_SEGMENT_LENGTH, '0')
+
+
+class CommentQuerySet(models.QuerySet):
+    """
+    Запросы по иерархии комментариев через материализованный путь.
+    Каждый метод разрешается одним запросом по индексу path или pk.
+    """
+
+    def roots(self):
+        """
+        Комментарии верхнего уровня.
+        """
+        return self.filter(depth=0)
+
+    def subtree(self, comment, include_self: bool = True):
+        """
+        Комментарий и все его ответы любой вложенности.
+        """
+        queryset = self.filter(path__startswith=comment.path)
+        return queryset if include_self else queryset.exclude(pk=comment.pk)
+
+    def ancestors(self, comment, include_self: bool = False):
+        """
+        Цепочка родителей комментария от корня ветки.
+        """
+        ids = comment.ancestor_ids + ([comment.pk] if include_self else [])
+        return self.filter(pk__in=ids).order_by('depth')
+
+    def with_descendant_count(self):
+        """
+        Аннотирует каждый комментарий количеством ответов любой вложенности.
+        """
+        descendants = (
+            Comment.objects.filter(path__startswith=OuterRef('path'))
+            .exclude(pk=OuterRef('pk'))
+            .values('post')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        return self.annotate(
+            descendant_count=Coalesce(Subquery(descendants, output_field=IntegerField()), 0)
+        )
+
+
 class Comment(models.Model):
     """
     Модель комментария к посту.
@@ -34,6 +94,8 @@ class Comment(models.Model):
         user (User): Пользователь, оставивший комментарий.
         content (str): Текст комментария.
         parent (Comment): Родительский комментарий (для вложенности).
+        path (str): Материализованный путь: сегменты ID всех предков и самого комментария.
+        depth (int): Глубина вложенности (0 — комментарий верхнего уровня).
         created_at (datetime): Дата создания комментария.
         updated_at (datetime): Дата обновления комментария.
     """
@@ -53,13 +115,98 @@ class Comment(models.Model):
         blank=True,
         null=True
     )
+    path = models.CharField(max_length=512, blank=True, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
     likes = GenericRelation('Like')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset-пагинация комментариев поста по (created_at, id)
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_id_idx'),
+            # Поиск поддерева по префиксу пути (LIKE 'path%')
+            models.Index(fields=['path'], name='comment_path_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
     def __str__(self):
         return f'Комментарий от {self.author} к посту {self.post}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Запоминает родителя, с которым комментарий был загружен, чтобы отследить перенос ветки.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_parent_id = instance.__dict__.get('parent_id')
+        return instance
+
+    @property
+    def ancestor_ids(self) -> list:
+        """
+        ID предков комментария, вычисленные из пути без обращения к базе.
+        """
+        segments = [
+            self.path[i:i + PATH_SEGMENT_LENGTH]
+            for i in range(0, len(self.path) - PATH_SEGMENT_LENGTH, PATH_SEGMENT_LENGTH)
+        ]
+        return [int(segment, 36) for segment in segments]
+
+    @property
+    def thread_root_id(self) -> int:
+        """
+        ID комментария верхнего уровня, с которого начинается ветка.
+        """
+        return int(self.path[:PATH_SEGMENT_LENGTH], 36) if self.path else self.pk
+
+    def get_descendant_count(self) -> int:
+        """
+        Количество ответов любой вложенности.
+        """
+        return Comment.objects.subtree(self, include_self=False).count()
+
+    def build_path(self) -> str:
+        parent_path = self.parent.path if self.parent_id else ''
+        return parent_path + encode_path_segment(self.pk)
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет комментарий и поддерживает материализованный путь:
+        вычисляет его для нового комментария и переносит поддерево при смене родителя.
+        """
+        adding = self._state.adding
+        moved = not adding and getattr(self, '_loaded_parent_id', self.parent_id) != self.parent_id
+
+        if moved and self.parent_id and self.parent.path.startswith(self.path):
+            raise ValueError("Комментарий нельзя сделать ответом на собственный ответ.")
+
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+            if adding or moved or not self.path:
+                old_path, new_path = self.path, self.build_path()
+                new_depth = len(new_path) // PATH_SEGMENT_LENGTH - 1
+                if old_path and moved:
+                    Comment.objects.filter(path__startswith=old_path).update(
+                        path=Concat(Value(new_path), Substr('path', len(old_path) + 1)),
+                        depth=F('depth') + (new_depth - self.depth),
+                    )
+                else:
+                    Comment.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+                self.path, self.depth = new_path, new_depth
+
+        self._loaded_parent_id = self.parent_id
+
+    def delete(self, *args, **kwargs):
+        """
+        Удаляет комментарий вместе со всем поддеревом, выбранным одним запросом по пути.
+        """
+        if not self.path:
+            return super().delete(*args, **kwargs)
+        return Comment.objects.subtree(self).delete()
+
 
 class Like(models.Model):
     author = models.ForeignKey(
@@ -76,6 +223,10 @@ class Like(models.Model):
 
     class Meta:
         unique_together = ('author', 'content_type', 'object_id')
+        indexes = [
+            # Подсчёт лайков страницы объектов: content_type = ... AND object_id IN (...)
+            models.Index(fields=['content_type', 'object_id'], name='like_content_object_idx'),
+        ]
 
     def __str__(self):
         return f'Like by {self.author} on {self.content_object}'
\ No newline at end of file
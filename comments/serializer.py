@@ -1,10 +1,56 @@
+from django.conf import settings
 from django.contrib.contenttypes.models import ContentType
+from django.db import models
 from rest_framework import serializers
 
+from comments.likes import annotate_like_state
 from users.api.nested.profile import ProfileSerializerShort
 from .models import Comment, Tag, Like
 
 
+class LikeStateListSerializer(serializers.ListSerializer):
+    """
+    Список объектов с лайками: состояние лайков загружается для всей
+    страницы сразу (см. comments.likes.annotate_like_state).
+    """
+
+    def to_representation(self, data):
+        objects = list(data.all() if isinstance(data, models.manager.BaseManager) else data)
+        annotate_like_state(objects, self.child.get_request_user(), with_counts=self.child.count_likes)
+        return super().to_representation(objects)
+
+
+class LikeStateSerializer(serializers.Serializer):
+    """
+    Добавляет к объекту поля likes_count и liked_by_me.
+
+    В Meta наследника нужно указать list_serializer_class = LikeStateListSerializer.
+    Если count_likes = False, количество лайков берётся из поля модели likes_count.
+    """
+    count_likes = True
+
+    likes_count = serializers.SerializerMethodField()
+    liked_by_me = serializers.SerializerMethodField()
+
+    def get_request_user(self):
+        request = self.context.get('request')
+        return getattr(request, 'user', None)
+
+    def _ensure_like_state(self, obj) -> None:
+        if not hasattr(obj, '_liked_by_me'):
+            annotate_like_state([obj], self.get_request_user(), with_counts=self.count_likes)
+
+    def get_likes_count(self, obj) -> int:
+        if not self.count_likes:
+            return obj.likes_count
+        self._ensure_like_state(obj)
+        return obj._likes_count
+
+    def get_liked_by_me(self, obj) -> bool:
+        self._ensure_like_state(obj)
+        return obj._liked_by_me
+
+
 class TagSerializer(serializers.ModelSerializer):
     """
     Сериализатор для тега.
@@ -14,12 +60,14 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ('id', 'tag_name')
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(LikeStateSerializer, serializers.ModelSerializer):
     """
     Сериализатор для комментария.
+
+    Вложенные ответы (replies) не загружаются сериализатором: их добавляет
+    comments.tree.build_comment_tree по одному запросу ветки.
     """
     author = serializers.StringRelatedField(read_only=True)
-    replies = serializers.SerializerMethodField(read_only=True)
     created_at = serializers.DateTimeField(read_only=True)
     updated_at = serializers.DateTimeField(read_only=True)
 
@@ -27,15 +75,61 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = (
             'id', 'post', 'author', 'content', 'parent',
-            'created_at', 'updated_at', 'replies'
+            'created_at', 'updated_at', 'likes_count', 'liked_by_me'
         )
-    @classmethod
-    def get_replies(cls, obj):
-        """
-        Получает вложенные комментарии (ответы).
-        """
-        replies = obj.replies.all()
-        return CommentSerializer(replies, many=True).data
+        list_serializer_class = LikeStateListSerializer
+
+class CommentNodeSerializer(LikeStateSerializer, serializers.ModelSerializer):
+    """
+    Сериализатор узла дерева комментариев (без вложенных ответов).
+    Ответы связываются с узлами в comments.tree.build_comment_tree.
+    """
+    author = serializers.StringRelatedField(read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = (
+            'id', 'post', 'author', 'content', 'parent',
+            'created_at', 'updated_at', 'likes_count', 'liked_by_me'
+        )
+        list_serializer_class = LikeStateListSerializer
+
+
+class CommentTreeSerializer(serializers.Serializer):
+    """
+    Схема ответа эндпоинта дерева комментариев.
+    """
+    results = serializers.ListField(child=serializers.DictField())
+    has_more = serializers.BooleanField()
+    next_after = serializers.IntegerField(allow_null=True)
+
+
+class LikeBatchItemSerializer(serializers.Serializer):
+    """
+    Элемент пакетного запроса лайков: желаемое состояние лайка объекта.
+    """
+    content_type = serializers.ChoiceField(choices=('post', 'comment'))
+    object_id = serializers.IntegerField(min_value=1)
+    liked = serializers.BooleanField()
+
+
+class LikeBatchSerializer(serializers.Serializer):
+    """
+    Пакетный запрос лайков.
+    """
+    items = LikeBatchItemSerializer(many=True, allow_empty=False, max_length=settings.LIKE_BATCH_MAX_ITEMS)
+
+
+class LikeBatchResultSerializer(serializers.Serializer):
+    """
+    Результат обработки элемента пакетного запроса лайков.
+    """
+    content_type = serializers.CharField()
+    object_id = serializers.IntegerField()
+    liked = serializers.BooleanField()
+    status = serializers.ChoiceField(choices=('created', 'deleted', 'unchanged', 'not_found'))
+    likes_count = serializers.IntegerField()
+
 
 class LikeSerializer(serializers.ModelSerializer):
     content_type = serializers.SlugRelatedField(queryset=ContentType.objects.all(), slug_field="model", required=True)
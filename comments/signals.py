@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Отправляется после удаления лайков через comments.likes.apply_likes и LikeView (sender=Like).
+# Аргументы: likes — удалённые лайки (content_type_id, object_id и created_at заполнены).
+likes_deleted = Signal()
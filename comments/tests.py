@@ -1,3 +1,237 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from blog.models import Post
+from comments.likes import apply_likes
+from comments.models import Comment, Like, encode_path_segment
+from users.models import User
+
+
+def create_user(name: str, phone_suffix: int) -> User:
+    return User.objects.create_user(
+        username=name, email=f'{name}@example.com', password='password',
+        first_name=name.title(), last_name='Test', phone_number=f'+99890123{phone_suffix:04d}',
+    )
+
+
+class CommentListQueryCountTest(TestCase):
+    """
+    Регрессионный тест: число запросов на страницу списка комментариев
+    не должно зависеть от количества веток и ответов на странице.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author', 1)
+        cls.post = Post.objects.create(
+            author=cls.author, title='Post', content='content', status=Post.Status.PUBLISHED,
+        )
+
+    def setUp(self):
+        cache.clear()
+        ContentType.objects.get_for_model(Comment)
+        self.client = APIClient()
+        self.url = f'/api/posts/{self.post.pk}/comments/'
+
+    def create_threads(self, count: int) -> None:
+        for _ in range(count):
+            root = Comment.objects.create(post=self.post, author=self.author, content='root')
+            reply = Comment.objects.create(post=self.post, author=self.author, content='reply', parent=root)
+            Comment.objects.create(post=self.post, author=self.author, content='nested', parent=reply)
+
+    def count_queries(self, url: str):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries), response.json()
+
+    def test_comment_list_query_count_is_constant(self):
+        self.create_threads(2)
+        small_page, data = self.count_queries(self.url)
+        self.assertEqual(len(data['results']), 2)
+
+        self.create_threads(6)
+        large_page, data = self.count_queries(self.url)
+        self.assertEqual(len(data['results']), 8)
+        self.assertEqual(small_page, large_page)
+
+    def test_comment_list_nests_replies(self):
+        self.create_threads(1)
+        _, data = self.count_queries(self.url)
+        [root] = data['results']
+        self.assertEqual(root['content'], 'root')
+        self.assertEqual(root['replies_count'], 1)
+        [reply] = root['replies']
+        self.assertEqual(reply['content'], 'reply')
+        self.assertEqual([node['content'] for node in reply['replies']], ['nested'])
+
+    def test_comment_list_limits_branches(self):
+        root = Comment.objects.create(post=self.post, author=self.author, content='root')
+        replies = [
+            Comment.objects.create(post=self.post, author=self.author, content=f'reply {i}', parent=root)
+            for i in range(3)
+        ]
+        Comment.objects.create(post=self.post, author=self.author, content='nested', parent=replies[0])
+
+        _, data = self.count_queries(f'{self.url}?limit=2')
+        [node] = data['results']
+        self.assertEqual([reply['content'] for reply in node['replies']], ['reply 0', 'reply 1'])
+        self.assertEqual(node['replies_count'], 3)
+        self.assertTrue(node['has_more_replies'])
+
+        _, data = self.count_queries(f'{self.url}?depth=1')
+        [node] = data['results']
+        self.assertEqual(node['replies'], [])
+        self.assertEqual(node['replies_count'], 3)
+
+    def test_comment_retrieve_returns_own_branch(self):
+        self.create_threads(2)
+        reply = Comment.objects.filter(depth=1).order_by('pk').first()
+        response = self.client.get(f'{self.url}{reply.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], reply.pk)
+        self.assertEqual([node['content'] for node in response.json()['replies']], ['nested'])
+
+
+class CommentPathTest(TestCase):
+    """
+    Материализованный путь: вычисление, перенос ветки и удаление поддерева.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author', 1)
+        cls.post = Post.objects.create(
+            author=cls.author, title='Post', content='content', status=Post.Status.PUBLISHED,
+        )
+
+    def comment(self, parent=None) -> Comment:
+        return Comment.objects.create(post=self.post, author=self.author, content='text', parent=parent)
+
+    def test_path_and_depth_follow_parents(self):
+        root = self.comment()
+        reply = self.comment(root)
+        nested = self.comment(reply)
+        nested.refresh_from_db()
+        self.assertEqual(
+            nested.path,
+            encode_path_segment(root.pk) + encode_path_segment(reply.pk) + encode_path_segment(nested.pk),
+        )
+        self.assertEqual(nested.depth, 2)
+        self.assertEqual(nested.ancestor_ids, [root.pk, reply.pk])
+        self.assertEqual(nested.thread_root_id, root.pk)
+        self.assertEqual(list(Comment.objects.ancestors(nested)), [root, reply])
+        self.assertEqual(root.get_descendant_count(), 2)
+
+    def test_move_rewrites_subtree_paths(self):
+        first, second = self.comment(), self.comment()
+        reply = self.comment(first)
+        nested = self.comment(reply)
+
+        reply = Comment.objects.get(pk=reply.pk)
+        reply.parent = second
+        reply.save()
+
+        nested.refresh_from_db()
+        self.assertEqual(nested.path[:len(reply.path)], reply.path)
+        self.assertTrue(reply.path.startswith(second.path))
+        self.assertEqual((reply.depth, nested.depth), (1, 2))
+        self.assertEqual(first.get_descendant_count(), 0)
+        self.assertEqual(second.get_descendant_count(), 2)
+
+        # Перенос в корень
+        reply.parent = None
+        reply.save()
+        nested.refresh_from_db()
+        self.assertEqual(reply.depth, 0)
+        self.assertEqual(nested.depth, 1)
+        self.assertEqual(list(Comment.objects.roots().order_by('pk')), [first, second, reply])
+
+    def test_move_into_own_reply_is_rejected(self):
+        root = self.comment()
+        reply = self.comment(root)
+        root = Comment.objects.get(pk=root.pk)
+        root.parent = reply
+        with self.assertRaises(ValueError):
+            root.save()
+
+    def test_delete_removes_subtree(self):
+        root, other = self.comment(), self.comment()
+        reply = self.comment(root)
+        self.comment(reply)
+        self.comment(other)
+
+        _, deleted = reply.delete()
+        self.assertEqual(deleted[Comment._meta.label], 2)
+        self.assertEqual(root.get_descendant_count(), 0)
+        self.assertEqual(other.get_descendant_count(), 1)
+
+    def test_rebuild_comment_paths(self):
+        root = self.comment()
+        reply = self.comment(root)
+        Comment.objects.update(path='', depth=0)
+
+        call_command('rebuild_comment_paths', stdout=StringIO())
+        reply.refresh_from_db()
+        self.assertEqual(reply.path, encode_path_segment(root.pk) + encode_path_segment(reply.pk))
+        self.assertEqual(reply.depth, 1)
+
+
+class ApplyLikesTest(TestCase):
+    """
+    Пакетные лайки: статусы и счётчик лайков поста учитывают только
+    действительно вставленные и удалённые лайки.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author', 1)
+        cls.reader = create_user('reader', 2)
+        cls.posts = [
+            Post.objects.create(author=cls.author, title=f'Post {i}', content='content', status=Post.Status.PUBLISHED)
+            for i in range(2)
+        ]
+
+    def like(self, *posts, liked: bool = True) -> list:
+        with self.captureOnCommitCallbacks(execute=True):
+            results = apply_likes(
+                self.reader, [{'content_type': 'post', 'object_id': post.pk, 'liked': liked} for post in posts]
+            )
+        return [(result['status'], result['likes_count']) for result in results]
+
+    def likes_count(self, post) -> int:
+        return Post.objects.values_list('likes_count', flat=True).get(pk=post.pk)
+
+    def test_like_and_unlike(self):
+        first, second = self.posts
+        self.assertEqual(self.like(first, second), [('created', 1), ('created', 1)])
+        self.assertEqual(self.like(first), [('unchanged', 1)])
+        self.assertEqual(self.like(first, liked=False), [('deleted', 0)])
+        self.assertEqual((self.likes_count(first), self.likes_count(second)), (0, 1))
+
+    def test_concurrently_created_like_is_not_counted(self):
+        first, second = self.posts
+        content_type = ContentType.objects.get_for_model(Post)
+        bulk_create = Like.objects.bulk_create
+
+        def create_concurrently(objs, **kwargs):
+            # Параллельный запрос успел поставить лайк первому посту между проверкой и вставкой
+            like = Like.objects.create(author=self.reader, content_type=content_type, object_id=first.pk)
+            Like.objects.filter(pk=like.pk).update(created_at=timezone.now() - timedelta(seconds=1))
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(Like.objects, 'bulk_create', create_concurrently):
+            results = self.like(first, second)
 
-# Create your tests here.
+        self.assertEqual(results, [('unchanged', 1), ('created', 1)])
+        self.assertEqual((self.likes_count(first), self.likes_count(second)), (0, 1))
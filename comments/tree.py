@@ -0,0 +1,68 @@
+from collections import defaultdict, deque
+
+
+def build_comment_tree(comments, serialize, parent_id: int = None, max_depth: int = 3,
+                       limit: int = 20, after: int = None, root_limit: int = None) -> dict:
+    """
+    Строит дерево комментариев в памяти за O(n) без рекурсии.
+
+    Комментарии группируются по parent_id за один проход, затем дерево
+    обходится в ширину от ветки parent_id. В каждой ветке возвращается
+    не больше limit ответов; продолжение ветки загружается отдельным
+    запросом с parent=<id узла> и after=<id последнего ответа>.
+
+    Args:
+        comments (Iterable[Comment]): Комментарии поста, отсортированные по (created_at, id).
+        serialize (Callable): Сериализует список комментариев в список словарей.
+        parent_id (int): Корень загружаемой ветки (None — комментарии верхнего уровня).
+        max_depth (int): Максимальная глубина вложенности ответа.
+        limit (int): Максимальное количество ответов в каждой ветке.
+        after (int): ID последнего загруженного комментария корневой ветки.
+        root_limit (int): Максимальное количество узлов корневой ветки (по умолчанию limit).
+
+    Returns:
+        dict: results — узлы корневой ветки, has_more — есть ли продолжение,
+        next_after — значение after для следующей порции.
+    """
+    children = defaultdict(list)
+    for comment in comments:
+        children[comment.parent_id].append(comment)
+
+    roots = children.get(parent_id, [])
+    if after is not None:
+        ids = [comment.pk for comment in roots]
+        roots = roots[ids.index(after) + 1:] if after in ids else []
+    root_limit = root_limit or limit
+    has_more = len(roots) > root_limit
+    roots = roots[:root_limit]
+
+    # Обход в ширину: отбираем узлы, попадающие в ответ, с учётом глубины и лимитов веток
+    selected = []
+    queue = deque((comment, 1) for comment in roots)
+    while queue:
+        comment, depth = queue.popleft()
+        selected.append(comment)
+        if depth < max_depth:
+            queue.extend((reply, depth + 1) for reply in children.get(comment.pk, [])[:limit])
+
+    nodes = {}
+    for comment, data in zip(selected, serialize(selected)):
+        replies_count = len(children.get(comment.pk, ()))
+        data['replies'] = []
+        data['replies_count'] = replies_count
+        data['has_more_replies'] = False
+        nodes[comment.pk] = data
+
+    for comment in selected:
+        parent = nodes.get(comment.parent_id)
+        if parent is not None:
+            parent['replies'].append(nodes[comment.pk])
+
+    for node in nodes.values():
+        node['has_more_replies'] = len(node['replies']) < node['replies_count']
+
+    return {
+        'results': [nodes[comment.pk] for comment in roots],
+        'has_more': has_more,
+        'next_after': roots[-1].pk if has_more else None,
+    }
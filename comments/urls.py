@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from comments.views import CommentViewSet, TagViewSet, LikeView
+from comments.views import CommentViewSet, TagViewSet, LikeView, LikeBatchView
 
 router = DefaultRouter()
 
@@ -11,6 +11,7 @@ router.register(r'tags', TagViewSet, basename="tags")
 
 urlpatterns = [
     path('like/', LikeView.as_view(), name='like'),  # Лайк поста
+    path('like/batch/', LikeBatchView.as_view(), name='like-batch'),
     path('', include(router.urls)),
 
 ]
\ No newline at end of file
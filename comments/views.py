@@ -1,15 +1,36 @@
 from django.contrib.contenttypes.models import ContentType
-from drf_spectacular.utils import OpenApiResponse, extend_schema
-from oauthlib.uri_validate import query
+from django.db.models import Q
+from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
 from rest_framework import generics, permissions, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
+from blog.counters import post_counters
 from blog.models import Post
+from comments.likes import apply_likes
 from comments.models import Comment, Tag, Like
-from comments.serializer import CommentSerializer, TagSerializer, LikeSerializer
+from comments.signals import likes_deleted
+from comments.serializer import (
+    CommentSerializer,
+    CommentNodeSerializer,
+    CommentTreeSerializer,
+    TagSerializer,
+    LikeSerializer,
+    LikeBatchSerializer,
+    LikeBatchResultSerializer,
+)
+from comments.tree import build_comment_tree
+from common.cache import CachedResponseMixin
+from common.pagination import CommentKeysetPagination, TagKeysetPagination
+
+# Ограничения веток дерева комментариев (tree, list и retrieve)
+BRANCH_PARAMETERS = [
+    OpenApiParameter('depth', int, description="Максимальная глубина вложенности (по умолчанию 3)."),
+    OpenApiParameter('limit', int, description="Количество ответов в каждой ветке (по умолчанию 20)."),
+]
 
 
 @extend_schema(
@@ -23,7 +44,8 @@ class CommentViewSet(viewsets.ModelViewSet):
     Представление для работы с комментариями.
 
     Методы:
-        - list: Получить список комментариев к посту.
+        - list: Получить список комментариев верхнего уровня к посту с ответами.
+        - tree: Получить дерево комментариев к посту.
         - create: Создать новый комментарий.
         - retrieve: Получить конкретный комментарий.
         - update: Обновить комментарий.
@@ -32,7 +54,9 @@ class CommentViewSet(viewsets.ModelViewSet):
     """
     serializer_class = CommentSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+    pagination_class = CommentKeysetPagination
     lookup_url_kwarg = 'comment_id'
+    max_tree_depth = 10
 
     def perform_create(self, serializer):
         """
@@ -40,13 +64,126 @@ class CommentViewSet(viewsets.ModelViewSet):
         """
         post = get_object_or_404(Post, pk=self.kwargs.get('post_id'))
         serializer.save(post=post, author=self.request.user)
+        post_counters.increment(post.pk, 'comments_count')
+
+    def perform_destroy(self, instance):
+        """
+        Удаляет комментарий вместе с ответами и обновляет счётчик поста.
+        """
+        post_id = instance.post_id
+        _, deleted = instance.delete()
+        post_counters.increment(post_id, 'comments_count', -deleted.get(Comment._meta.label, 0))
 
     def get_queryset(self):
         """
         Получает список комментариев для указанного поста.
         """
         post_id = self.kwargs.get('post_id')
-        return Comment.objects.filter(post__id=post_id)
+        queryset = Comment.objects.filter(post__id=post_id).select_related('author')
+        if self.action == 'list':
+            # Ответы возвращаются вложенными в родительский комментарий
+            queryset = queryset.filter(parent__isnull=True)
+        return queryset
+
+    def with_replies(self, comments) -> list:
+        """
+        Сериализует комментарии вместе с ответами: ветки всех комментариев
+        загружаются одним запросом по материализованному пути, состояние
+        лайков — одним проходом на все узлы.
+
+        Как и в tree, ветки ограничены глубиной depth (не больше
+        max_tree_depth) и количеством ответов limit на каждом уровне.
+        """
+        if not comments:
+            return []
+        max_depth = self._int_param(self.request, 'depth', 3, self.max_tree_depth)
+        # Загружаем на уровень глубже max_depth для подсчёта ответов у самых глубоких узлов
+        branches = Q(pk__in=[])
+        for comment in comments:
+            branches |= Q(path__startswith=comment.path, depth__lte=comment.depth + max_depth)
+        nodes = (
+            Comment.objects.filter(post__id=self.kwargs.get('post_id')).filter(branches)
+            .select_related('author').order_by('created_at', 'id')
+        )
+        tree = build_comment_tree(
+            nodes,
+            serialize=lambda selected: CommentNodeSerializer(
+                selected, many=True, context=self.get_serializer_context()
+            ).data,
+            parent_id=comments[0].parent_id,
+            max_depth=max_depth,
+            limit=self._int_param(self.request, 'limit', 20, CommentKeysetPagination.max_page_size),
+            root_limit=len(comments),
+        )
+        return tree['results']
+
+    @extend_schema(parameters=BRANCH_PARAMETERS)
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        return self.get_paginated_response(self.with_replies(page))
+
+    @extend_schema(parameters=BRANCH_PARAMETERS)
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.with_replies([self.get_object()])[0])
+
+    @staticmethod
+    def _int_param(request, name: str, default, maximum: int = None):
+        value = request.query_params.get(name)
+        if value is None:
+            return default
+        try:
+            value = max(1, int(value))
+        except ValueError:
+            return default
+        return min(value, maximum) if maximum else value
+
+    @extend_schema(
+        summary="Дерево комментариев к посту",
+        description=(
+            "Возвращает ветку дерева комментариев, выбранную по материализованному пути "
+            "одним запросом по индексу. "
+            "Ветка ограничена глубиной depth и количеством ответов limit на каждом уровне; "
+            "продолжение ветки загружается с параметрами parent и after."
+        ),
+        parameters=[
+            OpenApiParameter('parent', int, description="ID комментария, ветку которого нужно загрузить."),
+            OpenApiParameter('after', int, description="ID последнего загруженного ответа ветки."),
+            *BRANCH_PARAMETERS,
+        ],
+        responses={200: CommentTreeSerializer},
+        tags=['Comments']
+    )
+    @action(detail=False, methods=['get'], url_path='tree', pagination_class=None)
+    def tree(self, request, *args, **kwargs):
+        """
+        Возвращает дерево комментариев к посту.
+        """
+        parent_id = self._int_param(request, 'parent', None)
+        max_depth = self._int_param(request, 'depth', 3, self.max_tree_depth)
+
+        # Загружаем только нужную ветку на уровень глубже max_depth
+        # (для подсчёта ответов у самых глубоких узлов)
+        comments = self.get_queryset()
+        if parent_id is None:
+            comments = comments.filter(depth__lte=max_depth)
+        else:
+            # Путь родителя подставляется литералом, чтобы LIKE 'path%' использовал индекс
+            parent = get_object_or_404(
+                Comment.objects.only('path', 'depth'), pk=parent_id, post__id=self.kwargs.get('post_id')
+            )
+            comments = comments.filter(depth__lte=parent.depth + max_depth + 1) & (
+                Comment.objects.subtree(parent, include_self=False)
+            )
+
+        tree = build_comment_tree(
+            comments.order_by('created_at', 'id'),
+            serialize=lambda nodes: CommentNodeSerializer(nodes, many=True, context=self.get_serializer_context()).data,
+            parent_id=parent_id,
+            max_depth=max_depth,
+            limit=self._int_param(request, 'limit', 20, CommentKeysetPagination.max_page_size),
+            after=self._int_param(request, 'after', None),
+        )
+        return Response(tree)
 
 
 @extend_schema(
@@ -55,7 +192,7 @@ class CommentViewSet(viewsets.ModelViewSet):
     responses={200: TagSerializer(many=True)},
     tags=['Tags']
 )
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(CachedResponseMixin, viewsets.ModelViewSet):
     """
     Представление для работы с тегами.
 
@@ -69,6 +206,9 @@ class TagViewSet(viewsets.ModelViewSet):
     """
     serializer_class = TagSerializer
     permission_classes = (permissions.IsAuthenticatedOrReadOnly,)
+    pagination_class = TagKeysetPagination
+    cache_namespaces = ('tags',)
+    cache_actions = ('list',)
 
     def get_queryset(self):
         """
@@ -118,9 +258,44 @@ class LikeView(generics.GenericAPIView):
         like, created = Like.objects.get_or_create(
             author=user, content_type=content_type, object_id=object_id
         )
+        is_post = content_type.model_class() is Post
 
         if not created:
             like.delete()
+            likes_deleted.send(sender=Like, likes=[like])
+            if is_post:
+                post_counters.increment(object_id, 'likes_count', -1)
             return Response({"message": "Like removed"}, status=status.HTTP_204_NO_CONTENT)
 
-        return Response({"message": "Like added"}, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        if is_post:
+            post_counters.increment(object_id, 'likes_count')
+        return Response({"message": "Like added"}, status=status.HTTP_201_CREATED)
+
+
+@extend_schema(
+    summary="Пакетное изменение лайков",
+    description=(
+        "Принимает список элементов (content_type, object_id, liked) и приводит лайки "
+        "текущего пользователя к указанному состоянию. Операция идемпотентна. "
+        "Возвращает результат по каждому объекту и обновлённое количество лайков."
+    ),
+    request=LikeBatchSerializer,
+    responses={
+        200: LikeBatchResultSerializer(many=True),
+        400: OpenApiResponse(description="Ошибка запроса."),
+    },
+    tags=['Like']
+)
+class LikeBatchView(generics.GenericAPIView):
+    """
+    Представление для пакетной синхронизации лайков (например, из офлайн-очереди клиента).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = LikeBatchSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = apply_likes(request.user, serializer.validated_data['items'])
+        return Response({"results": results}, status=status.HTTP_200_OK)
@@ -0,0 +1,161 @@
+import hashlib
+from operator import attrgetter
+
+from dj_rest_auth.app_settings import api_settings as rest_auth_settings
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+
+def get_response_cache_timeout() -> int:
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60)
+
+
+def is_anonymous_request(request) -> bool:
+    """
+    Проверяет без аутентификации, что запрос не несёт учётных данных:
+    заголовка Authorization, сессионной cookie и JWT-cookie (REST_AUTH['JWT_AUTH_COOKIE']).
+    """
+    if 'HTTP_AUTHORIZATION' in request.META or settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return False
+    jwt_cookie = rest_auth_settings.JWT_AUTH_COOKIE
+    return not (jwt_cookie and jwt_cookie in request.COOKIES)
+
+
+def _version_key(namespace: str) -> str:
+    return f'response:version:{namespace}'
+
+
+def get_namespace_version(namespaces) -> str:
+    """
+    Возвращает текущие версии пространств имён кеша одним обращением к кешу.
+    """
+    keys = [_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    return '.'.join(str(versions.get(key, 0)) for key in keys)
+
+
+def invalidate_namespace(*namespaces: str) -> None:
+    """
+    Инвалидирует ответы пространств имён увеличением их версии:
+    старые ключи больше не читаются и вытесняются из кеша по LRU.
+    """
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None) or cache.incr(key)
+
+
+class CachedResponseMixin:
+    """
+    Кеширование ответов на анонимные GET-запросы.
+
+    Ключ ответа включает версии пространств имён cache_namespaces,
+    поэтому инвалидация (см. common.models) — это увеличение версии без
+    перебора ключей. Анонимным считается запрос без заголовка Authorization,
+    сессионной cookie и JWT-cookie: такой ответ не зависит от пользователя,
+    и из кеша он возвращается без аутентификации и запросов к базе.
+
+    Ответы сопровождаются ETag (хеш содержимого) и Last-Modified
+    (максимум поля last_modified_field у отданных объектов), условные
+    запросы If-None-Match / If-Modified-Since получают 304.
+
+    Атрибуты:
+        cache_namespaces (tuple): Пространства имён, от которых зависит ответ.
+        cache_actions (tuple): Кешируемые действия (для APIView — 'get').
+        last_modified_field (str): Поле с датой изменения объекта (через точку для связей).
+    """
+    cache_namespaces = ()
+    cache_actions = ('list', 'retrieve')
+    last_modified_field = None
+
+    def dispatch(self, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        if key is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        cached = cache.get(key)
+        if cached is None:
+            self._cache_objects = []
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            response.render()
+            cached = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': quote_etag(hashlib.md5(response.content).hexdigest()),
+                'last_modified': self.get_last_modified(self._cache_objects),
+            }
+            cache.set(key, cached, get_response_cache_timeout())
+        return self.build_cached_response(request, cached)
+
+    def get_response_cache_key(self, request):
+        """
+        Возвращает ключ кеша ответа или None, если запрос не кешируется.
+        """
+        if request.method != 'GET' or not self.cache_namespaces:
+            return None
+        if not is_anonymous_request(request):
+            return None
+        action = getattr(self, 'action_map', {}).get('get', 'get')
+        if action not in self.cache_actions:
+            return None
+
+        digest = hashlib.md5(
+            f"{request.get_host()}|{request.get_full_path()}|{request.META.get('HTTP_ACCEPT', '')}".encode()
+        ).hexdigest()
+        version = get_namespace_version(self.cache_namespaces)
+        return f'response:{self.__class__.__name__}:{action}:{version}:{digest}'
+
+    def get_object(self):
+        instance = super().get_object()
+        self._remember_objects([instance])
+        return instance
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        self._remember_objects(page or [])
+        return page
+
+    def _remember_objects(self, objects) -> None:
+        if hasattr(self, '_cache_objects'):
+            self._cache_objects.extend(objects)
+
+    def get_last_modified(self, objects):
+        """
+        Возвращает время последнего изменения отданных объектов (timestamp) или None.
+        """
+        if not self.last_modified_field or not objects:
+            return None
+        getter = attrgetter(self.last_modified_field)
+        values = [value for value in map(getter, objects) if value is not None]
+        return int(max(values).timestamp()) if values else None
+
+    @staticmethod
+    def build_cached_response(request, cached: dict):
+        """
+        Собирает ответ из кеша с учётом условных заголовков запроса.
+        """
+        etag, last_modified = cached['etag'], cached['last_modified']
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+
+        if if_none_match is not None:
+            not_modified = etag in (tag.strip() for tag in if_none_match.split(','))
+        else:
+            not_modified = bool(last_modified and if_modified_since and last_modified <= if_modified_since)
+
+        response = (
+            HttpResponseNotModified() if not_modified
+            else HttpResponse(cached['content'], content_type=cached['content_type'])
+        )
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Accept', 'Authorization', 'Cookie'))
+        return response
@@ -0,0 +1,10 @@
+from django.db.models import Count, IntegerField, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(queryset, field: str):
+    """
+    Подзапрос с количеством строк queryset, сгруппированных по полю field.
+    """
+    subquery = queryset.values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
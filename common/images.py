@@ -0,0 +1,208 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, features
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+
+def get_renditions() -> dict:
+    """
+    Возвращает варианты изображений: {название: максимальная сторона в пикселях}.
+    """
+    return getattr(settings, 'IMAGE_RENDITIONS', {'thumbnail': 160, 'card': 640, 'full': 1600})
+
+
+def get_rendition_format() -> str:
+    image_format = getattr(settings, 'IMAGE_RENDITION_FORMAT', 'WEBP').upper()
+    # Pillow может быть собран без libwebp
+    if image_format == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return image_format
+
+
+def render_image(field_file) -> dict:
+    """
+    Создаёт уменьшенные перекодированные варианты изображения
+    (см. IMAGE_RENDITIONS) и сохраняет их рядом с оригиналом
+    в подкаталоге renditions.
+
+    Изображение не увеличивается: вариант не больше оригинала.
+
+    Returns:
+        dict: {'source': имя оригинала, название варианта: имя файла}.
+    """
+    renditions = {'source': field_file.name}
+    sizes = get_renditions()
+    image_format = get_rendition_format()
+    extension = 'jpg' if image_format == 'JPEG' else image_format.lower()
+    directory, filename = os.path.split(field_file.name)
+    stem = os.path.splitext(filename)[0]
+
+    with field_file.storage.open(field_file.name, 'rb') as source, Image.open(source) as image:
+        # JPEG декодируется сразу в уменьшенном масштабе, если это позволяет самый большой вариант
+        largest = max(sizes.values())
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha and image_format != 'JPEG' else 'RGB')
+
+        for name, size in sorted(sizes.items(), key=lambda item: -item[1]):
+            # Каждый следующий вариант уменьшается из предыдущего, а не из оригинала
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, image_format, quality=getattr(settings, 'IMAGE_RENDITION_QUALITY', 80), optimize=True)
+            path = os.path.join(directory, 'renditions', f'{stem}.{name}.{extension}')
+            renditions[name] = field_file.storage.save(path, ContentFile(buffer.getvalue()))
+    return renditions
+
+
+def delete_renditions(storage, renditions: dict) -> None:
+    for name, path in renditions.items():
+        if name != 'source':
+            storage.delete(path)
+
+
+def stale_rendition_fields(instance, update_fields=None) -> list:
+    """
+    Возвращает изображения объекта, варианты которых не соответствуют текущему файлу.
+    """
+    return [
+        field_name for field_name in instance.RENDITION_FIELDS
+        if (update_fields is None or field_name in update_fields)
+        and (instance.renditions.get(field_name, {}).get('source') or None) != (getattr(instance, field_name).name or None)
+    ]
+
+
+def process_renditions(model_label: str, pk, field_names, force: bool = False) -> dict:
+    """
+    Пересоздаёт варианты изображений field_names объекта и записывает их
+    в поле renditions через UPDATE, без повторного сохранения объекта.
+
+    Повторный вызов для неизменившегося файла ничего не делает (кроме force).
+    Файл, который не удалось открыть как изображение, помечается
+    обработанным без вариантов: клиенты получают оригинал.
+
+    Returns:
+        dict: Новое значение renditions.
+    """
+    from common.cache import invalidate_namespace
+    from common.models import CACHE_DEPENDENCIES
+
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).only('pk', 'renditions', *field_names).first()
+    if instance is None:
+        return {}
+
+    renditions = dict(instance.renditions)
+    changed = False
+    for field_name in field_names:
+        field_file = getattr(instance, field_name)
+        current = renditions.get(field_name)
+        if not force and (current or {}).get('source') == (field_file.name or None):
+            continue
+        if current:
+            delete_renditions(field_file.storage, current)
+        if field_file:
+            try:
+                renditions[field_name] = render_image(field_file)
+            except Exception as e:
+                logger.error(f"Не удалось обработать изображение {field_file.name}: {e}")
+                renditions[field_name] = {'source': field_file.name}
+        else:
+            renditions.pop(field_name, None)
+        changed = True
+
+    if changed:
+        model.objects.filter(pk=pk).update(renditions=renditions)
+        namespaces = CACHE_DEPENDENCIES.get(model)
+        if namespaces:
+            invalidate_namespace(*namespaces)
+    return renditions
+
+
+class ImageProcessor:
+    """
+    Пул потоков для создания вариантов изображений вне потока запроса.
+
+    Задачи ставятся после коммита транзакции, в которой сохранён файл.
+    При max_workers=0 изображения обрабатываются сразу в вызывающем потоке.
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers if max_workers is not None else getattr(settings, 'IMAGE_WORKERS', 2)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def schedule(self, instance, update_fields=None, using=None) -> None:
+        """
+        Ставит в очередь обработку изменившихся изображений объекта после коммита.
+        """
+        field_names = stale_rendition_fields(instance, update_fields)
+        if field_names:
+            transaction.on_commit(
+                partial(self.submit, instance._meta.label, instance.pk, field_names), using=using
+            )
+
+    def submit(self, model_label: str, pk, field_names) -> None:
+        if self.max_workers <= 0:
+            self._run(model_label, pk, field_names)
+            return
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='image-renditions')
+        self._executor.submit(self._run, model_label, pk, field_names, threaded=True)
+
+    @staticmethod
+    def _run(model_label: str, pk, field_names, threaded: bool = False) -> None:
+        try:
+            process_renditions(model_label, pk, field_names)
+        except Exception as e:
+            logger.error(f"Не удалось создать варианты изображений {model_label}#{pk}: {e}")
+        finally:
+            if threaded:
+                close_old_connections()
+
+
+image_processor = ImageProcessor()
+
+
+class RenditionsField(serializers.Field):
+    """
+    Ссылки на варианты изображения image_field: {название варианта: URL}.
+
+    Пока варианты не созданы для текущего файла (или изображение не удалось
+    обработать), для каждого названия возвращается ссылка на оригинал.
+    """
+
+    def __init__(self, image_field: str, **kwargs):
+        self.image_field = image_field
+        kwargs.setdefault('source', '*')
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        field_file = getattr(instance, self.image_field)
+        if not field_file:
+            return None
+
+        renditions = instance.renditions.get(self.image_field, {})
+        # Варианты прежнего файла: новый ещё обрабатывается
+        if renditions.get('source') != field_file.name:
+            renditions = {}
+        request = self.context.get('request')
+        urls = {}
+        for name in get_renditions():
+            url = field_file.storage.url(renditions.get(name, field_file.name))
+            urls[name] = request.build_absolute_uri(url) if request is not None else url
+        return urls
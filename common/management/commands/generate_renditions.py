@@ -0,0 +1,60 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from common.images import process_renditions, stale_rendition_fields
+
+
+def get_rendition_models() -> dict:
+    return {
+        model._meta.label: model for model in apps.get_models()
+        if getattr(model, 'RENDITION_FIELDS', None)
+    }
+
+
+class Command(BaseCommand):
+    help = "Создаёт уменьшенные варианты уже загруженных изображений (превью постов, фото профилей)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            action='append',
+            choices=sorted(get_rendition_models()),
+            help="Модель для обработки (можно указать несколько раз, по умолчанию — все).",
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help="Количество объектов, загружаемых за один проход.",
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help="Пересоздать варианты, даже если они соответствуют текущему файлу.",
+        )
+
+    def handle(self, *args, **options):
+        models = get_rendition_models()
+        for label in options['model'] or sorted(models):
+            model = models[label]
+            fields = model.RENDITION_FIELDS
+            has_image = Q()
+            for field_name in fields:
+                has_image |= Q(**{f'{field_name}__isnull': False}) & ~Q(**{field_name: ''})
+            objects = model.objects.filter(has_image).order_by('pk').only('pk', 'renditions', *fields)
+
+            processed = 0
+            last_pk = 0
+            while True:
+                batch = list(objects.filter(pk__gt=last_pk)[:options['batch_size']])
+                if not batch:
+                    break
+                for instance in batch:
+                    # Варианты сверяются с файлами в памяти: обрабатываются только устаревшие
+                    field_names = fields if options['force'] else stale_rendition_fields(instance)
+                    if field_names:
+                        process_renditions(label, instance.pk, field_names, force=options['force'])
+                        processed += 1
+                last_pk = batch[-1].pk
+            self.stdout.write(self.style.SUCCESS(f"{label}: обработано объектов {processed}"))
@@ -1,3 +1,41 @@
-from django.db import models
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
 
-# Create your models here.
+from blog.models import Post
+from comments.models import Comment, Like, Tag
+from common.cache import invalidate_namespace
+from users.models import Follow, Profile, User
+from users.signals import follows_created, follows_deleted
+
+# Пространства имён кеша ответов (common.cache), которые затрагивает изменение модели
+CACHE_DEPENDENCIES = {
+    Post: ('posts',),
+    Comment: ('posts',),
+    Like: ('posts',),
+    Tag: ('tags', 'posts'),
+    Profile: ('profiles',),
+    User: ('profiles',),
+}
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_response_cache(sender, **kwargs) -> None:
+    """
+    Инвалидирует кеш ответов при сохранении или удалении зависимых моделей.
+    """
+    namespaces = CACHE_DEPENDENCIES.get(sender)
+    if namespaces:
+        invalidate_namespace(*namespaces)
+
+
+@receiver(m2m_changed, sender=Post.tag.through)
+def invalidate_response_cache_m2m(sender, action, **kwargs) -> None:
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_namespace('posts')
+
+
+@receiver(follows_created, sender=Follow)
+@receiver(follows_deleted, sender=Follow)
+def invalidate_response_cache_follows(sender, **kwargs) -> None:
+    invalidate_namespace('profiles')
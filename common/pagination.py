@@ -0,0 +1,233 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset-пагинация (seek method) без использования OFFSET.
+
+    Страница выбирается условием по значениям полей сортировки последней
+    записи предыдущей страницы, поэтому стоимость запроса не зависит от
+    номера страницы. Курсор непрозрачен для клиента: это base64 от позиции
+    и направления обхода.
+
+    Атрибуты:
+        ordering (tuple): Поля сортировки. Последнее поле должно быть уникальным.
+        page_size (int): Размер страницы по умолчанию.
+        page_size_query_param (str): Параметр запроса для размера страницы.
+        max_page_size (int): Максимально допустимый размер страницы.
+        cursor_query_param (str): Параметр запроса для курсора.
+    """
+    ordering = ('-id',)
+    page_size = api_settings.PAGE_SIZE or 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Некорректный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.model = queryset.model
+        size = self.get_page_size(request)
+
+        position, reverse = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.get_seek_filter(position, reverse))
+
+        # Берём на одну запись больше, чтобы узнать, есть ли следующая страница
+        rows = list(queryset.order_by(*self.get_order_by(reverse))[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        self.has_next = has_more if not reverse else True
+        self.has_previous = position is not None if not reverse else has_more
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Курсор страницы.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Количество записей на странице (не более {self.max_page_size}).',
+                'schema': {'type': 'integer'},
+            },
+        ]
+
+    def get_page_size(self, request) -> int:
+        """
+        Возвращает размер страницы с учётом параметра запроса и ограничения сверху.
+        """
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.build_link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.build_link(self.page[0], reverse=True)
+
+    def build_link(self, instance, reverse: bool) -> str:
+        position = [self.get_position_value(instance, field) for field in self.fields]
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor(position, reverse)
+        )
+
+    @property
+    def fields(self) -> list:
+        return [field.lstrip('-') for field in self.ordering]
+
+    @staticmethod
+    def get_position_value(instance, field: str):
+        value = getattr(instance, field)
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def encode_cursor(position: list, reverse: bool) -> str:
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request) -> tuple:
+        """
+        Разбирает курсор из запроса.
+
+        Returns:
+            tuple: (позиция или None, признак обратного направления).
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            position, reverse = payload['p'], bool(payload['r'])
+        except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def is_nullable(self, field: str) -> bool:
+        try:
+            return self.model._meta.get_field(field).null
+        except FieldDoesNotExist:
+            return False
+
+    def get_directions(self, reverse: bool) -> list:
+        """
+        Возвращает пары (поле, по убыванию) с учётом направления обхода.
+        """
+        return [
+            (field.lstrip('-'), field.startswith('-') != reverse)
+            for field in self.ordering
+        ]
+
+    def get_order_by(self, reverse: bool) -> list:
+        # NULL считается наименьшим значением: в конце при убывании, в начале при возрастании
+        order_by = []
+        for field, descending in self.get_directions(reverse):
+            if not self.is_nullable(field):
+                order_by.append(f'-{field}' if descending else field)
+            elif descending:
+                order_by.append(F(field).desc(nulls_last=True))
+            else:
+                order_by.append(F(field).asc(nulls_first=True))
+        return order_by
+
+    def get_seek_filter(self, position: list, reverse: bool) -> Q:
+        """
+        Строит условие «строго после позиции» для составного ключа сортировки:
+        (f1 > v1) OR (f1 = v1 AND f2 > v2) OR ...
+        """
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (field, descending), value in zip(self.get_directions(reverse), position):
+            after = self.get_after_filter(field, value, descending)
+            if after is not None:
+                condition |= equal & after
+            equal &= Q(**{f'{field}__isnull': True}) if value is None else Q(**{field: value})
+        return condition
+
+    def get_after_filter(self, field: str, value, descending: bool):
+        if value is None:
+            # После NULL при убывании ничего нет, при возрастании — все непустые значения
+            return None if descending else Q(**{f'{field}__isnull': False})
+        if descending:
+            after = Q(**{f'{field}__lt': value})
+            if self.is_nullable(field):
+                after |= Q(**{f'{field}__isnull': True})
+            return after
+        return Q(**{f'{field}__gt': value})
+
+
+class PostKeysetPagination(KeysetPagination):
+    """
+    Пагинация постов: сначала новые, по (pub_date, id).
+    """
+    ordering = ('-pub_date', '-id')
+
+
+class CommentKeysetPagination(KeysetPagination):
+    """
+    Пагинация комментариев в хронологическом порядке, по (created_at, id).
+    """
+    ordering = ('created_at', 'id')
+
+
+class TagKeysetPagination(KeysetPagination):
+    """
+    Пагинация тегов по названию.
+    """
+    ordering = ('tag_name',)
@@ -1,3 +1,205 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from dj_rest_auth.app_settings import api_settings as rest_auth_settings
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.test import APIClient
+
+from blog.models import Post
+from common.images import RenditionsField, image_processor
+from common.uploads import DeduplicatingFileSystemStorage
+from users.authentication import ClaimsTokenObtainPairSerializer
+from users.models import User
+
+
+def create_user(name: str, phone_suffix: int) -> User:
+    return User.objects.create_user(
+        username=name, email=f'{name}@example.com', password='password',
+        first_name=name.title(), last_name='Test', phone_number=f'+99890123{phone_suffix:04d}',
+    )
+
+
+class CachedResponseTest(TestCase):
+    """
+    Кеш ответов отдаётся только анонимным запросам: запрос с заголовком
+    Authorization или JWT-cookie проходит аутентификацию.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('cacheauthor', 3001)
+        Post.objects.create(author=cls.author, title='Post', content='content', status=Post.Status.PUBLISHED)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.token = str(ClaimsTokenObtainPairSerializer.get_token(self.author).access_token)
+
+    def count_queries(self, **kwargs) -> int:
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/posts/', **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_anonymous_response_is_cached(self):
+        self.assertGreater(self.count_queries(), 0)
+        self.assertEqual(self.count_queries(), 0)
+
+    def test_jwt_cookie_bypasses_cache(self):
+        self.count_queries()
+        self.client.cookies[rest_auth_settings.JWT_AUTH_COOKIE] = self.token
+        self.assertGreater(self.count_queries(), 0)
+
+    def test_authorization_header_bypasses_cache(self):
+        self.count_queries()
+        self.assertGreater(self.count_queries(HTTP_AUTHORIZATION=f'Bearer {self.token}'), 0)
+
+
+def image_bytes(size=(64, 48), image_format='PNG', color='red') -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+class PostRenditionsSerializer(serializers.Serializer):
+    preview = RenditionsField('preview')
+
+
+class MediaRootMixin:
+    """
+    Временный MEDIA_ROOT на время теста.
+    """
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.media_root = media_root
+
+
+@override_settings(IMAGE_RENDITIONS={'thumbnail': 16, 'card': 32}, IMAGE_RENDITION_FORMAT='JPEG')
+class ImageRenditionsTest(MediaRootMixin, TestCase):
+    """
+    Варианты изображений создаются после коммита и отдаются только для
+    того файла, из которого они созданы.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('imageauthor', 3002)
+
+    def setUp(self):
+        super().setUp()
+        # Обработка в потоке теста, без пула
+        patcher = mock.patch.object(image_processor, 'max_workers', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_post(self) -> Post:
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                author=self.author, title='Post', content='content', status=Post.Status.PUBLISHED,
+                preview=SimpleUploadedFile('preview.png', image_bytes(), content_type='image/png'),
+            )
+        post.refresh_from_db()
+        return post
+
+    def test_renditions_are_generated(self):
+        post = self.create_post()
+        renditions = post.renditions['preview']
+        self.assertEqual(renditions['source'], post.preview.name)
+        for name, size in (('thumbnail', 16), ('card', 32)):
+            with Image.open(os.path.join(self.media_root, renditions[name])) as image:
+                self.assertEqual(image.format, 'JPEG')
+                self.assertEqual(max(image.size), size)
+
+        urls = PostRenditionsSerializer(post).data['preview']
+        self.assertEqual(urls['thumbnail'], post.preview.storage.url(renditions['thumbnail']))
+
+    def test_stale_renditions_fall_back_to_original(self):
+        post = self.create_post()
+        # Новый файл сохранён, варианты ещё не пересозданы
+        post.preview.name = 'post/preview/other.png'
+        urls = PostRenditionsSerializer(post).data['preview']
+        self.assertEqual(urls, dict.fromkeys(['thumbnail', 'card'], post.preview.url))
+
+    def test_invalid_image_is_served_as_original(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                author=self.author, title='Post', content='content', status=Post.Status.PUBLISHED,
+                preview=SimpleUploadedFile('preview.png', b'not an image', content_type='image/png'),
+            )
+        post.refresh_from_db()
+        self.assertEqual(post.renditions['preview'], {'source': post.preview.name})
+        urls = PostRenditionsSerializer(post).data['preview']
+        self.assertEqual(set(urls.values()), {post.preview.url})
+
+
+@override_settings(UPLOAD_MAX_SIZE=4096)
+class UploadTest(MediaRootMixin, TestCase):
+    """
+    Загрузки: отклонение больших файлов и не изображений, хранение
+    одинаковых файлов под одним именем по хешу содержимого.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('uploadauthor', 3003)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def upload(self, content: bytes, name: str = 'preview.png'):
+        return self.client.post(
+            '/api/posts/',
+            {'title': 'Post', 'content': 'content', 'preview': SimpleUploadedFile(name, content)},
+            format='multipart',
+        )
+
+    def test_oversized_upload_is_rejected(self):
+        content = image_bytes()
+        content += b'\0' * (4097 - len(content))
+        response = self.upload(content)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Post.objects.exists())
+
+    def test_non_image_upload_is_rejected(self):
+        response = self.upload(b'<?php echo 1; ?>', name='preview.png')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Post.objects.exists())
+
+    def test_identical_uploads_are_stored_once(self):
+        content = image_bytes()
+        first, second = self.upload(content), self.upload(content, name='copy.PNG')
+        self.assertEqual((first.status_code, second.status_code), (201, 201))
+
+        names = set(Post.objects.values_list('preview', flat=True))
+        digest = hashlib.sha256(content).hexdigest()
+        self.assertEqual(names, {f'post/preview/{digest[:2]}/{digest}.png'})
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'post', 'preview', digest[:2])), [f'{digest}.png'])
+
+        # Другое содержимое — другой файл
+        self.assertEqual(self.upload(image_bytes(color='blue')).status_code, 201)
+        self.assertEqual(len(set(Post.objects.values_list('preview', flat=True))), 2)
+
+    def test_files_without_hash_are_saved_as_usual(self):
+        storage = DeduplicatingFileSystemStorage()
+        first = storage.save('post/preview/renditions/a.jpg', SimpleUploadedFile('a.jpg', b'data'))
+        second = storage.save('post/preview/renditions/a.jpg', SimpleUploadedFile('a.jpg', b'data'))
+        self.assertEqual(first, 'post/preview/renditions/a.jpg')
+        self.assertNotEqual(first, second)
@@ -0,0 +1,101 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+from rest_framework.exceptions import ParseError
+
+# Сигнатуры допустимых изображений (JPEG, PNG, GIF); WebP проверяется отдельно
+IMAGE_SIGNATURES = (
+    b'\xff\xd8\xff',
+    b'\x89PNG\r\n\x1a\n',
+    b'GIF87a',
+    b'GIF89a',
+)
+# Сколько первых байт файла нужно для проверки сигнатуры
+SIGNATURE_SIZE = 12
+
+
+def get_upload_max_size() -> int:
+    return getattr(settings, 'UPLOAD_MAX_SIZE', 10 * 2 ** 20)
+
+
+def is_image_signature(head: bytes) -> bool:
+    return head.startswith(IMAGE_SIGNATURES) or (head[:4] == b'RIFF' and head[8:12] == b'WEBP')
+
+
+class UploadRejected(ParseError, MultiPartParserError):
+    """
+    Загрузка отклонена: файл слишком большой или не является изображением.
+
+    Наследует MultiPartParserError, чтобы парсер multipart прервал разбор,
+    и ParseError, чтобы клиент получил ответ 400.
+    """
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """
+    Обработчик загрузки, который пишет файл на диск частями по chunk_size,
+    не держа его в памяти, и по ходу записи считает SHA-256 содержимого
+    (атрибут content_hash загруженного файла).
+
+    Файл отклоняется до окончания загрузки, если он больше UPLOAD_MAX_SIZE
+    или его первые байты не совпадают с сигнатурой JPEG, PNG, GIF или WebP.
+    """
+    chunk_size = 64 * 2 ** 10
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None,
+                 content_type_extra=None):
+        if content_length is not None and content_length > get_upload_max_size():
+            raise UploadRejected(f"Файл {file_name} больше {get_upload_max_size()} байт.")
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        self.hasher = hashlib.sha256()
+        self.head = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > get_upload_max_size():
+            self.file.close()
+            raise UploadRejected(f"Файл {self.file_name} больше {get_upload_max_size()} байт.")
+        if len(self.head) < SIGNATURE_SIZE:
+            self.head += raw_data[:SIGNATURE_SIZE - len(self.head)]
+            if len(self.head) == SIGNATURE_SIZE:
+                self.check_signature()
+        self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if len(self.head) < SIGNATURE_SIZE:
+            self.check_signature()
+        uploaded_file = super().file_complete(file_size)
+        uploaded_file.content_hash = self.hasher.hexdigest()
+        return uploaded_file
+
+    def check_signature(self) -> None:
+        if not is_image_signature(self.head):
+            self.file.close()
+            raise UploadRejected(f"Файл {self.file_name} не является изображением.")
+
+
+class DeduplicatingFileSystemStorage(FileSystemStorage):
+    """
+    Файловое хранилище, которое сохраняет загруженные файлы с известным
+    хешем содержимого (см. HashingUploadHandler) под именем
+    <каталог upload_to>/<2 символа хеша>/<хеш><расширение>.
+
+    Одинаковые файлы хранятся один раз: если файл с таким хешем уже
+    есть, он не записывается повторно, а возвращается существующее имя.
+    Файлы без хеша (например, варианты изображений) сохраняются как обычно.
+    """
+
+    def save(self, name, content, max_length=None):
+        digest = getattr(content, 'content_hash', None)
+        if digest is None or name is None:
+            return super().save(name, content, max_length)
+
+        directory, filename = os.path.split(name)
+        name = os.path.join(directory, digest[:2], digest + os.path.splitext(filename)[1].lower())
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
@@ -1,35 +1,345 @@
 import logging
-from django.db import connections, OperationalError
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections, DatabaseError, InterfaceError, OperationalError
+from django.utils.module_loading import import_string
 
 # Настраиваем логгер для вывода сообщений об ошибках
 logger = logging.getLogger(__name__)
 
 
+def get_router_settings() -> dict:
+    """
+    Возвращает настройки роутера с значениями по умолчанию.
+    """
+    options = {
+        'PRIMARY': 'default',
+        'FALLBACK': 'extra',
+        'PROBE_INTERVAL': 5.0,
+        'FAILURE_THRESHOLD': 1,
+        'RECOVERY_TIMEOUT': 30.0,
+        'REPLICAS': {},
+        'MAX_REPLICA_LAG': 5.0,
+        'PIN_SECONDS': 3.0,
+        'LAG_PROBE': None,
+    }
+    options.update(getattr(settings, 'DATABASE_ROUTER_SETTINGS', {}))
+    return options
+
+
+# Момент (time.time()), до которого чтения текущего контекста идут в основную базу
+_pinned_until = ContextVar('db_pinned_until', default=0.0)
+
+
+def pin_to_primary(seconds: float) -> None:
+    """
+    Направляет чтения текущего контекста в основную базу на seconds секунд
+    (чтение собственных записей, пока реплики их не получили).
+    """
+    _pinned_until.set(max(_pinned_until.get(), time.time() + seconds))
+
+
+def get_pinned_until() -> float:
+    return _pinned_until.get()
+
+
+def reset_pin(until: float = 0.0) -> None:
+    _pinned_until.set(until)
+
+
+def measure_replication_lag(connection) -> float:
+    """
+    Возвращает отставание реплики в секундах.
+
+    Для PostgreSQL используется время последней применённой транзакции;
+    для остальных СУБД отставание считается нулевым.
+    """
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE WHEN pg_is_in_recovery() "
+            "THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) "
+            "ELSE 0 END"
+        )
+        return float(cursor.fetchone()[0])
+
+
+class CircuitBreaker:
+    """
+    Предохранитель (circuit breaker) для подключения к базе данных.
+
+    Состояние здоровья базы хранится в памяти процесса, поэтому решение
+    о маршрутизации не требует обращения к базе:
+        - CLOSED: база доступна; раз в probe_interval выполняется проверка.
+        - OPEN: база недоступна; запросы сразу уходят на резервную базу.
+        - HALF_OPEN: по истечении recovery_timeout выполняется пробное
+          подключение; при успехе предохранитель закрывается, иначе снова открывается.
+
+    Проверку выполняет один поток, остальные используют сохранённое состояние.
+    Ошибка реальной операции с базой (report_error) запускает проверку сразу,
+    не дожидаясь probe_interval: предохранитель открывается, только если
+    проверка подтвердит недоступность базы, а не из-за ошибки отдельного
+    запроса (блокировки, таймаута выполнения).
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, alias: str, probe_interval: float, failure_threshold: int,
+                 recovery_timeout: float, clock=time.monotonic):
+        self.alias = alias
+        self.probe_interval = probe_interval
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_probe = None
+        self.metrics = Counter()
+        self._probe_lock = threading.Lock()
+
+    def is_available(self) -> bool:
+        """
+        Возвращает True, если база считается доступной.
+        Подключение выполняется только если подошло время проверки.
+        """
+        now = self.clock()
+        if self.state == self.OPEN:
+            if now - self.opened_at >= self.recovery_timeout:
+                self._transition(self.HALF_OPEN)
+                self._probe()
+        elif self.last_probe is None or now - self.last_probe >= self.probe_interval:
+            self._probe()
+        return self.state == self.CLOSED
+
+    def check(self) -> bool:
+        """
+        Проверяет подключение к базе на отдельном соединении,
+        не затрагивая соединение текущего потока.
+        """
+        connection = connections.create_connection(self.alias)
+        try:
+            connection.ensure_connection()
+            return True
+        except OperationalError as e:
+            logger.error(f"База данных {self.alias} недоступна: {e}")
+            return False
+        finally:
+            connection.close()
+
+    def report_error(self) -> None:
+        """
+        Сообщает об ошибке подключения при выполнении реальной операции.
+        """
+        self.metrics['reported_errors'] += 1
+        if self.state == self.CLOSED:
+            self._probe()
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state != self.CLOSED:
+            self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.metrics['failures'] += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+            if self.state != self.OPEN:
+                self._transition(self.OPEN)
+
+    def _probe(self) -> None:
+        # Если проверку уже выполняет другой поток — используем текущее состояние
+        if not self._probe_lock.acquire(blocking=False):
+            return
+        try:
+            self.last_probe = self.clock()
+            self.metrics['probes'] += 1
+            if self.check():
+                self.record_success()
+            else:
+                self.record_failure()
+        finally:
+            self._probe_lock.release()
+
+    def _transition(self, state: str) -> None:
+        logger.warning(f"База данных {self.alias}: {self.state} -> {state}")
+        self.state = state
+        self.metrics[state] += 1
+
+
+class ReplicaBreaker(CircuitBreaker):
+    """
+    Предохранитель реплики: при каждой проверке также измеряет отставание
+    репликации. Реплика с отставанием больше max_lag не используется для чтения.
+    """
+
+    def __init__(self, alias: str, max_lag: float, lag_probe=None, **kwargs):
+        super().__init__(alias, **kwargs)
+        self.max_lag = max_lag
+        self.lag_probe = lag_probe or measure_replication_lag
+        self.lag = 0.0
+
+    def is_available(self) -> bool:
+        return super().is_available() and self.lag <= self.max_lag
+
+    def check(self) -> bool:
+        connection = connections.create_connection(self.alias)
+        try:
+            connection.ensure_connection()
+            self.lag = self.lag_probe(connection)
+            if self.lag > self.max_lag:
+                self.metrics['lagging'] += 1
+                logger.warning(f"Реплика {self.alias} отстаёт на {self.lag:.1f} с")
+            return True
+        except DatabaseError as e:
+            logger.error(f"Реплика {self.alias} недоступна: {e}")
+            return False
+        finally:
+            connection.close()
+
+
+class WeightedRoundRobin:
+    """
+    Плавный взвешенный round-robin (как в nginx): реплики выбираются
+    пропорционально весам и равномерно чередуются.
+    """
+
+    def __init__(self, weights: dict):
+        self.weights = dict(weights)
+        self.current = {alias: 0 for alias in weights}
+        self._lock = threading.Lock()
+
+    def choose(self, aliases: list):
+        """
+        Выбирает реплику среди доступных aliases.
+        """
+        if not aliases:
+            return None
+        with self._lock:
+            total = 0
+            for alias in aliases:
+                self.current[alias] += self.weights[alias]
+                total += self.weights[alias]
+            chosen = max(aliases, key=self.current.__getitem__)
+            self.current[chosen] -= total
+            return chosen
+
+
 class DatabaseRouter:
     """
     Роутер баз данных для автоматического переключения между основной и резервной базами.
     Если основная база данных недоступна, происходит переключение на резервную.
+
+    Доступность основной базы определяется предохранителем (CircuitBreaker)
+    с кешированным состоянием, поэтому выбор базы не выполняет запросов.
+
+    Если заданы реплики (REPLICAS), чтения распределяются между ними
+    взвешенным round-robin, записи идут в основную базу. После записи чтения
+    контекста закрепляются за основной базой на PIN_SECONDS секунд;
+    реплики с отставанием больше MAX_REPLICA_LAG пропускаются.
     """
+    _breakers = {}
+    _breakers_lock = threading.Lock()
+    _metrics = Counter()
+
+    def __init__(self):
+        self.options = get_router_settings()
+        self.primary = self.options['PRIMARY']
+        self.fallback = self.options['FALLBACK']
+        self.replicas = dict(self.options['REPLICAS'])
+        self.balancer = WeightedRoundRobin(self.replicas)
+        lag_probe = self.options['LAG_PROBE']
+        self.lag_probe = import_string(lag_probe) if isinstance(lag_probe, str) else lag_probe
+
+    def get_breaker(self, alias: str) -> CircuitBreaker:
+        """
+        Возвращает общий для процесса предохранитель базы данных.
+        """
+        breaker = self._breakers.get(alias)
+        if breaker is None:
+            options = dict(
+                probe_interval=self.options['PROBE_INTERVAL'],
+                failure_threshold=self.options['FAILURE_THRESHOLD'],
+                recovery_timeout=self.options['RECOVERY_TIMEOUT'],
+            )
+            if alias in self.replicas:
+                breaker = ReplicaBreaker(
+                    alias, max_lag=self.options['MAX_REPLICA_LAG'], lag_probe=self.lag_probe, **options
+                )
+            else:
+                breaker = CircuitBreaker(alias, **options)
+            with self._breakers_lock:
+                breaker = self._breakers.setdefault(alias, breaker)
+        return breaker
+
+    @classmethod
+    def metrics(cls) -> dict:
+        """
+        Возвращает метрики маршрутизации и состояния предохранителей.
+
+        Returns:
+            dict: Количество переключений на резервную базу и счётчики по каждой базе.
+        """
+        return {
+            'routing': dict(cls._metrics),
+            'databases': {
+                alias: {'state': breaker.state, 'lag': getattr(breaker, 'lag', None), **breaker.metrics}
+                for alias, breaker in cls._breakers.items()
+            },
+        }
+
+    @classmethod
+    def report_error(cls, exception: Exception) -> bool:
+        """
+        Передаёт ошибку подключения, возникшую при выполнении запроса к базе,
+        предохранителям всех баз: каждая доступная база проверяется сразу.
+
+        Returns:
+            bool: True, если исключение является ошибкой подключения к базе.
+        """
+        if not isinstance(exception, (OperationalError, InterfaceError)):
+            return False
+        for breaker in list(cls._breakers.values()):
+            breaker.report_error()
+        return True
 
     def _select_db(self) -> str:
         """
         Выбор базы данных для операции.
 
-        Пытается установить соединение с основной базой данных.
-        Если соединение не удается, переключается на резервную базу.
+        Использует кешированное состояние предохранителя основной базы.
+        Если основная база недоступна, переключается на резервную.
 
         Returns:
             str: Название выбранной базы данных ('default' или 'extra').
         """
-        try:
-            # Проверяем доступность основной базы данных
-            connection = connections['default']
-            connection.ensure_connection()
-            return 'default'
-        except OperationalError as e:
-            # Логируем ошибку и переключаемся на резервную базу данных
-            logger.error(f"Основная база данных недоступна, переключаемся на резервную: {e}")
-            return 'extra'
+        if self.get_breaker(self.primary).is_available():
+            return self.primary
+        self._metrics['failover'] += 1
+        return self.fallback
+
+    def _select_replica(self):
+        """
+        Выбирает реплику для чтения или None, если чтение нужно выполнить в основной базе.
+        """
+        if not self.replicas:
+            return None
+        # Внутри транзакции и сразу после записи читаем из основной базы
+        if connections[self.primary].in_atomic_block or get_pinned_until() > time.time():
+            self._metrics['pinned_read'] += 1
+            return None
+
+        available = [alias for alias in self.replicas if self.get_breaker(alias).is_available()]
+        alias = self.balancer.choose(available)
+        self._metrics['replica_read' if alias else 'replica_unavailable'] += 1
+        return alias
 
     def db_for_read(self, model: type, **hints) -> str:
         """
@@ -42,7 +352,7 @@ class DatabaseRouter:
         Returns:
             str: Название базы данных.
         """
-        return self._select_db()
+        return self._select_replica() or self._select_db()
 
     def db_for_write(self, model: type, **hints) -> str:
         """
@@ -55,12 +365,17 @@ class DatabaseRouter:
         Returns:
             str: Название базы данных.
         """
+        if self.replicas:
+            pin_to_primary(self.options['PIN_SECONDS'])
         return self._select_db()
 
     def allow_relation(self, obj1: object, obj2: object, **hints) -> bool:
         """
         Определяет, разрешены ли отношения между двумя объектами.
 
+        Связь разрешена, если оба объекта загружены из баз, которыми управляет роутер.
+        Проверка не обращается к базе данных.
+
         Args:
             obj1 (object): Первый объект.
             obj2 (object): Второй объект.
@@ -69,9 +384,8 @@ class DatabaseRouter:
         Returns:
             bool: True, если связь разрешена, иначе False.
         """
-        db1 = self._select_db()
-        db2 = self._select_db()
-        return db1 == db2
+        managed = {self.primary, self.fallback, *self.replicas}
+        return obj1._state.db in managed and obj2._state.db in managed
 
     def allow_migrate(self, db: str, app_label: str, model_name: str = None, **hints) -> bool:
         """
@@ -86,7 +400,5 @@ class DatabaseRouter:
         Returns:
             bool: True, если миграция разрешена.
         """
-        # Миграции проводим на всех базах данных
-        return True
-
-
+        # Миграции проводим на всех базах данных, кроме реплик: они получают схему из основной
+        return db not in self.replicas
@@ -0,0 +1,62 @@
+import time
+
+from config.db_router import DatabaseRouter, get_pinned_until, get_router_settings, reset_pin
+
+
+class ReplicaPinMiddleware:
+    """
+    Middleware для чтения собственных записей при работе с репликами.
+
+    Если запрос выполнил запись, клиенту выставляется cookie с моментом,
+    до которого его следующие запросы читают данные из основной базы.
+    Состояние закрепления сбрасывается в начале каждого запроса.
+    """
+    cookie_name = 'db_pin'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.options = get_router_settings()
+
+    def __call__(self, request):
+        if not self.options['REPLICAS']:
+            return self.get_response(request)
+
+        try:
+            cookie_until = float(request.COOKIES.get(self.cookie_name, 0))
+        except ValueError:
+            cookie_until = 0.0
+        reset_pin(cookie_until if cookie_until > time.time() else 0.0)
+
+        response = self.get_response(request)
+
+        # Запрос выполнил запись — продлеваем закрепление для следующих запросов клиента
+        pinned_until = get_pinned_until()
+        if pinned_until > max(cookie_until, time.time()):
+            response.set_cookie(
+                self.cookie_name,
+                str(pinned_until),
+                max_age=int(self.options['PIN_SECONDS']) + 1,
+                httponly=True,
+                samesite='Lax',
+            )
+        reset_pin()
+        return response
+
+
+class DatabaseErrorMiddleware:
+    """
+    Middleware, которое передаёт ошибки подключения к базе данных,
+    возникшие при обработке запроса, предохранителям роутера баз данных
+    (DatabaseRouter.report_error). Без него предохранитель узнаёт
+    о недоступности базы только при плановой проверке.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        DatabaseRouter.report_error(exception)
+        return None
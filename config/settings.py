@@ -1,4 +1,5 @@
 import os
+import sys
 from datetime import timedelta
 
 import environ
@@ -12,6 +13,9 @@ BASE_DIR = root()
 # Security and Debug Configuration
 SECRET_KEY = env.str('SECRET_KEY')
 DEBUG = env.bool('DEBUG', default=True)
+# Запуск тестов (manage.py test): буферы blog.counters, blog.tracking и users.activity
+# сбрасываются сразу, без фоновых потоков, которые пишут в тестовую базу параллельно с тестами
+TESTING = sys.argv[1:2] == ['test']
 
 # Allowed Hosts (space-separated string converted to a list)
 ALLOWED_HOSTS = env.str('ALLOWED_HOSTS', default='').split(' ')
@@ -87,6 +91,7 @@ INSTALLED_APPS = [
     'blog',
     'comments',
     'analytics',
+    'common',
 
     # Optional -- requires install using `django-allauth[socialaccount]`.
     'allauth.socialaccount',
@@ -102,6 +107,8 @@ MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     # 'django.middleware.common.BrokenLinkEmailsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'config.middleware.ReplicaPinMiddleware',
+    'config.middleware.DatabaseErrorMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -109,6 +116,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "allauth.account.middleware.AccountMiddleware",
+    'users.middleware.UserActivityMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -138,6 +146,24 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # region ------------------------- DATABASE CONFIGURATION -----------------------------------
 DATABASE_ROUTERS = ["config.db_router.DatabaseRouter"]
 
+# Предохранитель основной базы: интервал проверки, порог ошибок и время до пробного подключения (сек.)
+DATABASE_ROUTER_SETTINGS = {
+    'PRIMARY': 'default',
+    'FALLBACK': 'extra',
+    'PROBE_INTERVAL': env.float('DB_PROBE_INTERVAL', default=5.0),
+    'FAILURE_THRESHOLD': env.int('DB_FAILURE_THRESHOLD', default=1),
+    'RECOVERY_TIMEOUT': env.float('DB_RECOVERY_TIMEOUT', default=30.0),
+    # Реплики для чтения {alias: вес}; алиасы должны быть описаны в DATABASES
+    # (для тестов реплики можно объявить как SQLite-алиасы с 'TEST': {'MIRROR': 'default'})
+    'REPLICAS': {},
+    # Реплики с отставанием больше MAX_REPLICA_LAG секунд пропускаются
+    'MAX_REPLICA_LAG': env.float('DB_MAX_REPLICA_LAG', default=5.0),
+    # Сколько секунд после записи читать из основной базы
+    'PIN_SECONDS': env.float('DB_PIN_SECONDS', default=3.0),
+    # Функция измерения отставания реплики: callable(connection) -> float (секунды)
+    'LAG_PROBE': None,
+}
+
 DATABASES = {
     'extra': {
         'ENGINE': 'django.db.backends.postgresql_psycopg2',
@@ -177,6 +203,21 @@ AUTHENTICATION_BACKENDS = [
     'allauth.account.auth_backends.AuthenticationBackend',
 ]
 
+# region ---------------------- CACHE -------------------------------------------------------
+# Локальный кеш процесса с вытеснением давно не использованных ключей (LRU) по MAX_ENTRIES
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'blog-api',
+        'OPTIONS': {
+            'MAX_ENTRIES': env.int('CACHE_MAX_ENTRIES', default=5000),
+        },
+    },
+}
+# Время жизни (сек.) закешированных ответов на анонимные запросы (common.cache)
+RESPONSE_CACHE_TIMEOUT = env.int('RESPONSE_CACHE_TIMEOUT', default=60)
+# endregion ---------------------------------------------------------------------------------
+
 # region ---------------------- LOCALIZATION ------------------------------------------------
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -213,6 +254,32 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 # MEDIA_TEST_ROOT = os.path.join(BASE_DIR, 'media/test/')
+
+# Уменьшенные варианты изображений (common.images): {название: максимальная сторона в пикселях},
+# формат (WEBP или JPEG), качество и число потоков обработки (0 — обработка в потоке запроса)
+IMAGE_RENDITIONS = {
+    'thumbnail': 160,
+    'card': 640,
+    'full': 1600,
+}
+IMAGE_RENDITION_FORMAT = env.str('IMAGE_RENDITION_FORMAT', default='WEBP')
+IMAGE_RENDITION_QUALITY = env.int('IMAGE_RENDITION_QUALITY', default=80)
+IMAGE_WORKERS = env.int('IMAGE_WORKERS', default=2)
+
+# Загрузки пишутся на диск частями с подсчётом хеша (common.uploads): принимаются только
+# изображения не больше UPLOAD_MAX_SIZE байт, одинаковые файлы хранятся один раз
+FILE_UPLOAD_HANDLERS = ['common.uploads.HashingUploadHandler']
+UPLOAD_MAX_SIZE = env.int('UPLOAD_MAX_SIZE', default=10 * 2 ** 20)
+# Временный каталог загрузок: на одной файловой системе с MEDIA_ROOT файл перемещается без копирования
+FILE_UPLOAD_TEMP_DIR = env.str('FILE_UPLOAD_TEMP_DIR', default=None)
+STORAGES = {
+    'default': {
+        'BACKEND': 'common.uploads.DeduplicatingFileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
 # endregion ---------------------------------------------------------------------------------
 
 # region ---------------------- REST FRAMEWORK ----------------------------------------------
@@ -222,8 +289,8 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
         # 'rest_framework.authentication.BasicAuthentication',
-        'dj_rest_auth.jwt_auth.JWTCookieAuthentication',
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # Заголовок Authorization и cookie; для GET пользователь собирается из claims токена
+        'users.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PARSER_CLASSES': (
         'rest_framework.parsers.JSONParser',
@@ -231,16 +298,95 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FileUploadParser',
     ),
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'common.pagination.KeysetPagination',
+    'PAGE_SIZE': 20,
+}
+REST_USE_JWT = True
+
+# Настройки dj_rest_auth: при заданном REST_AUTH значения из REST_FRAMEWORK не читаются
+REST_AUTH = {
     'USE_JWT': True,
     'JWT_AUTH_COOKIE': 'users-auth',
     'JWT_AUTH_REFRESH_COOKIE': 'users-refresh-token',
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Роль, признак блокировки и версия токенов в claims (users.authentication)
+    'JWT_TOKEN_CLAIMS_SERIALIZER': 'users.authentication.ClaimsTokenObtainPairSerializer',
 }
-REST_USE_JWT = True
 
 
 # endregion -------------------------------------------------------------------------
 
+# region ---------------------- BLOG --------------------------------------------------------
+# Интервал (сек.) и размер буфера для сброса счётчиков постов (blog.counters)
+POST_COUNTERS_FLUSH_INTERVAL = env.float('POST_COUNTERS_FLUSH_INTERVAL', default=0.0 if TESTING else 5.0)
+POST_COUNTERS_MAX_PENDING = env.int('POST_COUNTERS_MAX_PENDING', default=500)
+# Интервал (сек.) и размер пачки для записи просмотров постов (blog.tracking)
+POST_VIEWS_FLUSH_INTERVAL = env.float('POST_VIEWS_FLUSH_INTERVAL', default=0.0 if TESTING else 5.0)
+POST_VIEWS_FLUSH_SIZE = env.int('POST_VIEWS_FLUSH_SIZE', default=1000)
+# С какого числа просмотров прирост уникальных зрителей оценивается HyperLogLog (0 — всегда точно)
+POST_VIEWS_ESTIMATOR_THRESHOLD = env.int('POST_VIEWS_ESTIMATOR_THRESHOLD', default=0)
+# Сколько оценщиков HyperLogLog (по 4 КБ) хранить в памяти и сколько последних зрителей загружать в новый
+POST_VIEWS_ESTIMATOR_LIMIT = env.int('POST_VIEWS_ESTIMATOR_LIMIT', default=256)
+POST_VIEWS_ESTIMATOR_SEED_SIZE = env.int('POST_VIEWS_ESTIMATOR_SEED_SIZE', default=50000)
+
+# Хранилище материализованных лент (blog.feed.DatabaseFeedStore / blog.feed.InMemoryFeedStore)
+FEED_STORE = env.str('FEED_STORE', default='blog.feed.DatabaseFeedStore')
+# Авторы с большим числом подписчиков не рассылаются по лентам, а читаются при запросе
+FEED_FANOUT_LIMIT = env.int('FEED_FANOUT_LIMIT', default=10000)
+# Сколько последних постов автора добавлять в ленту при подписке
+FEED_BACKFILL_LIMIT = env.int('FEED_BACKFILL_LIMIT', default=200)
+
+# Полнотекстовый поиск (blog.search): максимум ранжированных результатов на запрос,
+# конфигурация текстового поиска PostgreSQL и время кеширования словаря для исправления опечаток
+SEARCH_MAX_RESULTS = env.int('SEARCH_MAX_RESULTS', default=1000)
+SEARCH_CONFIG = env.str('SEARCH_CONFIG', default='simple')
+SEARCH_VOCABULARY_TIMEOUT = env.int('SEARCH_VOCABULARY_TIMEOUT', default=300)
+# Сколько секунд хранить ранжированный список результатов запроса для постраничного просмотра
+SEARCH_RESULTS_TIMEOUT = env.int('SEARCH_RESULTS_TIMEOUT', default=60)
+
+# Популярные посты (blog.trending): рейтинг = (просмотры * VIEW + лайки * LIKE + комментарии * COMMENT)
+# / (возраст в часах + 2) ** GRAVITY; пересчитываются посты, опубликованные за окно TRENDING_WINDOW_HOURS
+TRENDING_VIEW_WEIGHT = env.float('TRENDING_VIEW_WEIGHT', default=1.0)
+TRENDING_LIKE_WEIGHT = env.float('TRENDING_LIKE_WEIGHT', default=3.0)
+TRENDING_COMMENT_WEIGHT = env.float('TRENDING_COMMENT_WEIGHT', default=5.0)
+TRENDING_GRAVITY = env.float('TRENDING_GRAVITY', default=1.8)
+TRENDING_WINDOW_HOURS = env.int('TRENDING_WINDOW_HOURS', default=72)
+# Сколько популярных постов хранится для каждого тега и максимум постов в ответе
+TRENDING_TAG_SIZE = env.int('TRENDING_TAG_SIZE', default=100)
+TRENDING_LIMIT = env.int('TRENDING_LIMIT', default=50)
+
+# Максимальное количество элементов в пакетном запросе лайков (comments.likes)
+LIKE_BATCH_MAX_ITEMS = env.int('LIKE_BATCH_MAX_ITEMS', default=500)
+# endregion -------------------------------------------------------------------------
+
+# region ---------------------- ANALYTICS ---------------------------------------------------
+# Инкрементальная агрегация (analytics.rollup) не берёт события моложе стольких секунд:
+# строки ещё не закоммиченных транзакций могут получить меньший ID, чем уже видимые
+ANALYTICS_ROLLUP_LAG = env.int('ANALYTICS_ROLLUP_LAG', default=60)
+# Временные ряды автора (analytics.series): максимум точек в ряду, максимальный период
+# почасового ряда (в днях) и время кеширования ответа (сек.)
+ANALYTICS_MAX_POINTS = env.int('ANALYTICS_MAX_POINTS', default=120)
+ANALYTICS_HOURLY_MAX_DAYS = env.int('ANALYTICS_HOURLY_MAX_DAYS', default=7)
+ANALYTICS_CACHE_TIMEOUT = env.int('ANALYTICS_CACHE_TIMEOUT', default=60)
+# endregion -------------------------------------------------------------------------
+
+# region ---------------------- USERS -------------------------------------------------------
+# Максимальное количество пользователей в пакетном запросе подписки или отписки (users.follows)
+FOLLOW_BATCH_MAX_ITEMS = env.int('FOLLOW_BATCH_MAX_ITEMS', default=100)
+# Количество рекомендаций подписок и сколько последних подписок пользователя для них учитывается
+FOLLOW_SUGGESTIONS_LIMIT = env.int('FOLLOW_SUGGESTIONS_LIMIT', default=20)
+FOLLOW_SUGGESTIONS_SAMPLE = env.int('FOLLOW_SUGGESTIONS_SAMPLE', default=200)
+# Активность пользователей (users.activity): last_activity пишется не чаще раза в
+# USER_ACTIVITY_WRITE_INTERVAL сек. на пользователя, пачками раз в USER_ACTIVITY_FLUSH_INTERVAL сек.
+USER_ACTIVITY_WRITE_INTERVAL = env.float('USER_ACTIVITY_WRITE_INTERVAL', default=300.0)
+USER_ACTIVITY_FLUSH_INTERVAL = env.float('USER_ACTIVITY_FLUSH_INTERVAL', default=0.0 if TESTING else 5.0)
+USER_ACTIVITY_FLUSH_SIZE = env.int('USER_ACTIVITY_FLUSH_SIZE', default=500)
+# Сколько секунд после последнего запроса пользователь считается онлайн
+USER_ONLINE_WINDOW = env.float('USER_ONLINE_WINDOW', default=300.0)
+# Максимальное количество ID в запросе статуса онлайн (users.views.OnlineStatusView)
+ONLINE_STATUS_MAX_IDS = env.int('ONLINE_STATUS_MAX_IDS', default=200)
+# endregion -------------------------------------------------------------------------
+
 # region ---------------------- SIMPLE JWT & DJOSER -----------------------------------------
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=1),
@@ -248,7 +394,10 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,  # Обновление refresh-токена при каждом запросе
     "BLACKLIST_AFTER_ROTATION": True,  # Аннулирование старого refresh-токена
     "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_OBTAIN_SERIALIZER": "users.authentication.ClaimsTokenObtainPairSerializer",
 }
+# Время кеширования версии токенов пользователя (сек.), по которой проверяется отзыв токенов
+TOKEN_VERSION_CACHE_TIMEOUT = env.int('TOKEN_VERSION_CACHE_TIMEOUT', default=60)
 
 # DJOSER = {
 #     'PASSWORD_RESET_CONFIRM_URL': '#/password/reset/confirm/{uid}/{token}',
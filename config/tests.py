@@ -0,0 +1,171 @@
+from collections import Counter
+from unittest import mock
+
+from django.db import OperationalError, connections
+from django.test import SimpleTestCase, override_settings
+
+from config.db_router import CircuitBreaker, DatabaseRouter, WeightedRoundRobin, pin_to_primary, reset_pin
+
+# Несуществующий каталог: SQLite не может открыть файл базы
+BROKEN_DATABASE = '/nonexistent/db.sqlite3'
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class DatabaseRouterTest(SimpleTestCase):
+    """
+    Роутер баз данных на SQLite-алиасах: предохранитель, пропуск отстающих
+    реплик, взвешенный выбор реплики и чтение собственных записей.
+    """
+    aliases = ('primary', 'fallback', 'replica1', 'replica2', 'broken')
+
+    def setUp(self):
+        for alias in self.aliases:
+            self.set_database(alias, BROKEN_DATABASE if alias == 'broken' else ':memory:')
+        self.addCleanup(self.remove_databases)
+        # Алиасы добавляются в тесте: разрешаем подключения к ним после проверок setUpClass
+        self.patch(type(self), 'databases', frozenset(self.aliases))
+        # Предохранители и метрики общие для процесса — изолируем их в каждом тесте
+        self.patch(DatabaseRouter, '_breakers', {})
+        self.patch(DatabaseRouter, '_metrics', Counter())
+        self.lags = {}
+        reset_pin()
+        self.addCleanup(reset_pin)
+
+    def patch(self, target, name: str, value) -> None:
+        patcher = mock.patch.object(target, name, value)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def set_database(alias: str, name: str) -> None:
+        connections.settings[alias] = {**connections.settings['default'], 'NAME': name}
+
+    def remove_databases(self):
+        for alias in self.aliases:
+            connections.settings.pop(alias, None)
+
+    def measure_lag(self, connection) -> float:
+        return self.lags.get(connection.alias, 0.0)
+
+    def router(self, **options) -> DatabaseRouter:
+        router_settings = {
+            'PRIMARY': 'primary',
+            'FALLBACK': 'fallback',
+            'PROBE_INTERVAL': 5.0,
+            'FAILURE_THRESHOLD': 1,
+            'RECOVERY_TIMEOUT': 30.0,
+            'MAX_REPLICA_LAG': 5.0,
+            'PIN_SECONDS': 3.0,
+            'LAG_PROBE': self.measure_lag,
+            **options,
+        }
+        with override_settings(DATABASE_ROUTER_SETTINGS=router_settings):
+            return DatabaseRouter()
+
+    def test_breaker_opens_and_recovers(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker('broken', probe_interval=5.0, failure_threshold=1,
+                                 recovery_timeout=30.0, clock=clock)
+        self.assertFalse(breaker.is_available())
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+        # До recovery_timeout база не проверяется
+        clock.now = 29.0
+        self.assertFalse(breaker.is_available())
+        self.assertEqual(breaker.metrics['probes'], 1)
+
+        self.set_database('broken', ':memory:')
+        clock.now = 30.0
+        self.assertTrue(breaker.is_available())
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(breaker.metrics[CircuitBreaker.HALF_OPEN], 1)
+
+    def test_breaker_probes_once_per_interval(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker('primary', probe_interval=5.0, failure_threshold=1,
+                                 recovery_timeout=30.0, clock=clock)
+        for _ in range(3):
+            self.assertTrue(breaker.is_available())
+        self.assertEqual(breaker.metrics['probes'], 1)
+        clock.now = 5.0
+        breaker.is_available()
+        self.assertEqual(breaker.metrics['probes'], 2)
+
+    def test_failover_to_fallback(self):
+        self.set_database('primary', BROKEN_DATABASE)
+        router = self.router()
+        self.assertEqual(router.db_for_write(None), 'fallback')
+        self.assertEqual(router.db_for_read(None), 'fallback')
+        self.assertEqual(DatabaseRouter.metrics()['routing']['failover'], 2)
+
+    def test_reported_error_probes_immediately(self):
+        router = self.router()
+        self.assertEqual(router.db_for_write(None), 'primary')
+
+        # Сбой запроса без подтверждения проверкой не открывает предохранитель
+        self.assertTrue(DatabaseRouter.report_error(OperationalError('database is locked')))
+        self.assertEqual(router.db_for_write(None), 'primary')
+
+        # База стала недоступна раньше плановой проверки
+        self.set_database('primary', BROKEN_DATABASE)
+        self.assertEqual(router.db_for_write(None), 'primary')
+        DatabaseRouter.report_error(OperationalError('connection refused'))
+        self.assertEqual(router.db_for_write(None), 'fallback')
+        self.assertEqual(router.get_breaker('primary').metrics['reported_errors'], 2)
+
+        self.assertFalse(DatabaseRouter.report_error(ValueError()))
+
+    def test_lagging_replica_is_skipped(self):
+        self.lags = {'replica1': 10.0}
+        router = self.router(REPLICAS={'replica1': 1, 'replica2': 1})
+        self.assertEqual({router.db_for_read(None) for _ in range(4)}, {'replica2'})
+
+    def test_all_replicas_lagging_reads_primary(self):
+        self.lags = {'replica1': 10.0, 'replica2': 10.0}
+        router = self.router(REPLICAS={'replica1': 1, 'replica2': 1})
+        self.assertEqual(router.db_for_read(None), 'primary')
+        self.assertEqual(DatabaseRouter.metrics()['routing']['replica_unavailable'], 1)
+
+    def test_unavailable_replica_is_skipped(self):
+        router = self.router(REPLICAS={'broken': 1, 'replica2': 1})
+        self.assertEqual({router.db_for_read(None) for _ in range(4)}, {'replica2'})
+
+    def test_weighted_selection(self):
+        router = self.router(REPLICAS={'replica1': 3, 'replica2': 1})
+        reads = [router.db_for_read(None) for _ in range(8)]
+        self.assertEqual(reads.count('replica1'), 6)
+        self.assertEqual(reads.count('replica2'), 2)
+        # Плавный round-robin не выдаёт одну реплику подряд больше её веса
+        self.assertNotIn(['replica1'] * 4, [reads[i:i + 4] for i in range(5)])
+
+    def test_weighted_round_robin_among_available(self):
+        balancer = WeightedRoundRobin({'a': 5, 'b': 1, 'c': 1})
+        self.assertIsNone(balancer.choose([]))
+        self.assertEqual({balancer.choose(['b', 'c']) for _ in range(2)}, {'b', 'c'})
+
+    def test_reads_pinned_after_write(self):
+        router = self.router(REPLICAS={'replica1': 1})
+        self.assertEqual(router.db_for_read(None), 'replica1')
+
+        self.assertEqual(router.db_for_write(None), 'primary')
+        self.assertEqual(router.db_for_read(None), 'primary')
+        self.assertEqual(DatabaseRouter.metrics()['routing']['pinned_read'], 1)
+
+        reset_pin()
+        self.assertEqual(router.db_for_read(None), 'replica1')
+
+        pin_to_primary(-1)
+        self.assertEqual(router.db_for_read(None), 'replica1')
+
+    def test_replicas_are_not_migrated(self):
+        router = self.router(REPLICAS={'replica1': 1})
+        self.assertTrue(router.allow_migrate('primary', 'blog'))
+        self.assertFalse(router.allow_migrate('replica1', 'blog'))
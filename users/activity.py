@@ -0,0 +1,123 @@
+import atexit
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from blog.counters import BackgroundFlushBuffer
+
+
+class UserActivityBuffer(BackgroundFlushBuffer):
+    """
+    Буфер активности пользователей (last_activity).
+
+    Время последнего запроса пользователя хранится в памяти процесса;
+    в базу оно попадает не чаще раза в write_interval секунд на пользователя.
+    Накопленные значения сбрасываются пачкой одним запросом
+    UPDATE ... SET last_activity = CASE id WHEN ... END на flush_size
+    пользователей. По тем же данным в памяти отвечает online_user_ids().
+    """
+    worker_name = 'user-activity-flush'
+
+    def __init__(self, write_interval: float = None, flush_interval: float = None,
+                 flush_size: int = None, online_window: float = None):
+        self.write_interval = write_interval if write_interval is not None else getattr(
+            settings, 'USER_ACTIVITY_WRITE_INTERVAL', 300.0
+        )
+        self.flush_interval = flush_interval if flush_interval is not None else getattr(
+            settings, 'USER_ACTIVITY_FLUSH_INTERVAL', 5.0
+        )
+        self.flush_size = flush_size if flush_size is not None else getattr(
+            settings, 'USER_ACTIVITY_FLUSH_SIZE', 500
+        )
+        self.online_window = online_window if online_window is not None else getattr(
+            settings, 'USER_ONLINE_WINDOW', 300.0
+        )
+        self._seen = {}
+        self._written = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def touch(self, user_id: int) -> None:
+        """
+        Отмечает активность пользователя; запись в базу ставится в очередь,
+        только если с прошлой записи прошло не меньше write_interval секунд.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._seen[user_id] = now
+            if now - self._written.get(user_id, -self.write_interval) < self.write_interval:
+                return
+            self._written[user_id] = now
+            self._pending[user_id] = timezone.now()
+            overflow = len(self._pending) >= self.flush_size
+
+        if self.flush_interval <= 0 or overflow:
+            self.flush()
+        else:
+            self._ensure_worker()
+
+    def online_user_ids(self, user_ids=None) -> set:
+        """
+        Возвращает ID пользователей, активных в этом процессе за последние
+        online_window секунд (при user_ids — только из этого списка).
+        """
+        since = time.monotonic() - self.online_window
+        with self._lock:
+            if user_ids is None:
+                return {user_id for user_id, seen in self._seen.items() if seen >= since}
+            return {user_id for user_id in user_ids if self._seen.get(user_id, since - 1) >= since}
+
+    def flush(self) -> int:
+        """
+        Сбрасывает накопленное время активности в базу данных и забывает
+        пользователей, давно не проявлявших активности.
+
+        Пачки, которые не удалось записать, возвращаются в буфер и будут
+        записаны следующим сбросом; ошибка пробрасывается.
+
+        Returns:
+            int: Количество обновлённых пользователей.
+        """
+        from users.models import User
+
+        now = time.monotonic()
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            horizon = now - max(self.write_interval, self.online_window)
+            self._seen = {user_id: seen for user_id, seen in self._seen.items() if seen >= horizon}
+            self._written = {user_id: seen for user_id, seen in self._written.items() if seen >= horizon}
+
+        updated = 0
+        items = list(pending.items())
+        for start in range(0, len(items), self.flush_size):
+            batch = items[start:start + self.flush_size]
+            last_activity = Case(
+                *[When(pk=user_id, then=Value(moment)) for user_id, moment in batch],
+                output_field=DateTimeField(),
+            )
+            try:
+                # Другой процесс мог уже записать более позднее время
+                updated += User.objects.filter(pk__in=[user_id for user_id, _ in batch]).update(
+                    last_activity=Greatest(F('last_activity'), last_activity)
+                )
+            except Exception:
+                self._restore(items[start:])
+                raise
+        return updated
+
+    def _restore(self, items) -> None:
+        """
+        Возвращает в буфер время активности, которое не удалось записать.
+        """
+        with self._lock:
+            for user_id, moment in items:
+                self._pending[user_id] = max(moment, self._pending.get(user_id, moment))
+
+
+user_activity = UserActivityBuffer()
+atexit.register(user_activity.flush_at_exit)
@@ -1,9 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth import get_user_model
 
-from users.models import Profile
+from users.models import Follow, Profile
 
 User = get_user_model()
 
 admin.site.register(User)
-admin.site.register(Profile)
\ No newline at end of file
+admin.site.register(Profile)
+admin.site.register(Follow)
@@ -1,10 +1,18 @@
 from rest_framework import serializers
+from common.images import RenditionsField
 from users.models import Profile
 
 
 class ProfileSerializer(serializers.ModelSerializer):
+    """
+    Профиль пользователя. Подписчики и подписки отдаются количеством,
+    их списки — отдельными постраничными эндпоинтами. Для изображений
+    дополнительно отдаются ссылки на их уменьшенные варианты.
+    """
     photo = serializers.ImageField(required=False, read_only=True)
+    photo_renditions = RenditionsField('photo')
     background_image = serializers.ImageField(required=False, read_only=True)
+    background_image_renditions = RenditionsField('background_image')
     linkedin = serializers.URLField(required=False, read_only=True)
     twitter = serializers.URLField(required=False, read_only=True)
     website = serializers.URLField(required=False, read_only=True)
@@ -12,7 +20,7 @@ class ProfileSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Profile
-        fields = '__all__'
+        exclude = ('renditions',)
 
 
 class ProfileUpdateSerializer(serializers.ModelSerializer):
@@ -1,4 +1,5 @@
 from dj_rest_auth.registration.serializers import RegisterSerializer
+from django.conf import settings
 from django.contrib.auth import authenticate, get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.db import transaction
@@ -7,6 +8,7 @@ from phonenumber_field.serializerfields import PhoneNumberField
 from rest_framework import serializers
 from rest_framework.exceptions import ParseError
 from rest_framework.validators import UniqueValidator
+from common.images import RenditionsField
 from users.api.nested.profile import ProfileSerializer, ProfileUpdateSerializer
 from users.models import Profile
 
@@ -141,3 +143,54 @@ class UserUpdateSerializer(serializers.ModelSerializer):
                 self._update_profile(instance.profile, profile_data)
 
         return instance
+
+
+class FollowUserSerializer(serializers.ModelSerializer):
+    """
+    Краткая информация о пользователе в списках подписчиков и подписок.
+    """
+    photo = serializers.ImageField(source='profile.photo', read_only=True)
+    photo_renditions = RenditionsField('photo', source='profile')
+
+    class Meta:
+        model = User
+        fields = (
+            'id',
+            'first_name',
+            'last_name',
+            'photo',
+            'photo_renditions',
+        )
+
+
+class FollowSuggestionSerializer(FollowUserSerializer):
+    """
+    Рекомендуемый для подписки пользователь.
+    """
+    mutual_count = serializers.IntegerField(
+        read_only=True,
+        help_text="Сколько пользователей из подписок текущего пользователя подписаны на него.",
+    )
+
+    class Meta(FollowUserSerializer.Meta):
+        fields = FollowUserSerializer.Meta.fields + ('mutual_count',)
+
+
+class FollowBatchSerializer(serializers.Serializer):
+    """
+    Пакетный запрос подписки или отписки.
+    """
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.FOLLOW_BATCH_MAX_ITEMS,
+    )
+
+
+class FollowResultSerializer(serializers.Serializer):
+    """
+    Результат подписки или отписки по одному пользователю.
+    """
+    user_id = serializers.IntegerField()
+    following = serializers.BooleanField()
+    status = serializers.ChoiceField(choices=('created', 'deleted', 'unchanged', 'not_found'))
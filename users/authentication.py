@@ -0,0 +1,91 @@
+from dj_rest_auth.jwt_auth import JWTCookieAuthentication
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from users.models import ClaimsUser, User
+
+# Поля пользователя, которые переносятся в токен: {поле: claim}
+TOKEN_CLAIMS = {
+    'role': 'role',
+    'is_banned': 'is_banned',
+    'token_version': 'ver',
+}
+
+
+def get_token_version_timeout() -> int:
+    return getattr(settings, 'TOKEN_VERSION_CACHE_TIMEOUT', 60)
+
+
+def _token_version_key(user_id) -> str:
+    return f'auth:token-version:{user_id}'
+
+
+def set_token_version(user_id, version: int) -> None:
+    cache.set(_token_version_key(user_id), version, get_token_version_timeout())
+
+
+def get_token_version(user_id):
+    """
+    Возвращает текущую версию токенов пользователя: из кеша или одним запросом
+    (None, если пользователя нет). Новая версия записывается в кеш при
+    сохранении пользователя; при локальном кеше в других процессах отзыв
+    вступает в силу не позже чем через TOKEN_VERSION_CACHE_TIMEOUT.
+    """
+    version = cache.get(_token_version_key(user_id))
+    if version is None:
+        version = User.objects.filter(pk=user_id).values_list('token_version', flat=True).first()
+        if version is not None:
+            set_token_version(user_id, version)
+    return version
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Добавляет в токены роль, признак блокировки и версию токенов пользователя.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for field, claim in TOKEN_CLAIMS.items():
+            token[claim] = getattr(user, field)
+        return token
+
+
+class ClaimsJWTAuthentication(JWTCookieAuthentication):
+    """
+    JWT-аутентификация (заголовок или cookie), которая для безопасных
+    методов не загружает пользователя из базы, а собирает его из claims
+    токена (ClaimsUser).
+
+    Отзыв токенов проверяется по версии токенов пользователя из кеша.
+    Для изменяющих запросов и токенов без claims пользователь
+    загружается как обычно.
+    """
+
+    def authenticate(self, request):
+        self.stateless = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        version = validated_token.get(TOKEN_CLAIMS['token_version'])
+        if version is None:
+            return super().get_user(validated_token)
+
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if version != get_token_version(user_id):
+            raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+        if not self.stateless:
+            return super().get_user(validated_token)
+
+        values = {'id': user_id}
+        for field, claim in TOKEN_CLAIMS.items():
+            values[field] = validated_token[claim]
+        # from_db сопоставляет значения с полями в порядке concrete_fields
+        field_names = [field.attname for field in ClaimsUser._meta.concrete_fields if field.attname in values]
+        return ClaimsUser.from_db(None, field_names, [values[name] for name in field_names])
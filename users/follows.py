@@ -0,0 +1,165 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef
+from django.utils import timezone
+
+from users.models import Follow, Profile, User
+from users.signals import follows_created, follows_deleted
+
+
+def follow(follower, user_ids) -> list:
+    """
+    Подписывает пользователя на авторов user_ids за фиксированное число запросов.
+
+    Операция идемпотентна: существующие подписки, несуществующие
+    пользователи и подписка на самого себя пропускаются.
+
+    Запросы: один запрос авторов с признаком подписки, один bulk_create,
+    один запрос действительно вставленных подписок и два UPDATE счётчиков
+    профилей. Подписки, которые параллельный запрос успел создать раньше,
+    не вставляются и счётчики не увеличивают.
+
+    Returns:
+        list: Результат по каждому ID: {'user_id', 'following', 'status'},
+        статус — created, unchanged или not_found.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    found = dict(
+        User.objects.filter(pk__in=user_ids).exclude(pk=follower.pk)
+        .annotate(followed=Exists(Follow.objects.filter(follower=follower, followee=OuterRef('pk'))))
+        .values_list('pk', 'followed')
+    )
+    created = [user_id for user_id, followed in found.items() if not followed]
+
+    if created:
+        # Общее время подписок пачки отличает вставленные строки от созданных параллельно
+        created_at = timezone.now()
+        with transaction.atomic():
+            Follow.objects.bulk_create(
+                [Follow(follower=follower, followee_id=user_id, created_at=created_at) for user_id in created],
+                ignore_conflicts=True,
+            )
+            created = list(
+                Follow.objects.filter(follower=follower, followee_id__in=created, created_at=created_at)
+                .values_list('followee_id', flat=True)
+            )
+            update_counts(follower.pk, created, 1)
+        if created:
+            follows_created.send(sender=Follow, follower_id=follower.pk, followee_ids=created)
+
+    return [
+        {
+            'user_id': user_id,
+            'following': user_id in found,
+            'status': 'not_found' if user_id not in found else 'created' if user_id in created else 'unchanged',
+        }
+        for user_id in user_ids
+    ]
+
+
+def unfollow(follower, user_ids) -> list:
+    """
+    Отписывает пользователя от авторов user_ids: один запрос подписок
+    с блокировкой строк, один DELETE и два UPDATE счётчиков профилей.
+    Счётчики изменяются на число действительно удалённых строк.
+
+    Returns:
+        list: Результат по каждому ID: {'user_id', 'following', 'status'},
+        статус — deleted или unchanged.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    with transaction.atomic():
+        # Параллельная отписка ждёт блокировки и не находит уже удалённые подписки
+        edges = list(
+            Follow.objects.select_for_update().filter(follower=follower, followee_id__in=user_ids)
+            .only('pk', 'followee_id', 'created_at')
+        )
+        deleted = [edge.followee_id for edge in edges]
+        if edges:
+            _, removed = Follow.objects.filter(pk__in=[edge.pk for edge in edges]).delete()
+            update_counts(follower.pk, deleted, -1, total=removed.get(Follow._meta.label, 0))
+
+    if edges:
+        follows_deleted.send(sender=Follow, follower_id=follower.pk, followee_ids=deleted, edges=edges)
+
+    return [
+        {'user_id': user_id, 'following': False, 'status': 'deleted' if user_id in deleted else 'unchanged'}
+        for user_id in user_ids
+    ]
+
+
+def update_counts(follower_id: int, followee_ids: list, delta: int, total: int = None) -> None:
+    """
+    Изменяет счётчики подписчиков авторов на delta, а счётчик подписок
+    подписчика — на delta * total (по умолчанию total — число авторов).
+    """
+    total = len(followee_ids) if total is None else total
+    if total:
+        Profile.objects.filter(user_id=follower_id).update(following_count=F('following_count') + delta * total)
+    Profile.objects.filter(user_id__in=followee_ids).update(followers_count=F('followers_count') + delta)
+
+
+def follow_status(user, user_ids) -> dict:
+    """
+    Отвечает одним запросом, на кого из user_ids подписан пользователь.
+
+    Returns:
+        dict: {user_id: bool}.
+    """
+    followed = set(
+        Follow.objects.filter(follower=user, followee_id__in=user_ids).values_list('followee_id', flat=True)
+    )
+    return {user_id: user_id in followed for user_id in user_ids}
+
+
+def mutual_follows(user):
+    """
+    Возвращает queryset взаимных подписок: пользователи, на которых подписан
+    user и которые подписаны на него.
+    """
+    return User.objects.filter(
+        Exists(Follow.objects.filter(follower=user, followee=OuterRef('pk'))),
+        Exists(Follow.objects.filter(follower=OuterRef('pk'), followee=user)),
+    )
+
+
+def follow_suggestions(user, limit: int = None) -> list:
+    """
+    Рекомендует авторов для подписки не более чем за три запроса.
+
+    Сначала — на кого подписаны авторы из последних FOLLOW_SUGGESTIONS_SAMPLE
+    подписок пользователя (по числу таких общих связей), затем, если
+    рекомендаций не хватает, — самые популярные авторы.
+
+    Returns:
+        list: Пользователи (с профилем) с атрибутом mutual_count.
+    """
+    limit = limit or settings.FOLLOW_SUGGESTIONS_LIMIT
+    followees = Follow.objects.filter(follower=user).values('followee_id')
+    sample = followees.order_by('-created_at')[:settings.FOLLOW_SUGGESTIONS_SAMPLE]
+    ranked = dict(
+        Follow.objects.filter(follower_id__in=sample)
+        .exclude(followee_id=user.pk)
+        .exclude(followee_id__in=followees)
+        .values('followee_id')
+        .annotate(mutual=Count('pk'))
+        .order_by('-mutual', 'followee_id')
+        .values_list('followee_id', 'mutual')[:limit]
+    )
+    if len(ranked) < limit:
+        popular = (
+            Profile.objects.exclude(user_id=user.pk)
+            .exclude(user_id__in=followees)
+            .exclude(user_id__in=list(ranked))
+            .order_by('-followers_count')
+            .values_list('user_id', flat=True)[:limit - len(ranked)]
+        )
+        ranked.update(dict.fromkeys(popular, 0))
+
+    users = User.objects.select_related('profile').in_bulk(list(ranked))
+    suggestions = []
+    for user_id, mutual in ranked.items():
+        if user_id in users:
+            users[user_id].mutual_count = mutual
+            suggestions.append(users[user_id])
+    return suggestions
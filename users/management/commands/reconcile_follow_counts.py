@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, OuterRef, Q
+
+from common.db import count_subquery
+from users.models import Follow, Profile
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики подписчиков и подписок профилей и исправляет расхождения."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help="Количество профилей, обрабатываемых за один проход.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        drifted = Profile.objects.annotate(
+            actual_followers=count_subquery(Follow.objects.filter(followee_id=OuterRef('user_id')), 'followee_id'),
+            actual_following=count_subquery(Follow.objects.filter(follower_id=OuterRef('user_id')), 'follower_id'),
+        ).filter(
+            ~Q(followers_count=F('actual_followers'))
+            | ~Q(following_count=F('actual_following'))
+        ).order_by('pk')
+
+        fixed = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                drifted.filter(pk__gt=last_pk).only(*(('pk',) + Profile.COUNTER_FIELDS))[:batch_size]
+            )
+            if not batch:
+                break
+
+            for profile in batch:
+                profile.followers_count = profile.actual_followers
+                profile.following_count = profile.actual_following
+            Profile.objects.bulk_update(batch, Profile.COUNTER_FIELDS)
+
+            fixed += len(batch)
+            last_pk = batch[-1].pk
+
+        self.stdout.write(self.style.SUCCESS(f"Исправлено профилей: {fixed}"))
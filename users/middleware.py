@@ -0,0 +1,27 @@
+from django.utils.functional import SimpleLazyObject, empty
+
+from users.activity import user_activity
+
+
+class UserActivityMiddleware:
+    """
+    Middleware для учёта активности пользователей (см. users.activity).
+
+    После ответа отмечает активность аутентифицированного пользователя
+    без запроса к базе. Ленивый пользователь сессии, к которому запрос
+    не обращался, не загружается.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        # DRF записывает пользователя, аутентифицированного по JWT, в request.user
+        user = getattr(request, 'user', None)
+        if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+            return response
+        if user is not None and user.is_authenticated:
+            user_activity.touch(user.pk)
+        return response
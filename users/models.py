@@ -1,11 +1,13 @@
 from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
 from django.db.models.signals import post_save
+from django.utils import timezone
 from django.dispatch import receiver
 from phonenumber_field.modelfields import PhoneNumberField
 from django.utils.translation import gettext_lazy as _
 from django_ckeditor_5.fields import CKEditor5Field
-from config import settings
+
+from common.images import image_processor
 
 
 class User(AbstractUser):
@@ -32,20 +34,75 @@ class User(AbstractUser):
         default=Role.CUSTOMER
     )
     date_joined = models.DateTimeField(auto_now_add=True)
-    last_activity = models.DateTimeField(auto_now=True)
+    # Обновляется пачками из users.activity, а не при каждом сохранении пользователя
+    last_activity = models.DateTimeField(default=timezone.now, editable=False)
+    # Версия токенов: выданные ранее JWT с другой версией отклоняются (см. users.authentication)
+    token_version = models.PositiveIntegerField(default=0, editable=False)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name', 'phone_number', 'username']
 
     objects = UserManager()
 
-
+    # Изменение этих полей, как и смена пароля, отзывает выданные токены
+    # (роль и признак блокировки читаются из claims токена без запроса к базе)
+    TOKEN_REVOKE_FIELDS = ('is_active', 'is_banned', 'role')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_access = {field: instance.__dict__.get(field) for field in cls.TOKEN_REVOKE_FIELDS}
+        instance._loaded_token_version = instance.__dict__.get('token_version')
+        return instance
+
+    def revoke_tokens(self) -> None:
+        """
+        Отзывает все выданные пользователю токены (применяется при сохранении).
+        """
+        self.token_version += 1
+
+    def save(self, *args, **kwargs):
+        # _password задаётся в set_password до сохранения нового пароля
+        loaded_access = getattr(self, '_loaded_access', {})
+        access_changed = any(
+            value is not None and value != getattr(self, field) for field, value in loaded_access.items()
+        )
+        if not self._state.adding and (self._password is not None or access_changed):
+            self.revoke_tokens()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'token_version'}
+        if access_changed:
+            self._loaded_access = {field: getattr(self, field) for field in self.TOKEN_REVOKE_FIELDS}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.email
 
 
+class ClaimsUser(User):
+    """
+    Пользователь, собранный из claims JWT без запроса к базе (см. users.authentication).
+
+    Заполнены только ID и поля из токена, остальные отложены: при первом
+    обращении к любому из них пользователь загружается целиком одним запросом.
+    """
+
+    class Meta:
+        proxy = True
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred.issuperset(fields):
+            fields = list(deferred)
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+
+
 class Profile(models.Model):
+    # Счётчики подписок обновляются только через F()-выражения (см. users.follows)
+    COUNTER_FIELDS = ('followers_count', 'following_count')
+    # Изображения с уменьшенными вариантами (common.images); renditions пишет только обработчик
+    RENDITION_FIELDS = ('photo', 'background_image')
+
     user = models.OneToOneField(
         to='users.User',
         on_delete=models.CASCADE,
@@ -59,41 +116,99 @@ class Profile(models.Model):
     bio = CKEditor5Field(blank=True, null=True)
     skills = models.CharField(max_length=255, blank=True, verbose_name="Навыки")
     date_of_birth = models.DateField(blank=True, null=True)
-    followers = models.ManyToManyField(settings.AUTH_USER_MODEL,
-                                       related_name="user_followers",
-                                       blank=True,
-                                       symmetrical=False)
-    following = models.ManyToManyField(settings.AUTH_USER_MODEL,
-                                       related_name="user_following",
-                                       blank=True,
-                                       symmetrical=False)
     location = models.CharField(max_length=68, blank=True, null=True)
     linkedin = models.URLField(blank=True, null=True)
     twitter = models.URLField(blank=True, null=True)
     website = models.URLField(blank=True, null=True)
     signature = models.CharField(max_length=300, blank=True, null=True)
     background_image = models.ImageField(upload_to='users/profile/background', blank=True, null=True)
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
     article_count = models.PositiveIntegerField(default=0)
     comment_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
 
     def number_of_followers(self):
-        if self.followers.count():
-            return self.followers.count()
-        else:
-            return 0
+        return self.followers_count
 
     def number_of_following(self):
-        if self.following.count():
-            return self.following.count()
-        else:
-            return 0
+        return self.following_count
+
+    def save(self, *args, **kwargs):
+        # Не перезаписываем счётчики подписок и варианты изображений устаревшими значениями из памяти
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in (*self.COUNTER_FIELDS, 'renditions')
+            ]
+        super().save(*args, **kwargs)
 
     class Meta:
         verbose_name = _("Profile")
+        indexes = [
+            # Популярные авторы для рекомендаций подписок
+            models.Index(fields=['-followers_count'], name='profile_followers_count_idx'),
+        ]
+
+
+class Follow(models.Model):
+    """
+    Подписка пользователя на автора (ребро графа подписок).
+
+    Изменяется только через users.follows, которые поддерживают
+    счётчики профилей и отправляют сигналы users.signals.
+
+    Атрибуты:
+        follower (User): Подписчик.
+        followee (User): Автор, на которого подписались.
+        created_at (datetime): Время подписки.
+    """
+    follower = models.ForeignKey(
+        to='users.User',
+        on_delete=models.CASCADE,
+        related_name='following_edges'
+    )
+    followee = models.ForeignKey(
+        to='users.User',
+        on_delete=models.CASCADE,
+        related_name='follower_edges'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = _("Подписка")
+        verbose_name_plural = _("Подписки")
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'followee'], name='follow_follower_followee_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['followee', 'follower'], name='follow_followee_follower_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.follower_id}->{self.followee_id}"
 
 
 @receiver(post_save, sender=User)
 def post_save_user(sender, instance: User, created, **kwargs) -> None:
     if not hasattr(instance, 'profile'):
-        Profile.objects.create(user=instance)
\ No newline at end of file
+        Profile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Profile)
+def post_save_profile_renditions(sender, instance: Profile, update_fields=None, using=None, **kwargs) -> None:
+    image_processor.schedule(instance, update_fields, using)
+
+
+@receiver(post_save, sender=User)
+def post_save_user_token_version(sender, instance: User, created, update_fields=None, **kwargs) -> None:
+    from users.authentication import set_token_version
+
+    loaded_version = getattr(instance, '_loaded_token_version', None)
+    if created or loaded_version is None or loaded_version == instance.token_version:
+        return
+    if update_fields is None or 'token_version' in update_fields:
+        set_token_version(instance.pk, instance.token_version)
+        instance._loaded_token_version = instance.token_version
+
@@ -0,0 +1,7 @@
+from django.dispatch import Signal
+
+# Отправляются users.follows после изменения подписок (sender=Follow).
+# Аргументы: follower_id — подписчик, followee_ids — авторы;
+# follows_deleted дополнительно передаёт edges — удалённые подписки.
+follows_created = Signal()
+follows_deleted = Signal()
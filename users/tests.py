@@ -1,3 +1,284 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from dj_rest_auth.app_settings import api_settings as rest_auth_settings
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.db.models.query import QuerySet
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.activity import UserActivityBuffer
+from users.authentication import ClaimsJWTAuthentication, ClaimsTokenObtainPairSerializer, set_token_version
+from users.follows import follow, follow_suggestions, unfollow
+from users.models import ClaimsUser, Follow, Profile, User
+
+
+def create_user(name: str, phone_suffix: int) -> User:
+    return User.objects.create_user(
+        username=name, email=f'{name}@example.com', password='password',
+        first_name=name.title(), last_name='Test', phone_number=f'+99890123{phone_suffix:04d}',
+    )
+
+
+class FollowTest(TestCase):
+    """
+    Пакетные подписки: идемпотентность и согласованность счётчиков профилей.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = create_user('alice', 8001)
+        cls.bob = create_user('bob', 8002)
+        cls.carol = create_user('carol', 8003)
+
+    def counts(self, user: User) -> tuple:
+        profile = Profile.objects.get(user=user)
+        return profile.followers_count, profile.following_count
+
+    def test_follow_updates_counters(self):
+        results = follow(self.alice, [self.bob.pk, self.carol.pk, self.alice.pk, 0])
+        self.assertEqual(
+            [result['status'] for result in results], ['created', 'created', 'not_found', 'not_found'],
+        )
+        self.assertEqual(self.counts(self.alice), (0, 2))
+        self.assertEqual(self.counts(self.bob), (1, 0))
+
+        # Повторная подписка ничего не меняет
+        results = follow(self.alice, [self.bob.pk])
+        self.assertEqual(results, [{'user_id': self.bob.pk, 'following': True, 'status': 'unchanged'}])
+        self.assertEqual(self.counts(self.alice), (0, 2))
+        self.assertEqual(self.counts(self.bob), (1, 0))
+
+    def test_follow_skips_concurrently_created_edges(self):
+        bulk_create = Follow.objects.bulk_create
+
+        def create_concurrently(objs, **kwargs):
+            # Параллельный запрос успел подписаться на bob между проверкой и вставкой
+            Follow.objects.create(follower=self.alice, followee=self.bob, created_at=timezone.now() - timedelta(seconds=1))
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(Follow.objects, 'bulk_create', create_concurrently):
+            results = follow(self.alice, [self.bob.pk, self.carol.pk])
+
+        self.assertEqual([result['status'] for result in results], ['unchanged', 'created'])
+        self.assertEqual(Follow.objects.filter(follower=self.alice).count(), 2)
+        # Счётчики учитывают только строку, вставленную этим вызовом
+        self.assertEqual(self.counts(self.alice), (0, 1))
+        self.assertEqual(self.counts(self.bob), (0, 0))
+        self.assertEqual(self.counts(self.carol), (1, 0))
+
+    def test_unfollow_updates_counters(self):
+        follow(self.alice, [self.bob.pk, self.carol.pk])
+        results = unfollow(self.alice, [self.bob.pk, self.bob.pk, 0])
+        self.assertEqual(
+            results,
+            [
+                {'user_id': self.bob.pk, 'following': False, 'status': 'deleted'},
+                {'user_id': 0, 'following': False, 'status': 'unchanged'},
+            ],
+        )
+        self.assertEqual(self.counts(self.alice), (0, 1))
+        self.assertEqual(self.counts(self.bob), (0, 0))
+        self.assertEqual(self.counts(self.carol), (1, 0))
+
+        # Повторная отписка не уменьшает счётчики
+        unfollow(self.alice, [self.bob.pk])
+        self.assertEqual(self.counts(self.alice), (0, 1))
+        self.assertEqual(self.counts(self.bob), (0, 0))
+
+
+@override_settings(FOLLOW_SUGGESTIONS_LIMIT=2, FOLLOW_SUGGESTIONS_SAMPLE=10)
+class FollowSuggestionsTest(TestCase):
+    """
+    Рекомендации: сначала авторы, на которых подписаны мои подписки,
+    затем самые популярные авторы.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob, cls.carol, cls.dave, cls.erin, cls.frank = [
+            create_user(name, 8100 + index)
+            for index, name in enumerate(['alice', 'bob', 'carol', 'dave', 'erin', 'frank'])
+        ]
+
+    def test_ranked_by_mutual_follows(self):
+        follow(self.alice, [self.bob.pk, self.carol.pk])
+        follow(self.bob, [self.dave.pk, self.erin.pk, self.alice.pk])
+        follow(self.carol, [self.dave.pk])
+
+        suggestions = follow_suggestions(self.alice)
+        self.assertEqual([user.pk for user in suggestions], [self.dave.pk, self.erin.pk])
+        self.assertEqual([user.mutual_count for user in suggestions], [2, 1])
+
+    def test_popular_fallback(self):
+        follow(self.alice, [self.bob.pk])
+        follow(self.carol, [self.frank.pk])
+        follow(self.dave, [self.frank.pk, self.erin.pk])
+
+        suggestions = follow_suggestions(self.alice, limit=3)
+        self.assertEqual([user.pk for user in suggestions[:2]], [self.frank.pk, self.erin.pk])
+        self.assertEqual({user.mutual_count for user in suggestions}, {0})
+        self.assertNotIn(self.bob.pk, [user.pk for user in suggestions])
+        self.assertNotIn(self.alice.pk, [user.pk for user in suggestions])
+
+
+class ClaimsAuthenticationTest(TestCase):
+    """
+    JWT с claims: безопасные запросы не загружают пользователя из базы,
+    отзыв токенов проверяется по версии токенов.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('alice', 8201)
+        cls.user.role = User.Role.MODERATOR
+        cls.user.save()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def login(self) -> None:
+        response = self.client.post('/api/auth/login/', {'email': 'alice@example.com', 'password': 'password'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(rest_auth_settings.JWT_AUTH_COOKIE, response.cookies)
+
+    def test_safe_request_does_not_load_user(self):
+        self.login()
+        # Первый запрос кеширует версию токенов пользователя
+        self.client.get('/api/auth/follow/status/', {'ids': '1'})
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/auth/follow/status/', {'ids': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query for query in context.captured_queries if 'FROM "users_user"' in query['sql']])
+
+    def test_user_built_from_claims(self):
+        token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+        authentication = ClaimsJWTAuthentication()
+        authentication.stateless = True
+        set_token_version(self.user.pk, self.user.token_version)
+        with self.assertNumQueries(0):
+            user = authentication.get_user(authentication.get_validated_token(str(token)))
+            self.assertIsInstance(user, ClaimsUser)
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertEqual(user.role, User.Role.MODERATOR)
+            self.assertIs(user.is_banned, False)
+            self.assertEqual(user.token_version, self.user.token_version)
+
+    def test_revoked_token_is_rejected(self):
+        self.login()
+        user = User.objects.get(pk=self.user.pk)
+        user.is_banned = True
+        user.save()
+        response = self.client.get('/api/auth/follow/status/', {'ids': '1'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_role_change_revokes_token(self):
+        self.login()
+        user = User.objects.get(pk=self.user.pk)
+        user.role = User.Role.CUSTOMER
+        user.save(update_fields=['role'])
+        response = self.client.get('/api/auth/follow/status/', {'ids': '1'})
+        self.assertEqual(response.status_code, 401)
+
+        # Новый вход выдаёт токен с новой ролью
+        self.client.cookies.clear()
+        self.login()
+        token = self.client.cookies[rest_auth_settings.JWT_AUTH_COOKIE].value
+        authentication = ClaimsJWTAuthentication()
+        authentication.stateless = True
+        self.assertEqual(authentication.get_user(authentication.get_validated_token(token)).role, User.Role.CUSTOMER)
+
+
+class UserActivityBufferTest(TestCase):
+    """
+    Буфер активности: запись last_activity не чаще write_interval и сброс
+    пачками по flush_size пользователей.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [create_user(f'active{i}', 8300 + i) for i in range(3)]
+        User.objects.update(last_activity=timezone.now() - timedelta(days=1))
+
+    def buffer(self, **options) -> UserActivityBuffer:
+        buffer = UserActivityBuffer(write_interval=300.0, flush_interval=3600.0, online_window=60.0, **options)
+        # Сброс вызывается в тесте явно, без фонового потока
+        patcher = mock.patch.object(buffer, '_ensure_worker')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return buffer
+
+    def last_activity(self) -> dict:
+        return dict(User.objects.values_list('pk', 'last_activity'))
+
+    def test_flush_writes_in_batches(self):
+        buffer = self.buffer(flush_size=2)
+        before = self.last_activity()
+        for user in self.users[:2]:
+            buffer.touch(user.pk)
+        # Второй пользователь переполнил пачку: сброшено сразу
+        self.assertTrue(all(self.last_activity()[user.pk] > before[user.pk] for user in self.users[:2]))
+
+        buffer.touch(self.users[2].pk)
+        self.assertEqual(self.last_activity()[self.users[2].pk], before[self.users[2].pk])
+        with self.assertNumQueries(1):
+            self.assertEqual(buffer.flush(), 1)
+        self.assertGreater(self.last_activity()[self.users[2].pk], before[self.users[2].pk])
+        self.assertEqual(buffer.flush(), 0)
+
+    def test_failed_flush_keeps_activity(self):
+        buffer = self.buffer(flush_size=2)
+        before = self.last_activity()
+        with mock.patch.object(QuerySet, 'update', side_effect=OperationalError('database table is locked')):
+            buffer.touch(self.users[0].pk)
+            with self.assertRaises(OperationalError):
+                buffer.flush()
+        self.assertEqual(self.last_activity(), before)
+
+        # Повторная активность в пределах write_interval не ставится в очередь, но сохранённая запишется
+        buffer.touch(self.users[0].pk)
+        self.assertEqual(buffer.flush(), 1)
+        self.assertGreater(self.last_activity()[self.users[0].pk], before[self.users[0].pk])
+
+    @override_settings(ONLINE_STATUS_MAX_IDS=2)
+    def test_online_status_limits_ids(self):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        self.assertEqual(client.get('/api/auth/user/online/', {'ids': '1,2'}).status_code, 200)
+        self.assertEqual(client.get('/api/auth/user/online/', {'ids': '1,2,3'}).status_code, 400)
+
+    def test_touch_is_throttled_per_user(self):
+        buffer = self.buffer()
+        user_id = self.users[0].pk
+        with mock.patch('users.activity.time.monotonic', return_value=1000.0):
+            buffer.touch(user_id)
+            self.assertEqual(buffer.flush(), 1)
+        with mock.patch('users.activity.time.monotonic', return_value=1100.0):
+            buffer.touch(user_id)
+            self.assertEqual(buffer.flush(), 0)
+        with mock.patch('users.activity.time.monotonic', return_value=1300.0):
+            buffer.touch(user_id)
+            self.assertEqual(buffer.flush(), 1)
+
+    def test_flush_keeps_later_activity(self):
+        buffer = self.buffer()
+        later = timezone.now() + timedelta(hours=1)
+        User.objects.filter(pk=self.users[0].pk).update(last_activity=later)
+        buffer.touch(self.users[0].pk)
+        buffer.flush()
+        self.assertEqual(self.last_activity()[self.users[0].pk], later)
+
+    def test_online_user_ids(self):
+        buffer = self.buffer()
+        first, second, third = (user.pk for user in self.users)
+        with mock.patch('users.activity.time.monotonic', return_value=1000.0):
+            buffer.touch(first)
+        with mock.patch('users.activity.time.monotonic', return_value=1050.0):
+            buffer.touch(second)
+            self.assertEqual(buffer.online_user_ids(), {first, second})
+        with mock.patch('users.activity.time.monotonic', return_value=1070.0):
+            self.assertEqual(buffer.online_user_ids([first, second, third]), {second})
@@ -15,7 +15,17 @@ from users.views.user import (
     UserView,
     CustomResendEmailVerificationView,
     CustomVerifyEmailView,
-    PublicUserProfileView
+    PublicUserProfileView,
+    FollowersView,
+    FollowingView,
+    OnlineStatusView,
+)
+from users.views.follow import (
+    FollowView,
+    UnfollowView,
+    FollowStatusView,
+    MutualFollowsView,
+    FollowSuggestionsView,
 )
 
 urlpatterns = [
@@ -41,7 +51,15 @@ urlpatterns = [
         name="account_email_verification_sent",
     ),
     path('auth/user/', UserView.as_view(), name='users'),
-    path('auth/user/<int:pk>', PublicUserProfileView.as_view(), name='public-user-profile')
+    path('auth/user/<int:pk>', PublicUserProfileView.as_view(), name='public-user-profile'),
+    path('auth/user/<int:pk>/followers/', FollowersView.as_view(), name='user-followers'),
+    path('auth/user/<int:pk>/following/', FollowingView.as_view(), name='user-following'),
+    path('auth/user/online/', OnlineStatusView.as_view(), name='user-online'),
+    path('auth/follow/', FollowView.as_view(), name='follow'),
+    path('auth/unfollow/', UnfollowView.as_view(), name='unfollow'),
+    path('auth/follow/status/', FollowStatusView.as_view(), name='follow-status'),
+    path('auth/follow/mutual/', MutualFollowsView.as_view(), name='follow-mutual'),
+    path('auth/follow/suggestions/', FollowSuggestionsView.as_view(), name='follow-suggestions'),
 
 ]
 
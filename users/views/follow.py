@@ -0,0 +1,124 @@
+from django.conf import settings
+from drf_spectacular.utils import OpenApiParameter, OpenApiResponse, extend_schema
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from users.api.serializer import (
+    FollowBatchSerializer,
+    FollowResultSerializer,
+    FollowSuggestionSerializer,
+    FollowUserSerializer,
+)
+from users.follows import follow, follow_status, follow_suggestions, mutual_follows, unfollow
+
+
+@extend_schema(
+    summary="Подписаться на пользователей",
+    description=(
+        "Подписывает текущего пользователя на пользователей из списка user_ids. "
+        "Операция идемпотентна: повторная подписка ничего не меняет."
+    ),
+    request=FollowBatchSerializer,
+    responses={
+        200: FollowResultSerializer(many=True),
+        400: OpenApiResponse(description="Ошибка запроса."),
+    },
+    tags=['Follow']
+)
+class FollowView(generics.GenericAPIView):
+    """
+    Представление для пакетной подписки на пользователей.
+    """
+    permission_classes = (IsAuthenticated,)
+    serializer_class = FollowBatchSerializer
+    follow_action = staticmethod(follow)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        results = self.follow_action(request.user, serializer.validated_data['user_ids'])
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+
+@extend_schema(
+    summary="Отписаться от пользователей",
+    description=(
+        "Отписывает текущего пользователя от пользователей из списка user_ids. "
+        "Операция идемпотентна."
+    ),
+    request=FollowBatchSerializer,
+    responses={
+        200: FollowResultSerializer(many=True),
+        400: OpenApiResponse(description="Ошибка запроса."),
+    },
+    tags=['Follow']
+)
+class UnfollowView(FollowView):
+    """
+    Представление для пакетной отписки от пользователей.
+    """
+    follow_action = staticmethod(unfollow)
+
+
+@extend_schema(
+    summary="Статус подписки",
+    description="Возвращает для каждого ID из параметра ids, подписан ли на него текущий пользователь.",
+    parameters=[OpenApiParameter('ids', str, required=True, description="ID пользователей через запятую.")],
+    responses={200: OpenApiResponse(description="Объект {ID пользователя: подписан ли}.")},
+    tags=['Follow']
+)
+class FollowStatusView(generics.GenericAPIView):
+    """
+    Представление для проверки подписок на несколько пользователей одним запросом.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        try:
+            user_ids = [int(value) for value in request.query_params.get('ids', '').split(',') if value]
+        except ValueError:
+            raise ValidationError({"ids": "Ожидается список ID через запятую."})
+        if len(user_ids) > settings.FOLLOW_BATCH_MAX_ITEMS:
+            raise ValidationError({"ids": f"Не больше {settings.FOLLOW_BATCH_MAX_ITEMS} ID."})
+        return Response(follow_status(request.user, user_ids))
+
+
+@extend_schema(
+    summary="Взаимные подписки",
+    description="Возвращает постраничный список пользователей, с которыми текущий пользователь подписан взаимно.",
+    responses={200: FollowUserSerializer(many=True)},
+    tags=['Follow']
+)
+class MutualFollowsView(generics.ListAPIView):
+    """
+    Представление для получения взаимных подписок текущего пользователя.
+    """
+    permission_classes = (IsAuthenticated,)
+    serializer_class = FollowUserSerializer
+
+    def get_queryset(self):
+        return mutual_follows(self.request.user).select_related('profile')
+
+
+@extend_schema(
+    summary="Рекомендации подписок",
+    description=(
+        "Возвращает пользователей, на которых подписаны авторы из подписок текущего пользователя, "
+        "а при их нехватке — самых популярных авторов."
+    ),
+    responses={200: FollowSuggestionSerializer(many=True)},
+    tags=['Follow']
+)
+class FollowSuggestionsView(generics.GenericAPIView):
+    """
+    Представление для получения рекомендаций подписок.
+    """
+    permission_classes = (IsAuthenticated,)
+    serializer_class = FollowSuggestionSerializer
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(follow_suggestions(request.user), many=True)
+        return Response(serializer.data)
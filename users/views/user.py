@@ -10,12 +10,23 @@ from dj_rest_auth.registration.views import RegisterView, SocialLoginView, Socia
 from dj_rest_auth.serializers import PasswordChangeSerializer, PasswordResetSerializer, PasswordResetConfirmSerializer
 from dj_rest_auth.social_serializers import TwitterConnectSerializer
 from dj_rest_auth.views import LoginView, LogoutView, PasswordChangeView, PasswordResetView, PasswordResetConfirmView
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.shortcuts import render
-from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
-from rest_framework.generics import RetrieveUpdateDestroyAPIView, RetrieveAPIView
+from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter, OpenApiResponse
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.generics import GenericAPIView, ListAPIView, RetrieveUpdateDestroyAPIView, RetrieveAPIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from users.api.serializer import RegistrationSerializer, LoginSerializer, UserSerializer, UserUpdateSerializer
+from rest_framework.response import Response
+from common.cache import CachedResponseMixin
+from users.activity import user_activity
+from users.api.serializer import (
+    FollowUserSerializer,
+    RegistrationSerializer,
+    LoginSerializer,
+    UserSerializer,
+    UserUpdateSerializer,
+)
 
 User = get_user_model()
 
@@ -290,10 +301,83 @@ class UserView(RetrieveUpdateDestroyAPIView):
     responses={200: UserSerializer},
     tags=['Users']
 )
-class PublicUserProfileView(RetrieveAPIView):
+class PublicUserProfileView(CachedResponseMixin, RetrieveAPIView):
+    """
+    Публичный профиль пользователя. Ответ для анонимных запросов кешируется.
+    """
     serializer_class = UserSerializer
-    queryset = User.objects.all()
+    queryset = User.objects.select_related('profile')
     permission_classes = (AllowAny,)
+    cache_namespaces = ('profiles',)
+    cache_actions = ('get',)
+    last_modified_field = 'profile.updated_at'
+
+
+class FollowListView(CachedResponseMixin, ListAPIView):
+    """
+    Базовое представление постраничного списка подписчиков или подписок пользователя.
+    Ответ для анонимных запросов кешируется.
+
+    Атрибуты:
+        follow_lookup (str): Условие на пользователей списка относительно пользователя pk.
+    """
+    serializer_class = FollowUserSerializer
+    permission_classes = (AllowAny,)
+    cache_namespaces = ('profiles',)
+    cache_actions = ('get',)
+    follow_lookup = None
+
+    def get_queryset(self):
+        if not User.objects.filter(pk=self.kwargs['pk']).exists():
+            raise NotFound()
+        return User.objects.select_related('profile').filter(**{self.follow_lookup: self.kwargs['pk']})
+
+
+@extend_schema(
+    summary="Подписчики пользователя",
+    description="Возвращает постраничный список пользователей, подписанных на пользователя.",
+    responses={200: FollowUserSerializer(many=True)},
+    tags=['Users']
+)
+class FollowersView(FollowListView):
+    follow_lookup = 'following_edges__followee_id'
+
+
+@extend_schema(
+    summary="Подписки пользователя",
+    description="Возвращает постраничный список пользователей, на которых подписан пользователь.",
+    responses={200: FollowUserSerializer(many=True)},
+    tags=['Users']
+)
+class FollowingView(FollowListView):
+    follow_lookup = 'follower_edges__follower_id'
+
+
+@extend_schema(
+    summary="Пользователи онлайн",
+    description=(
+        "Возвращает для каждого ID из параметра ids, был ли пользователь активен "
+        "за последние USER_ONLINE_WINDOW секунд. Ответ строится из памяти, без запросов к базе."
+    ),
+    parameters=[OpenApiParameter('ids', str, required=True, description="ID пользователей через запятую.")],
+    responses={200: OpenApiResponse(description="Объект {ID пользователя: онлайн ли}.")},
+    tags=['Users']
+)
+class OnlineStatusView(GenericAPIView):
+    """
+    Представление для проверки, находятся ли пользователи онлайн.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, *args, **kwargs):
+        try:
+            user_ids = [int(value) for value in request.query_params.get('ids', '').split(',') if value]
+        except ValueError:
+            raise ValidationError({"ids": "Ожидается список ID через запятую."})
+        if len(user_ids) > settings.ONLINE_STATUS_MAX_IDS:
+            raise ValidationError({"ids": f"Не больше {settings.ONLINE_STATUS_MAX_IDS} ID."})
+        online = user_activity.online_user_ids(user_ids)
+        return Response({user_id: user_id in online for user_id in user_ids})
 
 
 